@@ -1,5 +1,83 @@
 import numpy as np
 import pdb
+import os
+import hashlib
+
+def indexBases(bolshoidir, fn='rf_data4.txt'):
+    ''' Where the index of the random factors in fn may be kept, in order of preference: next to fn, or, if
+    bolshoidir can't be written to, in $GIDGET_CACHE (by default ~/.cache/gidget), under a name unique to
+    bolshoidir. '''
+    stem = fn[:-len('.txt')] if fn.endswith('.txt') else fn
+    cachedir = os.environ.get('GIDGET_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'gidget'))
+    key = hashlib.sha1(os.path.abspath(bolshoidir).encode()).hexdigest()[:12]
+    return [bolshoidir+stem, os.path.join(cachedir, key+'_'+stem)]
+
+def indexRandomFactors(bolshoidir, fn='rf_data4.txt', base=None):
+    ''' Convert the text file of random factors fn, made up of a line "tree <id>" for each tree followed by
+    one line per random factor, into two binary files which can be memory-mapped: base+'.npy', an (ntrees,
+    nmax) array of the random factors (padded with nan), and base+'_index.npy', an (ntrees, 4) array of each
+    tree's id, the byte offsets in fn of the start and end of its random factors, and their number. By default
+    base is fn with the .txt removed. Returns the two arrays. '''
+    ids=[]
+    offsets=[]
+    values=[]
+    with open(bolshoidir+fn,'rb') as f:
+        offset=0
+        for line in f:
+            if b'tree' in line:
+                if len(ids)>0:
+                    offsets[-1][1] = offset
+                ids.append(int(line.split()[1]))
+                offsets.append([offset+len(line), offset+len(line)])
+                values.append([])
+            elif len(ids)>0:
+                values[-1].append(float(line.split()[0]))
+            offset+=len(line)
+        if len(ids)>0:
+            offsets[-1][1] = offset
+    xs = np.zeros((len(ids), max([len(v) for v in values]+[0])))
+    xs[:,:] = np.nan
+    for i,v in enumerate(values):
+        xs[i,:len(v)] = v
+    index = np.array([[ids[i], offsets[i][0], offsets[i][1], len(values[i])] for i in range(len(ids))], dtype=np.int64).reshape((len(ids),4))
+    # Write to temporary files and rename them, so that another process never sees half of an index.
+    if base is None:
+        base = indexBases(bolshoidir, fn)[0]
+    for arr,name in [(xs, base+'.npy'), (index, base+'_index.npy')]:
+        tmpName = name+'.'+str(os.getpid())+'.tmp' # so processes indexing at the same time don't write to the same file
+        with open(tmpName,'wb') as f:
+            np.save(f, arr)
+        os.rename(tmpName, name)
+    return xs, index
+
+def loadRandomFactors(bolshoidir, fn='rf_data4.txt'):
+    ''' Memory-map the random factors in fn and their index, as written by indexRandomFactors, from the first
+    place in indexBases with an index at least as new as fn. If there isn't one, the index is made first, in
+    the first of those places which can be written to. Several processes may do this at once; each writes its
+    own temporary files, so whichever finishes last leaves an identical, complete index. '''
+    mtime = os.path.getmtime(bolshoidir+fn)
+    bases = indexBases(bolshoidir, fn)
+    def upToDate(base):
+        return all([os.path.exists(name) and os.path.getmtime(name)>=mtime for name in [base+'.npy', base+'_index.npy']])
+    for base in bases:
+        if upToDate(base):
+            return np.load(base+'.npy', mmap_mode='r'), np.load(base+'_index.npy')
+    for base in bases:
+        directory = os.path.dirname(base)
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                continue
+        if os.access(directory, os.W_OK):
+            break
+    else:
+        raise IOError("Nowhere to write the index of the random factors in "+bolshoidir+fn)
+    print ("Indexing the random factors in "+bolshoidir+fn+" into "+base)
+    indexRandomFactors(bolshoidir, fn, base)
+    return np.load(base+'.npy', mmap_mode='r'), np.load(base+'_index.npy')
+
 class bolshoireader:
     def __init__(self,fn, minmass, maxmass, bolshoidir):
         self.filename = fn
@@ -22,32 +100,38 @@ class bolshoireader:
         self.maximumMass = np.max(self.masses)
         self.stored = False
 
+    def loadIndex(self):
+        ''' Memory-map the random factors of every tree in rf_data4.txt, and look up the row of each of our trees. '''
+        if not hasattr(self, 'rfs'):
+            self.rfs, self.rfIndex = loadRandomFactors(self.bolshoidir, 'rf_data4.txt')
+            self.rows = dict([(treeid, row) for row,treeid in enumerate(self.rfIndex[:,0])])
+
+    def treeRow(self, ind):
+        ''' The row of rfs and rfIndex containing the random factors of the ind-th tree. '''
+        self.loadIndex()
+        if not self.trees[ind][0] in self.rows:
+            print ("Failed to find line tree "+repr(self.trees[ind][0]))
+        return self.rows[self.trees[ind][0]]
+
     def storeAll(self):
         self.xs = np.zeros( (len(self.trees), 1000) )
-        with open(self.bolshoidir+'rf_data4.txt', 'r') as f:
-            all_lines = f.readlines()
-        treecounter = 0
+        self.loadIndex()
         bad_rows = []
         for treei, tree in enumerate(self.trees):
-            treecounter+=1
-            if treecounter % 100 == 0:
-                print ("Loading up tree ", treecounter, ' of ', len(self.trees))
-            treestring = 'tree '+repr(tree[0])+'\n'
-            treeind = all_lines.index(treestring)
-            try:
-                self.xs[treei, : ] = [float( all_lines[lineind].split()[0] ) for lineind in range(treeind+1,treeind+1001) ]
-            except:
+            row = self.treeRow(treei)
+            if self.rfIndex[row,3] < 1000:
                 print ("Ran into trouble!")
                 bad_rows.append(treei)
+            else:
+                self.xs[treei, : ] = self.rfs[row, :1000]
         for k, row in enumerate(bad_rows):
             random_ind = int((len(self.trees)-1)*np.random.random())
             if not random_ind in bad_rows:
                 self.xs[row, :] = self.xs[random_ind, :]
         self.stored = True
-                    
 
-    def returnnearest(self, dirname, filename, value, logMh0):
-        ''' copy a file with the closest value of tree[2]'''
+    def nearestIndex(self, value, logMh0):
+        ''' The index of the tree with the closest value of tree[2] among those with a mass near logMh0 '''
         #ind = np.searchsorted(self.keys, value)
         assert value>=0 and value<=1
         if logMh0 < self.minimumMass+0.25:
@@ -64,86 +148,36 @@ class bolshoireader:
         if ind == len(self.keys):
             ind=ind-1
         assert ind<len(self.keys) and ind>-1
-        #rffile = bolshoidir+ repr(self.trees[ind][0])+'_rf.txt'
-        #shutil.copy(rffile, dirname)
-        # This chunk of code searches the file rf_data.txt for 
-        #  the appropriate tree number from the register as identified by ind above.
-        # Once found, the subsequent lines (containing the values of the random factors
-        #  for the main progenitor accretion history of that tree) are copied to a file
-        #  in the working directory of the gidget run.
+        return ind
 
+    def returnnearest(self, dirname, filename, value, logMh0):
+        ''' return the random factors of the tree with the closest value of tree[2]'''
+        ind = self.nearestIndex(value, logMh0)
         # If we've already cached the x values, use that!
         if self.stored:
             return self.xs[ind,:]
         else:
-            xs = []
-            with open(self.bolshoidir+'rf_data4.txt','r') as f:
-                line = f.readline()
-                while line!='':
-                    if 'tree '+repr(self.trees[ind][0]) in line:
-                        print ("Copying tree with index ",ind," and Bolshoi ID ",self.trees[ind][0])
-                        break # we found the tree we're looking for
-                    line = f.readline()
-                if line=='':
-                    print ("Failed to find line tree "+repr(self.trees[ind][0]))
-                line = f.readline()
-                collectlines=[]
-                while not 'tree' in line and line!='':
-                    xs.append( float(line.split()[0]) )
-                    collectlines.append(line)
-                    line = f.readline()
-    #            with open(dirname+'/'+filename,'w') as ff:
-    #                assert len(collectlines)>0
-    #                ### Major change! Add in a line at the beginning which tells us the z=0 halo mass of the bolshoi tree from which these random factors are drawn
-    #                ff.write(str(self.trees[ind][1])+'\n')
-    #                for line in collectlines:
-    #                    ff.write(line)
-            return xs[:-1]
+            row = self.treeRow(ind)
+            print ("Copying tree with index ",ind," and Bolshoi ID ",self.trees[ind][0])
+            return list(self.rfs[row, :max(self.rfIndex[row,3]-1,0)])
+
     def copynearest(self, dirname, filename, value, logMh0):
         ''' copy a file with the closest value of tree[2]'''
-        #ind = np.searchsorted(self.keys, value)
-        assert value>=0 and value<=1
-        if logMh0 < self.minimumMass+0.25:
-            acceptable = self.masses<self.minimumMass+0.5
-        elif logMh0 > self.maximumMass-0.25:
-            acceptable = self.masses>self.maximumMass-0.5
-        else:
-            acceptable = np.logical_and( self.masses>logMh0-0.25, self.masses<logMh0+0.25 )
-
-        nAcceptable = np.sum(np.ones(len(self.keys))[acceptable])
-        indAccept = int(nAcceptable*value) # pick one of the acceptable trees
-        ind = np.array(range(len(self.keys)))[acceptable][indAccept] 
-
-        if ind == len(self.keys):
-            ind=ind-1
-        assert ind<len(self.keys) and ind>-1
-        #rffile = bolshoidir+ repr(self.trees[ind][0])+'_rf.txt'
-        #shutil.copy(rffile, dirname)
-        # This chunk of code searches the file rf_data.txt for 
-        #  the appropriate tree number from the register as identified by ind above.
-        # Once found, the subsequent lines (containing the values of the random factors
-        #  for the main progenitor accretion history of that tree) are copied to a file
-        #  in the working directory of the gidget run.
-        with open(self.bolshoidir+'rf_data4.txt','r') as f:
-            line = f.readline()
-            while line!='':
-                if 'tree '+repr(self.trees[ind][0]) in line:
-                    print ("Copying tree with index ",ind," and Bolshoi ID ",self.trees[ind][0])
-                    break # we found the tree we're looking for
-                line = f.readline()
-            if line=='':
-                print ("Failed to find line tree "+repr(self.trees[ind][0]))
-            line = f.readline()
-            collectlines=[]
-            while not 'tree' in line and line!='':
-                collectlines.append(line)
-                line = f.readline()
-            with open(dirname+'/'+filename,'w') as ff:
-                assert len(collectlines)>0
-                ### Major change! Add in a line at the beginning which tells us the z=0 halo mass of the bolshoi tree from which these random factors are drawn
-                ff.write(str(self.trees[ind][1])+'\n')
-                for line in collectlines:
-                    ff.write(line)
+        ind = self.nearestIndex(value, logMh0)
+        # The random factors for the main progenitor accretion history of the tree identified by ind
+        #  are copied verbatim from rf_data4.txt to a file in the working directory of the gidget run,
+        #  using the byte offsets of the tree in the index.
+        row = self.treeRow(ind)
+        print ("Copying tree with index ",ind," and Bolshoi ID ",self.trees[ind][0])
+        start, end = self.rfIndex[row,1], self.rfIndex[row,2]
+        assert end>start
+        with open(self.bolshoidir+'rf_data4.txt','rb') as f:
+            f.seek(start)
+            collectlines = f.read(end-start)
+        with open(dirname+'/'+filename,'wb') as ff:
+            ### Major change! Add in a line at the beginning which tells us the z=0 halo mass of the bolshoi tree from which these random factors are drawn
+            ff.write((str(self.trees[ind][1])+'\n').encode())
+            ff.write(collectlines)
     def test(self):
         for i in range(len(self.keys)):
             globalBolshoiReader.copynearest('~/bolshoitest/', 'test_'+str(i).zfill(5)+'_inputRandomFactors.txt', i)
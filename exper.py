@@ -5,9 +5,21 @@ import shutil
 import subprocess
 import time
 import math
+import threading
+import signal
+import errno
+try:
+    import queue
+except ImportError: # python 2
+    import Queue as queue
 import numpy as np
 import pdb
 import random
+import hashlib
+import json
+import csv
+import socket
+import struct
 from bolshoireader import bolshoireader
 
 # This is a script to allow you to run the GIDGET code with
@@ -24,8 +36,19 @@ allProcs=[] # a global list of all processes we've started
 allStartTimes=[] # a global list of the start times of all of these processes
 
 
-globalBolshoiReader = bolshoireader('rf_registry4.txt',3.0e11,3.0e14, os.environ['GIDGETDIR']+'/bolshoi/')
-bolshoiSize =  len(globalBolshoiReader.keys)
+def getBolshoiReader():
+    ''' The bolshoireader shared by every experiment. Reading the registry of Bolshoi trees is slow, and hundreds of
+        processes doing it at once is hard on a shared filesystem, so it's only done the first time it's needed. '''
+    global globalBolshoiReader, bolshoiSize
+    if 'globalBolshoiReader' not in globals():
+        globalBolshoiReader = bolshoireader('rf_registry4.txt',3.0e11,3.0e14, os.environ['GIDGETDIR']+'/bolshoi/')
+        bolshoiSize =  len(globalBolshoiReader.keys)
+    return globalBolshoiReader
+
+def getBolshoiSize():
+    ''' The number of Bolshoi trees known to the bolshoireader, i.e. the upper limit of bolshoiWeight. '''
+    getBolshoiReader()
+    return bolshoiSize
 
 def HowManyStillRunning(procs):
     ''' Given a list of processes created with subprocess.Popen, (each of which
@@ -33,10 +56,491 @@ def HowManyStillRunning(procs):
           many of those runs are still going.'''
     nStillRunning=0
     for proc in procs:
-        if(proc.poll()==None):
+        if proc in localScheduler.running:
+            # don't poll it, or it could be reaped before its thread sees it exit.
+            if proc not in localScheduler.done:
+                nStillRunning+=1
+        elif(proc.poll()==None):
             nStillRunning+=1
     return nStillRunning 
 
+class Scheduler:
+    ''' Keeps track of the runs of the gidget code started on this machine. Each run is watched by a thread which
+        blocks until it exits, so a free processor is noticed (and can be given a new run) right away, rather than
+        the next time we happen to check. Runs which go on for longer than their maxTime are killed.'''
+    def __init__(self):
+        self.running = {} # process -> (start time, maxTime, name of its stde file)
+        self.onExit = {} # process -> function to call with its return code and resource usage once it has finished
+        self.usage = {} # process -> its resource usage, as returned by os.wait4
+        self.exited = queue.Queue() # processes which have exited but haven't been dealt with yet.
+        self.done = set() # processes which have been reaped by their thread. Only the thread reaps them, so that
+        # we never signal a process id which the system may already have given to some other process.
+        self.lock = threading.Lock()
+        self.pollInterval = 0.1 # seconds between checks on each process, where os.waitid isn't available
+        self.nStarted = 0
+        self.nFinished = 0
+        self.nKilled = 0
+        self.busyTime = 0.0 # total run time of the processes which have finished, in seconds
+        self.nproc = 1
+        self.t0 = None
+    def start(self, cmd, stdoName, stdeName, cwd, maxTime=None, onExit=None):
+        ''' Start a run of the command cmd (a list of arguments) in the directory cwd, with its standard output and
+            error sent to the files stdoName and stdeName. It's killed if it's still running after maxTime seconds.
+            Once it has finished, onExit (if given) is called with its return code and resource usage (or None if that
+            isn't known).'''
+        with open(stdoName,'w') as stdo:
+            with open(stdeName,'w') as stde:
+                proc = subprocess.Popen(cmd, stdout=stdo, stderr=stde, cwd=cwd)
+        now = time.time()
+        if self.t0 is None:
+            self.t0 = now
+        self.running[proc] = (now, maxTime, stdeName)
+        if onExit is not None:
+            self.onExit[proc] = onExit
+        self.nStarted += 1
+        allProcs.append(proc)
+        allStartTimes.append(now)
+        watcher = threading.Thread(target=self.watch, args=(proc,))
+        watcher.daemon = True
+        watcher.start()
+        return proc
+    def watch(self, proc):
+        try:
+            if hasattr(os, 'waitid'):
+                # Wait for it to exit without reaping it, so it can't be reaped while killOverdue holds the lock.
+                os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+                with self.lock:
+                    self.reap(proc, os.wait4(proc.pid, 0))
+            else: # python 2. Check every so often, so the lock is never held while waiting.
+                while True:
+                    with self.lock:
+                        result = os.wait4(proc.pid, os.WNOHANG)
+                        if result[0] != 0:
+                            self.reap(proc, result)
+                            break
+                    time.sleep(self.pollInterval)
+        except OSError as e:
+            if e.errno != errno.ECHILD:
+                raise
+            # it was reaped elsewhere, e.g. by a call to proc.poll() from outside the scheduler.
+            with self.lock:
+                proc.wait()
+                self.done.add(proc)
+        self.exited.put(proc)
+    def reap(self, proc, result):
+        pid, status, usage = result
+        if os.WIFSIGNALED(status):
+            proc.returncode = -os.WTERMSIG(status)
+        else:
+            proc.returncode = os.WEXITSTATUS(status)
+        self.usage[proc] = usage
+        self.done.add(proc)
+    def finish(self, proc):
+        startTime, _, _ = self.running.pop(proc)
+        self.done.discard(proc)
+        self.nFinished += 1
+        self.busyTime += time.time() - startTime
+        usage = self.usage.pop(proc, None)
+        if proc in self.onExit:
+            self.onExit.pop(proc)(proc.returncode, usage)
+    def waitForOne(self, block=True):
+        ''' Deal with the next process to exit, waiting for it if block is True. If some process reaches its maxTime first,
+            kill it instead. Returns False if nothing was running or nothing had exited yet (with block=False).'''
+        if len(self.running)==0:
+            return False
+        timeout = None
+        deadlines = [startTime+maxTime for startTime,maxTime,_ in self.running.values() if maxTime is not None]
+        if len(deadlines)>0:
+            timeout = max(0.0, min(deadlines)-time.time())
+        try:
+            proc = self.exited.get(block=block, timeout=timeout if block else None)
+        except queue.Empty:
+            if block:
+                self.killOverdue()
+            return False
+        self.finish(proc)
+        return True
+    def killOverdue(self):
+        for proc,(startTime,maxTime,stdeName) in list(self.running.items()):
+            if maxTime is not None and time.time()-startTime > maxTime:
+                with self.lock:
+                    if proc in self.done:
+                        continue # it's exited already, and its thread will hand it to waitForOne.
+                    print ("WARNING: process has reached maximum allowed time of ",maxTime," seconds! Sending the kill signal.")
+                    print (" If you're sure the process should be running longer, increase the maxTime argument of localRun.")
+                    print (" Usually a run this long means something has gone horribly wrong.")
+                    with open(stdeName,'a') as stde:
+                        stde.write('Reached max allowed time '+str(maxTime)+'\n')
+                    os.kill(proc.pid, signal.SIGKILL) # not proc.kill(), which may reap it behind the thread's back.
+                self.nKilled += 1
+                # Don't kill it again while we wait for its thread to notice.
+                self.running[proc] = (startTime, None, stdeName)
+    def waitForSlot(self, nproc):
+        ''' Return as soon as fewer than nproc processes are running. '''
+        self.nproc = nproc
+        while self.waitForOne(block=False):
+            pass
+        if len(self.running) >= nproc:
+            print ("Waiting for a free processor...")
+        while len(self.running) >= nproc:
+            self.waitForOne()
+    def waitForAll(self):
+        ''' Return once every process has finished. '''
+        while len(self.running)>0:
+            nPrev = len(self.running)
+            self.waitForOne()
+            if 0 < len(self.running) < nPrev:
+                print ("Still waiting for ",len(self.running), " processes to finish.")
+    def report(self):
+        ''' Print how many runs have finished, and how well the processors were kept busy. '''
+        if self.t0 is None:
+            return
+        elapsed = time.time()-self.t0
+        print ("Runs finished: ",self.nFinished," of ",self.nStarted," started (",self.nKilled," killed) in ",elapsed," seconds")
+        if self.nFinished>0 and elapsed>0:
+            print ("Throughput: ",self.nFinished*3600.0/elapsed," runs per hour. Mean run time: ",self.busyTime/self.nFinished, \
+                    " seconds. Processor utilization: ",self.busyTime/(elapsed*self.nproc))
+
+localScheduler = Scheduler() # every run started on this machine goes through this scheduler.
+
+inputSuffixes = ['_inputRandomFactors.txt', '_inputRandomFactorsY.txt'] # the input files of a run, besides its arguments
+# the files a run writes, depending on its arguments, including its redirected standard output and error.
+outputSuffixes = ['_comment.txt', '_aux.txt', '_stde.txt', '_radial.dat', '_evolution.dat', '_stars.dat', '_convergence2.dat', \
+        '_LogNormal.dat', '_Bouche09.dat', '_AvgNeistein08.dat', '_ConstAccHistory.dat', '_ConstAccHistory2.dat', \
+        '_stdo.txt', '_stde_aux.txt']
+namedSuffixes = ['_comment.txt', '_aux.txt'] # the output files with the run's name written in them
+
+def argsHash(cmd, bolshoiWeight):
+    ''' A hash of the arguments of the run of cmd (as returned by experiment.runCommand) other than its name, and of its
+        bolshoiWeight, which picks its input random factors. It's known before the run has been prepared. '''
+    h = hashlib.sha1()
+    for arg in cmd[2:]: # cmd[1] is the name of the run
+        h.update(arg.encode()+b'\0')
+    h.update(repr(bolshoiWeight).encode())
+    return h.hexdigest()
+
+def inputsHash(cmd, expDir):
+    ''' A hash of the input files in expDir of the run of cmd. '''
+    h = hashlib.sha1()
+    for suffix in inputSuffixes:
+        if os.path.exists(expDir+'/'+cmd[1]+suffix):
+            with open(expDir+'/'+cmd[1]+suffix,'rb') as f:
+                h.update(suffix.encode()+f.read())
+    return h.hexdigest()
+
+class Manifest:
+    ''' The status of every run of an experiment, kept in the runs directory of the experiment's directory. A record is
+        added whenever a run starts or finishes, so if e.g. the machine crashes, we know which runs finished successfully
+        (status 'success'), which didn't ('failed' or 'killed'), and which never finished ('running'). Several processes
+        may run the same experiment (e.g. its shards), so each appends its records to its own file, <host>_<pid>.json, one
+        JSON object per line, and the files are merged when they're read. '''
+    version = 1
+    def __init__(self, expDir):
+        self.directory = expDir+'/runs'
+        self.filename = self.directory+'/'+socket.gethostname()+'_'+str(os.getpid())+'.json' # where this process adds its records
+        self.runs = {} # name of each run -> dict of its args hash, status, exit code, wall time, and successCode
+        self.read()
+    def read(self):
+        ''' Merge the records of every process into self.runs, oldest first. '''
+        records = []
+        for fn in sorted(glob.glob(self.directory+'/*.json')):
+            with open(fn,'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError: # e.g. the last line of a process which was killed while writing it
+                        print ("WARNING: ignoring an unreadable line in ",fn)
+                        continue
+                    if record.get('version') == self.version:
+                        records.append(record)
+        for record in sorted(records, key=lambda record: record['time']):
+            self.runs.setdefault(record['name'], {}).update(record['entries'])
+    def update(self, name, **entries):
+        self.runs.setdefault(name, {}).update(entries)
+        makeDirectory(self.directory)
+        with open(self.filename,'a') as f:
+            f.write(json.dumps(dict(version=self.version, time=time.time(), name=name, entries=entries), sort_keys=True)+'\n')
+    def succeeded(self, name, hash):
+        ''' Whether the run name, with the given args hash, has finished successfully. '''
+        return name in self.runs and self.runs[name].get('status')=='success' and self.runs[name].get('argsHash')==hash
+
+def makeDirectory(directory):
+    ''' Make directory, unless it exists already, e.g. because another process just made it. '''
+    if not os.path.exists(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+
+allManifests={} # experiment directory -> its Manifest
+
+def getManifest(expDir):
+    if expDir not in allManifests:
+        allManifests[expDir] = Manifest(expDir)
+    return allManifests[expDir]
+
+class RunStore:
+    ''' Remembers every run of the gidget code which finished successfully, keyed by a hash of everything which determines
+        its output: its arguments other than its name, its input random factors, and the binary itself. A run with the same
+        key as one the store already knows about reuses that run's output (hard-linked under the new run's name) instead of
+        being run again. Summaries of a run written afterwards, e.g. the _sampleInfo.txt files of the MCMC drivers, can be
+        added to its record with addSummary, and are reused (copied) in the same way if the run's own output has been
+        deleted. The size and modification time of every file are recorded, and a file which has changed since isn't
+        reused. Since their files may be shared, runs are always started with their old output removed (see startRun). '''
+    def __init__(self, directory):
+        self.directory = directory
+        self.binaryHashes = {} # path -> (mtime, size, hash of the binary's contents)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+    def binaryHash(self, binary):
+        stat = os.stat(binary)
+        if binary not in self.binaryHashes or self.binaryHashes[binary][:2] != (stat.st_mtime, stat.st_size):
+            with open(binary,'rb') as f:
+                self.binaryHashes[binary] = (stat.st_mtime, stat.st_size, hashlib.sha1(f.read()).hexdigest())
+        return self.binaryHashes[binary][2]
+    def key(self, cmd, expDir, hash):
+        ''' The key of the run of cmd, as returned by experiment.runCommand, whose input files are in expDir, and whose
+            argsHash is hash. '''
+        return hashlib.sha1((self.binaryHash(cmd[0])+hash+inputsHash(cmd, expDir)).encode()).hexdigest()
+    def recordName(self, key):
+        return self.directory+'/'+key+'.json'
+    def prefixName(self, prefix):
+        return self.directory+'/prefix_'+hashlib.sha1(prefix.encode()).hexdigest()+'.txt'
+    def load(self, key):
+        if not os.path.exists(self.recordName(key)):
+            return None
+        with open(self.recordName(key),'r') as f:
+            return json.load(f)
+    def save(self, key, record):
+        # Write to a temporary file and rename it, so that another process never reads half of a record.
+        tmp = self.recordName(key)+'.'+str(os.getpid())+'.tmp'
+        with open(tmp,'w') as f:
+            json.dump(record, f)
+        os.rename(tmp, self.recordName(key))
+    def remember(self, key, expDir, name, returncode):
+        ''' Record the output of the run name in expDir, if it finished successfully. '''
+        if returncode != 0:
+            return
+        prefix = expDir+'/'+name
+        suffixes = [suffix for suffix in outputSuffixes if os.path.exists(prefix+suffix)]
+        record = {'prefix':prefix, 'name':name, 'suffixes':suffixes, 'stats':[fileStat(prefix+suffix) for suffix in suffixes], 'summaries':[]}
+        self.save(key, record)
+        self.rememberPrefix(key, prefix)
+    def rememberPrefix(self, key, prefix):
+        with open(self.prefixName(prefix),'w') as f:
+            f.write(key)
+    def forgetPrefix(self, prefix):
+        # the run at prefix is being run again, so whatever it was before no longer applies.
+        if not os.path.exists(self.prefixName(prefix)):
+            return
+        with open(self.prefixName(prefix),'r') as f:
+            key = f.read()
+        record = self.load(key)
+        if record is not None:
+            if record['prefix']==prefix:
+                os.remove(self.recordName(key))
+            else:
+                record['summaries'] = [summary for summary in record['summaries'] if summary[0]+'/'+summary[1]!=prefix]
+                self.save(key, record)
+        os.remove(self.prefixName(prefix))
+    def addSummary(self, expDir, name, filename):
+        ''' Add the file filename, a summary of the run name in expDir, to its record. filename has to be name followed
+            by a suffix, e.g. name_sampleInfo.txt, in expDir or some directory relative to it. The summary of a reused run
+            is written to the same place relative to the new run's expDir, with name replaced by the new run's name. '''
+        directory, base = os.path.split(filename)
+        if not base.startswith(name):
+            print ("WARNING: not keeping the summary ",filename," of ",name,", since its name doesn't start with the run's name.")
+            return
+        if not os.path.exists(self.prefixName(expDir+'/'+name)):
+            return
+        with open(self.prefixName(expDir+'/'+name),'r') as f:
+            key = f.read()
+        record = self.load(key)
+        summary = [expDir, name, os.path.relpath(directory, expDir), base[len(name):], fileStat(filename)]
+        if record is not None and summary not in record['summaries']:
+            record['summaries'] = [old for old in record['summaries'] if old[:4]!=summary[:4]]+[summary]
+            self.save(key, record)
+    def reuse(self, key, expDir, name):
+        ''' If the store has a run with this key, give its output (or failing that, its summaries) to the run name in
+            expDir. Returns 'output', 'summary', or None if there was nothing to reuse. '''
+        record = self.load(key)
+        if record is None:
+            return None
+        oldPrefix = record['prefix']
+        summaries = [(oldName, os.path.normpath(os.path.join(oldExpDir, relDir, oldName+suffix)), \
+                os.path.normpath(os.path.join(expDir, relDir, name+suffix)), stat) for oldExpDir,oldName,relDir,suffix,stat in record['summaries']]
+        summaries = [(oldName,src,dst) for oldName,src,dst,stat in summaries if fileStat(src)==stat]
+        if len(record['suffixes'])>0 and all([fileStat(oldPrefix+suffix)==stat for suffix,stat in zip(record['suffixes'],record['stats'])]):
+            pairs = [(record['name'], oldPrefix+suffix, expDir+'/'+name+suffix) for suffix in record['suffixes']]
+            result = 'output'
+        elif len(summaries)>0:
+            pairs = summaries
+            result = 'summary'
+        else:
+            return None
+        # so that summaries of this run can be added to the record too.
+        self.rememberPrefix(key, expDir+'/'+name)
+        for oldName,src,dst in pairs:
+            if src==dst:
+                continue
+            if os.path.exists(dst):
+                os.remove(dst)
+            if result=='output' and src.endswith(tuple(namedSuffixes)):
+                renameRun(src, dst, oldName, name)
+            elif result=='summary':
+                shutil.copy(src, dst) # summaries are often rewritten in place, which would change every linked copy.
+            else:
+                try:
+                    os.link(src, dst)
+                except OSError:
+                    shutil.copy(src, dst)
+        return result
+
+def fileStat(fn):
+    ''' The size and modification time of the file fn, or None if it doesn't exist. '''
+    if not os.path.exists(fn):
+        return None
+    stat = os.stat(fn)
+    return [stat.st_size, stat.st_mtime]
+
+def renameRun(src, dst, oldName, name):
+    ''' Copy the _comment.txt or _aux.txt file src, written by the run oldName, to dst, with the run's name changed to
+        name. The name is on the second line, and is the second argument in the command line on the last line. '''
+    with open(src,'r') as f:
+        lines = f.readlines()
+    if len(lines)>1 and lines[1].strip()==oldName:
+        lines[1] = name+'\n'
+    if len(lines)>2:
+        args = lines[-1].split(' ')
+        if len(args)>1 and args[1]==oldName:
+            args[1] = name
+            lines[-1] = ' '.join(args)
+    with open(dst,'w') as f:
+        f.writelines(lines)
+
+useRunStore = True # set to False to run everything, even runs which have been done before.
+
+def getRunStore():
+    ''' The RunStore shared by every experiment, kept in $GIDGETDIR/runstore. '''
+    global globalRunStore
+    if 'globalRunStore' not in globals():
+        globalRunStore = RunStore(os.environ['GIDGETDIR']+'/runstore')
+    return globalRunStore
+
+telemetryDir = None # where recordTelemetry keeps its files; $GIDGETDIR/runTelemetry if None.
+telemetryParams = ['nx','Mh0','Noutputs','TOL'] # the parameters recorded along with each run's resource usage
+
+def countSteps(fn):
+    ''' The number of complete timesteps in the _evolution.dat file fn, or None if it can't be read. '''
+    try:
+        size = os.path.getsize(fn)
+        with open(fn,'rb') as f:
+            start = f.read(8)
+            if start == b'GIDGETV2':
+                version, ncol, nrow, nsteps, headerSize = struct.unpack('5i', f.read(20))
+                return min(nsteps, (size-headerSize)//(8*ncol*nrow))
+            ncol, = struct.unpack('i', start[:4])
+            return (size-4)//(8*ncol)
+    except (OSError, struct.error, ZeroDivisionError):
+        return None
+
+telemetryColumns = ['time', 'host', 'expDir', 'name', 'status', 'exitCode', 'wallTime', 'userTime', 'systemTime', 'maxRSS', \
+        'outputBytes', 'nsteps'] + telemetryParams # maxRSS is in kilobytes on linux.
+
+def telemetryDirectory():
+    if telemetryDir is None:
+        return os.environ['GIDGETDIR']+'/runTelemetry'
+    return telemetryDir
+
+def recordTelemetry(expDir, name, status, returncode, wallTime, usage, params):
+    ''' Add a row to the telemetry for the run name in expDir: how it ended, the wall time, CPU time and peak memory it
+        took, the size of its output, how many timesteps it got through, and the parameters telemetryParams (from the dict
+        params), so that the cost of runs can be modelled, e.g. to size job allocations. Each process appends its rows to
+        its own file, <host>_<pid>.csv in telemetryDirectory(), since file locking can't be trusted on the shared
+        filesystems of a cluster. '''
+    outputBytes = sum([os.path.getsize(fn) for fn in glob.glob(expDir+'/'+name+'_*') if os.path.isfile(fn)])
+    row = [time.time(), socket.gethostname(), expDir, name, status, returncode, wallTime, \
+            usage.ru_utime if usage is not None else None, usage.ru_stime if usage is not None else None, \
+            usage.ru_maxrss if usage is not None else None, outputBytes, countSteps(expDir+'/'+name+'_evolution.dat')] + \
+            [params.get(param) if params is not None else None for param in telemetryParams]
+    directory = telemetryDirectory()
+    makeDirectory(directory)
+    fn = directory+'/'+socket.gethostname()+'_'+str(os.getpid())+'.csv'
+    isNew = not os.path.exists(fn)
+    with open(fn,'a') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        if isNew:
+            writer.writerow(telemetryColumns)
+        writer.writerow(['' if value is None else value for value in row])
+
+def readTelemetry(directory=None):
+    ''' Read in the telemetry written by recordTelemetry from every process into directory (by default
+        telemetryDirectory()). Returns a list of its rows, oldest first, each a dict from the name of a column to its
+        value, which is None if it wasn't known. '''
+    if directory is None:
+        directory = telemetryDirectory()
+    rows = []
+    for fn in sorted(glob.glob(directory+'/*.csv')):
+        with open(fn,'r') as f:
+            for row in csv.DictReader(f):
+                for column in row.keys():
+                    if row[column] == '':
+                        row[column] = None
+                    elif column not in ['host', 'expDir', 'name', 'status']:
+                        try:
+                            row[column] = int(row[column])
+                        except ValueError:
+                            row[column] = float(row[column])
+                rows.append(dict(row))
+    return sorted(rows, key=lambda row: row['time'])
+
+def startRun(cmd, stdoName, stdeName, expDir, maxTime=None, params=None, bolshoiWeight=None):
+    ''' Start the run of the command cmd, as returned by experiment.prepareRun, whose random factors were picked with
+        bolshoiWeight, with localScheduler. If an identical
+        run has been done before, its output is reused and nothing is started. Returns None if the run was started, or
+        what was reused (see RunStore.reuse). Either way, the run's progress is kept in the experiment's Manifest. Once
+        it has finished, its resource usage is recorded with recordTelemetry, along with params, a dict of (at least) the
+        parameters in telemetryParams. '''
+    name = cmd[1]
+    manifest = getManifest(expDir)
+    hash = argsHash(cmd, bolshoiWeight)
+    if useRunStore:
+        store = getRunStore()
+        key = store.key(cmd, expDir, hash)
+        reused = store.reuse(key, expDir, name)
+        if reused is not None:
+            print ("Reusing the ",reused," of an identical earlier run for ",name)
+            manifest.update(name, argsHash=hash, status='success', exitCode=0, wallTime=0.0, successCode=0, reused=reused)
+            return reused
+        store.forgetPrefix(expDir+'/'+name)
+    # The output of an earlier run of the same name may be hard-linked to other runs by the run store, so it's removed
+    # rather than overwritten.
+    for suffix in outputSuffixes:
+        if os.path.exists(expDir+'/'+name+suffix):
+            os.remove(expDir+'/'+name+suffix)
+    startTime = time.time()
+    def onExit(returncode, usage):
+        wallTime = time.time()-startTime
+        code = successCode(expDir+'/'+name+'_stde.txt')
+        if returncode < 0:
+            status = 'killed'
+            code = 4
+        elif returncode == 0 and code == 0:
+            status = 'success'
+        else:
+            status = 'failed'
+        manifest.update(name, status=status, exitCode=returncode, wallTime=wallTime, successCode=code)
+        if useRunStore:
+            store.remember(key, expDir, name, returncode)
+        try:
+            recordTelemetry(expDir, name, status, returncode, wallTime, usage, params)
+        except Exception as e: # the telemetry is only for our information, so it should never stop the runs.
+            print ("WARNING: failed to record the resource usage of ",name,": ",e)
+    manifest.update(name, argsHash=hash, status='running', exitCode=None, wallTime=None, successCode=None, reused=None)
+    localScheduler.start(cmd, stdoName, stdeName, expDir, maxTime, onExit=onExit)
+    return None
+
 def successCode(filename):
     ''' Given a file assumed to contain the standard error output of
     a run of the gidget code, return 0 for success (file is empty)
@@ -109,6 +613,7 @@ class experiment:
             ctr=ctr+1
         self.expName=name
         self.covariables=np.zeros(len(self.p),int)
+        self.reused={} # name of each run whose output was reused by localRun -> what was reused (see RunStore.reuse)
 
         # store the location of various expected subdirectories in the gidget distribution.
         #self.base=os.getcwd() # Assume we are in the base directory - alter this to /path/to/gidget/directory if necessary
@@ -197,6 +702,70 @@ class experiment:
                     print( "This corresponds to the variables ", covIndicesForThisSet )
                     print( "A set of variables you have asked to covary do not have the same lengths!" )
 
+    def gridAxes(self):
+        ''' The axes of the grid of runs set up by vary(), in the order generatePl() expands them: a list with an
+        entry for each varied parameter (or set of covarying parameters) of the indices of the parameters which
+        change along that axis, and the number of values they take. '''
+        axes=[]
+        for j in range(len(self.p)):
+            if(type(self.p[j])==list):
+                cov = self.covariables[j] # the flag for covarying variables.
+                if(cov!=0):
+                    covIndices = np.where(self.covariables == cov)[0]
+                    # only the first in a set of covarying variables gets an axis; the rest vary along with it.
+                    if(covIndices[0] == j):
+                        axes.append((list(covIndices), len(self.p[j])))
+                else:
+                    axes.append(([j], len(self.p[j])))
+        return axes
+
+    def runCount(self):
+        ''' The number of runs in this experiment, without generating them. '''
+        count=1
+        for indices,n in self.gridAxes():
+            count*=n
+        return count
+
+    def runIndices(self, startAt=0, shard=0, nshards=1):
+        ''' The indices of the runs starting at the "startAt"th, keeping only every nshards-th of them,
+        offset by shard, so that a big grid can be split up between nshards separate machines or jobs. '''
+        return range(startAt + (shard-startAt)%nshards, self.runCount(), nshards)
+
+    def runParameters(self, index, axes=None, base=None):
+        ''' The list of parameters for the index-th run, i.e. self.pl[index] once generatePl() has been run.
+        axes and base (the parameters shared by every run) are worked out if they aren't given. '''
+        if(axes is None):
+            axes = self.gridAxes()
+        if(base is None):
+            base = [self.p_orig[j] if type(self.p[j])==list else self.p[j] for j in range(len(self.p))]
+        a_p = base[:]
+        # The first axis varies fastest from one run to the next.
+        for indices,n in axes:
+            i = index % n
+            index = index // n
+            for j in indices:
+                a_p[j] = self.p[j][i]
+            # append to the name a...z corresponding to the value along this axis, avoiding adding more letters
+            # to distinguish individual models if such a distinction is unnecessary.
+            if(n > 1):
+                # If there are more than 26 variations, add a numeral for each
+                # time we have looped through the alphabet.
+                if(i<=25):
+                    app=''
+                else:
+                    app=str((i-(i%26))/26)
+                a_p[self.keys['name']]+=chr(ord('a')+(i%26))+app
+        return a_p
+
+    def iterPl(self, startAt=0, shard=0, nshards=1):
+        ''' Yield the parameter lists of the runs in this experiment one at a time, in the same order and with the
+        same names as generatePl(), but without holding the whole grid in memory. The runs yielded are those
+        given by runIndices(startAt, shard, nshards). '''
+        axes = self.gridAxes()
+        base = [self.p_orig[j] if type(self.p[j])==list else self.p[j] for j in range(len(self.p))]
+        for index in self.runIndices(startAt, shard, nshards):
+            yield self.runParameters(index, axes, base)
+
     def generatePl(self):
         '''vary() will change a certain element of self.p into a list
         of values for that variable. This method assumes that some
@@ -204,75 +773,10 @@ class experiment:
         expands p into a list of well-defined parameter lists, each
         one of which corresponds to a run of the program. This list can
         then be sent to the xgrid or run on your machine. See other
-        methods for details on how to do that.'''
-        self.pl=[self.p_orig[:]] # in case generatePl() has already been run, reset pl.
-	# for each separate parameter (e.g. number of cells, dissipation rate, etc.)
-        for j in range(len(self.p)): 
-            param = self.p[j] 
-	    # if instead of a single value of the parameter, we have a whole list, create a set of runs
-	    # such that for every previous run we had, we now have len(param) more, each with a different
-	    # value from the list param.
-            if(type(param)==list):
-                covaryOtherVarsWithJ=False
-                varyThisVariable=True # i.e. the variable corresponding to j.
-                cov = self.covariables[j] # the flag for covarying variables.
-                if (cov!=0): # if this parameter (j) is part of a set of covarying parameters...
-                    covIndices = np.where(self.covariables == cov)[0]
-                    # if our current variable, j, is the first in a set of variables we're covarying,
-                    # let's go ahead and vary other the other variables in the same set.
-                    if( covIndices[0] == j ): 
-                        covaryOtherVarsWithJ = True
-                        # whereas if this is not the case, then this variable has already been varied
-                    else:
-                        varyThisVariable = False
-                if(varyThisVariable): 
-                    # make len(param) copies of the current pl
-                    pl2=[]
-                    for i in range(len(param)):
-                        f=copy.deepcopy(self.pl)
-                        pl2.append(f) # pl2 ~ [pl,pl,pl]~[[p,p,p],[p,p,p],[p,p,p]]
-                        # in each copy, set the jth parameter in p to param[i]
-                        for a_p in pl2[i]: # each element is a list of parameters for
-                            a_p[j]=param[i]
-                            if(covaryOtherVarsWithJ): 
-                                for covIndex in covIndices:
-                                    if(covIndex != j): # already taken care of with a_p[j]=...
-                                        #print covIndex, i, len(a_p), len(self.p), len(self.p[covIndex]) 
-                                        a_p[covIndex] = self.p[covIndex][i]
-                	    # in each copy, append to the name a...z corresponding to 
-                            # which copy is currently being edited
-                            if(i<=25):
-                                base='a'
-                                app=''
-                            # If there are more than 26 variations, add a numeral for each
-                            # time we have looped through the alphabet when this number is
-                            # greater than zero.
-                            else:
-                                base='a'
-                                app=str((i-(i%26))/26)
-                            # avoid adding more letters to distinguish individual models
-                            # if such a distinction is unnecessary.
-                            if(len(param) > 1):
-                                # but if such a distinction is necessary, by all means:
-                                a_p[self.keys['name']]+=chr(ord(base)+(i%26))+app
-	                # end loop over p's in pl2[i]
-        	    # end loop over range of this varied parameter
-                    # collapse pl to be a 1d array of p's.
-                self.pl=[element for sub in pl2 for element in sub]
-	    # end of param-being-a-list contingency
-            else : #just a regular non-varying parameter
-                # If the user has used vary() but with N=1, the new argument will
-                # not be a list! In this case, we set this parameter in each element 
-                # of pl to be the value the user picked, instead of the default value.
-                for i in range(len(self.pl)):
-                    if(self.pl[i][j]!=param):
-                        self.pl[i][j]=param
-                    else:
-                        pass # nothing to do- just use default value
-            # end of non-varying parameter contingency 
-        # end of for loop over each parameter.
-
-            
+        methods for details on how to do that. For very large grids,
+        iterPl() yields the same runs one at a time.'''
+        self.pl=list(self.iterPl())
+
     def write(self,name):
         '''Write a text file which can be handled by GridStuffer to
         run the experiment. This consists of a list of lists, each
@@ -284,14 +788,13 @@ class experiment:
         your local xgrid, you use GridStuffer to create a new metajob
         with the "Input File" as the text file, and the "Output Folder"
         as gidget/output'''
-        self.generatePl()
         with open(name,'w') as f:
-            for a_p in self.pl:
+            for ctr,a_p in enumerate(self.iterPl()):
+                if(ctr!=0):
+                    f.write('\n') # no return after the last line
                 f.write('xgrid -job submit -in '+self.bin+' -out '+self.analysis+'/'+self.expName+' ./gidget')
                 for param in a_p:
                     f.write(' '+repr(param))
-                if(self.pl[-1]!=a_p):
-                    f.write('\n') # no return after the last line
         if(os.path.exists(self.analysis+self.expName)):
             print("Warning: this experiment already exists! It would be a good idea to rename your experiment or delete the pre-existing one manually.")
         os.rename(name,self.xgrid+'/'+name) # move the text file to gidget/xgrid
@@ -311,12 +814,16 @@ class experiment:
                 theLists.append(param[:])
         successTable = np.ndarray(shape=tuple(Nvaried[:]),dtype=np.int64)
         successTableKeys = np.zeros(tuple(Nvaried[:]))
+        manifest = Manifest(self.analysis+'/'+self.expName)
         for a_p in self.pl: # for each run..
             successTableKey =[]
             for i in range(len(varied)): # for each parameter that was varied
                 j = varied[i]
                 successTableKey.append(theLists[i].index(a_p[j]))
-            successTable[tuple(successTableKey)] = successCode(self.analysis+'/'+self.expName+'/'+a_p[0]+"_stde.txt")
+            if a_p[0] in manifest.runs and manifest.runs[a_p[0]].get('successCode') is not None:
+                successTable[tuple(successTableKey)] = manifest.runs[a_p[0]]['successCode']
+            else: # not finished, or run before experiments kept a manifest
+                successTable[tuple(successTableKey)] = successCode(self.analysis+'/'+self.expName+'/'+a_p[0]+"_stde.txt")
             successTableKeys[tuple(successTableKey)] = 1#tuple(successTableKey)
         print()
         print( "Success Table:")
@@ -326,160 +833,147 @@ class experiment:
 
 
 
-    def makeList(self):
-        """ This function is under construction. The idea is that when we want to run a large
-          number of experiments in series, we don't want to wait for the first experiment to
-          finish if, say, it is still using up 2 processors but there are 2 other processors free.
-        """
-        self.generatePl()
-        ctr=0
-        binary = self.bin+'/gidget'
-        expDir = self.analysis+'/'+self.expName
-        if(os.path.exists(expDir) and startAt == 0):
-          print( "Cancelling this run! ",self.expName)
-          return ([],[],[])
-        elif(os.path.exists(expDir) and startAt != 0):
-          pass
-        else:
-          os.mkdir(expDir)
-        stdo=[]
-        stde=[]
-        cmds=[]
-        expDirs=[]
-        for a_p in self.pl[startAt:]:
-            ctr += 1
-            tmpap = a_p[:]
-            stdo.append(expDir+'/'+a_p[self.keys['name']]+'_stdo.txt')
-            stde.append(expDir+'/'+a_p[self.keys['name']]+'_stde_aux.txt')
-            cmds.append([binary]+tmpap[:1]+[repr(el) for el in tmpap[1:]])
-            expDirs.append(expDir)
+    def prepareRuns(self, startAt=0, overwrite=False, shard=0, nshards=1, resume=False):
+        ''' Get ready to run this experiment, starting at the "startAt"th run (and keeping only the runs in
+        runIndices(startAt, shard, nshards)): make its directory, and return an iterator over its runs, each
+        of which is set up by prepareRun as it is reached. See pendingRuns for which runs are included. '''
+        return (self.prepareRun(a_p, expDir) for a_p,expDir in self.pendingRuns(startAt, overwrite, shard, nshards, resume))
 
-        return (cmds,stdo,stde,expDirs)
-
-
-    def localRun(self,nproc,startAt,maxTime=7200.0,overwrite=False):
-        ''' Run the specified experiment on this machine,
-        using no more than nproc processors, and starting
-        at the "startAt"th run in the experiment '''
-        self.generatePl()
-        procs=[]
-        startTimes=[]
-        ctr=0
-        global allProcs
-        binary=self.bin+'/gidget'
+    def pendingRuns(self, startAt=0, overwrite=False, shard=0, nshards=1, resume=False):
+        ''' Make this experiment's directory, and return an iterator over the parameters of each of its runs which
+        are to be run, and the directory to run it in, without setting any of them up. If the directory already
+        contains output (and startAt is 0), there are no runs unless overwrite or resume is True. With resume, runs
+        which the experiment's Manifest says have already finished successfully (with the same arguments) are
+        skipped, while failed or unfinished runs are run again. '''
         expDir=self.analysis+'/'+self.expName #directory for output files
         #if(os.path.exists(expDir) and startAt == 0 and not overwrite):
         #print "dbg: ",startAt,overwrite,glob.glob(expDir+'/*comment.txt'),os.path.exists(expDir)
-        if( len(glob.glob(expDir+'/*comment.txt'))!=0 and startAt == 0 and not overwrite ):
+        if( len(glob.glob(expDir+'/*comment.txt'))!=0 and startAt == 0 and not overwrite and not resume ):
             print( "************")
             print( "This directory already contains output. CANCELLING this run!")
             print()
-            return
-        elif(os.path.exists(expDir) and (startAt != 0 or overwrite or len(glob.glob(expDir+'/*comment.txt'))==0)):
+            return iter([])
+        elif(os.path.exists(expDir) and (startAt != 0 or overwrite or resume or len(glob.glob(expDir+'/*comment.txt'))==0)):
             pass # let the user overwrite whatever runs they so desire.
         else:
             os.mkdir(expDir)
+        a_ps = self.iterPl(startAt, shard, nshards)
+        if resume:
+            # decided before prepareRun, so the files of runs which have succeeded are left alone.
+            manifest = getManifest(expDir)
+            a_ps = (a_p for a_p in a_ps if not manifest.succeeded(a_p[self.keys['name']], \
+                    argsHash(self.runCommand(a_p), a_p[self.keys['bolshoiWeight']])))
+        return ((a_p, expDir) for a_p in a_ps)
+
+    def runCommand(self, a_p):
+        ''' The command (a list of arguments) for the run with parameters a_p. '''
+        # Here we exclude the final element of a_p since it corresponds to the variable bolshoiWeight, which
+        # is only used in the python code, not by the C code.
+        return [self.bin+'/gidget']+a_p[:1]+[repr(el) for el in a_p[1:-1]]
+
+    def prepareRun(self, a_p, expDir):
+        ''' Copy the input files the run with parameters a_p needs into expDir. Returns the run's parameters,
+        the command to run, the names of its stdo and stde files, and the directory to run it in. '''
+        tmpap=a_p[:]
+        getBolshoiReader().copynearest(expDir, a_p[self.keys['name']]+'_inputRandomFactors.txt', a_p[self.keys['bolshoiWeight']], np.log10(a_p[self.keys['Mh0']]))
+        try:
+            shutil.copy('Lacey84_table_K.txt', expDir+'/'+'Lacey84_table_K.txt')
+            shutil.copy('Lacey84_table_L.txt', expDir+'/'+'Lacey84_table_L.txt')
+        except:
+            #pdb.set_trace()
+            print( "WARNING: failed to copy Lacey84 files. May need to add a set_trace in exper.py::experiment::prepareRun")
+        return (tmpap, self.runCommand(a_p), expDir+'/'+a_p[self.keys['name']]+'_stdo.txt', expDir+'/'+a_p[self.keys['name']]+'_stde_aux.txt', expDir)
+
+    def runParams(self, a_p):
+        ''' A dict of the parameters of the run with parameters a_p which are recorded in its telemetry. '''
+        return dict([(param, a_p[self.keys[param]]) for param in telemetryParams])
+
+    def makeList(self, startAt=0, overwrite=False):
+        """ The runs of this experiment, starting at the "startAt"th, bundled up for LocalRun, i.e. as lists of
+          the commands, stdo files, stde files, and directories of each run. To run several experiments at once,
+          keeping every processor busy, see JobQueue.
+        """
+        runs = list(self.prepareRuns(startAt, overwrite))
+        cmds = [cmd for _,cmd,_,_,_ in runs]
+        stdo = [stdoName for _,_,stdoName,_,_ in runs]
+        stde = [stdeName for _,_,_,stdeName,_ in runs]
+        expDirs = [expDir for _,_,_,_,expDir in runs]
+        return (cmds,stdo,stde,expDirs)
 
-        for a_p in self.pl[startAt:]:
-            ctr+=1
-            tmpap=a_p[:]
-            globalBolshoiReader.copynearest(expDir, a_p[self.keys['name']]+'_inputRandomFactors.txt', a_p[self.keys['bolshoiWeight']], np.log10(a_p[self.keys['Mh0']]))
-            try:
-                shutil.copy('Lacey84_table_K.txt', expDir+'/'+'Lacey84_table_K.txt')
-                shutil.copy('Lacey84_table_L.txt', expDir+'/'+'Lacey84_table_L.txt')
-            except:
-                #pdb.set_trace()
-                print( "WARNING: failed to copy Lacey84 files. May need to add a set_trace in exper.py::experiment::localRun")
-            with open(expDir+'/'+a_p[self.keys['name']]+'_stdo.txt','w') as stdo:
-                with open(expDir+'/'+a_p[self.keys['name']]+'_stde_aux.txt','w') as stde:
-                    print ("Sending run #",ctr,"/",len(self.pl[startAt:])," , ",tmpap[0]," to a local core.")
-                    #print "Parameters: "
-                    #print [binary]+tmpap[:1]+[repr(el) for el in tmpap[1:]]
-                    os.chdir(expDir)
-                    # Here we exclude the final element of tmpap since it corresponds to the variable bolshoiWeight, which
-                    # is only used in the python code, not by the C code.
-                    procs.append(subprocess.Popen([binary]+tmpap[:1]+[repr(el) for el in tmpap[1:-1]],stdout=stdo,stderr=stde))
-                    cmd = ''
-                    for el in tmpap:
-                        cmd+=str(el)+' '
-                    print ("Using cmd: ",cmd)
-                    allProcs.append(procs[-1])
-                    startTimes.append(time.time())
-                    allStartTimes.append(time.time())
-                    nPrinted=True
+
+    def localRun(self,nproc,startAt,maxTime=7200.0,overwrite=False,shard=0,nshards=1,resume=False):
+        ''' Run the specified experiment on this machine,
+        using no more than nproc processors, and starting
+        at the "startAt"th run in the experiment. Set shard
+        and nshards to run only every nshards-th run, and
+        resume to skip runs which have already succeeded. '''
+        nruns = len(self.runIndices(startAt, shard, nshards))
+        runs = self.prepareRuns(startAt, overwrite, shard, nshards, resume)
+        for ctr,(tmpap,cmd,stdoName,stdeName,expDir) in enumerate(runs):
+            print ("Sending run #",ctr+1,"/",nruns," , ",tmpap[0]," to a local core.")
+            #print "Parameters: "
+            #print [binary]+tmpap[:1]+[repr(el) for el in tmpap[1:]]
+            reused = startRun(cmd, stdoName, stdeName, expDir, maxTime, self.runParams(tmpap), tmpap[self.keys['bolshoiWeight']])
+            if reused is not None:
+                self.reused[tmpap[0]] = reused
+                continue
+            cmdString = ''
+            for el in tmpap:
+                cmdString+=str(el)+' '
+            print ("Using cmd: ",cmdString)
 
             # we've started a process off and running, but there are
             # probably more processes waiting to go. We do not want
             # to exceed the number of processors nproc the user
-            # is willing to let run at once, so let's check what
-            # our processes are up to:
-            while True:
-
-                # Check whether each process has exceeded the max time:
-                for k,proc in enumerate(procs):
-                    if proc.poll()==None:
-                        # The process is still running.
-                        if(time.time() - startTimes[k] > maxTime):
-                            print ("WARNING: process has reached maximum allowed time of ",maxTime," seconds! Sending the kill signal.")
-                            print (" If you're sure the process should be running longer, increase the maxTime argument of localRun.")
-                            print (" Usually a run this long means something has gone horribly wrong.")
-                            with open(expDir+'/'+a_p[self.keys['name']]+'_stde_aux.txt','a') as stde:
-                                stde.write('Reached max allowed time '+str(maxTime)+'\n')
-                            proc.kill()
-
-
-                nStillRunning=HowManyStillRunning(allProcs)
-                nStillRunning2=HowManyStillRunning(procs)
-                #print "dbg2",nStillRunning,nStillRunning2,expDir
-    
-                # if our processors are all booked, wait a minute and try again
-                if(nStillRunning >= nproc):
-                    time.sleep(60) # wait a little bit
-                    if(nPrinted):
-                        print ("Waiting for a free processor...")
-                        nPrinted=False # only print the above message if we haven't seen it since 
-					# a new job has been submitted
-                # whereas if we have free processors, loop back around to submit the next run. 
-                # If there are no more runs, we're done!
-                else:
-                    break
+            # is willing to let run at once, so wait until one of the
+            # processes (from this experiment or any other) finishes.
+            localScheduler.waitForSlot(nproc)
+        # Wait for the last few runs, so they've all been dealt with (e.g. their manifest entries written) once we return.
+        localScheduler.waitForAll()
+
+
+def expectedCost(exper, a_p):
+    ''' A rough guess at the relative run time of the run of the experiment exper with parameters a_p. Each timestep
+        takes time proportional to the number of cells nx, and the timestep itself goes as 1/nx. '''
+    return float(a_p[exper.keys['nx']])**2
+
+class JobQueue:
+    ''' Runs from any number of experiments, which are all run on this machine together so that no processor sits idle
+        while one experiment waits on its last few runs. Runs are started in order of priority (highest first), and then
+        of expected cost (largest first), so that the longest runs don't end up being started last. '''
+    def __init__(self):
+        self.jobs = [] # (priority, expected cost, order added, experiment, parameters of the run, directory to run it in)
+    def add(self, exper, startAt=0, priority=0, overwrite=False, cost=expectedCost, resume=False):
+        ''' Queue up the runs of the experiment exper, starting at the "startAt"th. cost is a function of the experiment
+            and the parameters of a run which estimates how long it will take, relative to the others. With resume, runs
+            which have already succeeded are left out (see experiment.pendingRuns). Each run is only set up (see
+            experiment.prepareRun) once it's about to start. '''
+        for a_p,expDir in exper.pendingRuns(startAt, overwrite, resume=resume):
+            self.jobs.append((priority, cost(exper, a_p), len(self.jobs), exper, a_p, expDir))
+    def run(self, nproc, maxTime=7200.0):
+        ''' Run everything in the queue, using no more than nproc processors at once, and wait for it all to finish. '''
+        jobs = sorted(self.jobs, key=lambda job: (-job[0], -job[1], job[2]))
+        self.jobs = []
+        for ctr,(priority,cost,_,exper,a_p,expDir) in enumerate(jobs):
+            tmpap,cmd,stdoName,stdeName,expDir = exper.prepareRun(a_p, expDir)
+            print ("Sending run #",ctr+1,"/",len(jobs)," , ",tmpap[0]," to a local core (priority ",priority,", expected cost ",cost,").")
+            reused = startRun(cmd, stdoName, stdeName, expDir, maxTime, exper.runParams(tmpap), tmpap[exper.keys['bolshoiWeight']])
+            if reused is not None:
+                exper.reused[tmpap[0]] = reused
+                continue
+            localScheduler.waitForSlot(nproc)
+        localScheduler.waitForAll()
 
 
 def LocalRun(runBundle,nproc):
     cmds,stdo,stde,expDirs = runBundle
     for i in range(len(cmds)):
-        with open(stdo[i],'w') as stdo_file:
-            with open(stde[i],'w') as stde_file: 
-                os.chdir(expDirs[i])
-                procs.append(subprocess.Popen(cmds[i],stdout=stdo_file,stderr=stde_file))
-                nPrinted=True
-        while True:
-            nStillRunning = HowManyStillRunning(procs)
-            # if our processors are all booked, wait a minute and try again
-            if(nStillRunning >= nproc):
-                time.sleep(10) # wait a little bit
-                if(nPrinted):
-                    print ("Waiting for a free processor...")
-                    nPrinted=False # only print the above message if we haven't seen it since 
-    	                            # a new job has been submitted
-                   # whereas if we have free processors, loop back around to submit the next run. 
-                   # If there are no more runs, we're done!
-            else:
-                break
+        startRun(cmds[i], stdo[i], stde[i], expDirs[i])
+        localScheduler.waitForSlot(nproc)
     # now all of our processes have been sent off
-    nPrev = 0
-    while True:
-        nStillRunning=HowManyStillRunning(procs)
-        # has anything changed since the last time we checked?
-        if(nStillRunning == nPrev and nStillRunning != 0):
-            # do nothing except wait a little bit
-            time.sleep(5)
-        else:
-            nPrev=nStillRunning
-            if(nPrev == 0):
-               break # we're done!
-            print ("Still waiting for ",nPrev, " processes to finish; I'll check every few seconds for changes.")
+    localScheduler.waitForAll()
     print ("Local run complete!")
+    localScheduler.report()
 
 
 def GetScaleLengths(N,median=0.045,scatter=0.5,Mh0=1.0e12,sd=100,lower=0.0,upper=1.0e3,multiple=1.0):
@@ -753,6 +1247,7 @@ if __name__ == "__main__":
     parser.add_argument('--nproc',type=int,help="maximum number of processors to use (default: 16)",default=16)
     parser.add_argument('--start',metavar='startingModel',type=int,
                    help='The number of the model in the experiment (as ordered by GeneratePl) at which we will start sending experiments to the processors to run. (default: 0)',default=0)
+    parser.add_argument('--resume',action='store_true',help="skip runs which have already finished successfully, and rerun the rest (default: False)")
     parser.add_argument('--xgrid',type=bool,help="run on an xGrid (requires the user to submit the generated file to an xGrid (default: False)",default=False)
     args = parser.parse_args()
     
@@ -1227,8 +1722,8 @@ if __name__ == "__main__":
     re51[0].irregularVary('NChanges', 301)
     #re51[0].vary('whichAccretionHistory',-340,-101,240,0,5)
     re51[0].irregularVary('whichAccretionHistory',-413)
-    #re51[0].irregularVary('bolshoiWeight', bolshoiSize/4)
-    bolweights = bolshoiSize * np.random.random(size=len(Mhz0))
+    #re51[0].irregularVary('bolshoiWeight', getBolshoiSize()/4)
+    bolweights = getBolshoiSize() * np.random.random(size=len(Mhz0))
     re51[0].irregularVary('bolshoiWeight', [int(bolweights[i]) for i in range(len(bolweights))], 5)
 
     # re54 is very similar to those above, but now fed with the ordinary Bouche accretion history ----------- this is also a good experiment: old-school variations in accretion histories to verify that our method of constructing them from multidark is reasonable.
@@ -1270,8 +1765,8 @@ if __name__ == "__main__":
     re54[0].irregularVary('NChanges', 301)
     #re54[0].vary('whichAccretionHistory',-340,-101,240,0,5)
     re54[0].irregularVary('whichAccretionHistory',0)
-    #re54[0].irregularVary('bolshoiWeight', bolshoiSize/4)
-    bolweights = bolshoiSize * np.random.random(size=len(Mhz0))
+    #re54[0].irregularVary('bolshoiWeight', getBolshoiSize()/4)
+    bolweights = getBolshoiSize() * np.random.random(size=len(Mhz0))
     re54[0].irregularVary('bolshoiWeight', [int(bolweights[i]) for i in range(len(bolweights))], 5)
 
 
@@ -1320,8 +1815,8 @@ if __name__ == "__main__":
     re55[0].irregularVary('NChanges', 301)
     #re51[0].vary('whichAccretionHistory',-340,-101,240,0,5)
     re55[0].irregularVary('whichAccretionHistory',-413)
-    #re51[0].irregularVary('bolshoiWeight', bolshoiSize/4)
-    bolweights = bolshoiSize * np.random.random(size=len(Mhz0))
+    #re51[0].irregularVary('bolshoiWeight', getBolshoiSize()/4)
+    bolweights = getBolshoiSize() * np.random.random(size=len(Mhz0))
     re55[0].irregularVary('bolshoiWeight', [int(bolweights[i]) for i in range(len(bolweights))], 5)
 
 
@@ -1369,8 +1864,8 @@ if __name__ == "__main__":
     re56[0].irregularVary('NChanges', 301)
     #re56[0].vary('whichAccretionHistory',-340,-101,240,0,5)
     re56[0].irregularVary('whichAccretionHistory',-413)
-    #re56[0].irregularVary('bolshoiWeight', bolshoiSize/4)
-    bolweights = bolshoiSize * np.random.random(size=len(Mhz0))
+    #re56[0].irregularVary('bolshoiWeight', getBolshoiSize()/4)
+    bolweights = getBolshoiSize() * np.random.random(size=len(Mhz0))
     re56[0].irregularVary('bolshoiWeight', [int(bolweights[i]) for i in range(len(bolweights))], 5)
 
 
@@ -1409,7 +1904,7 @@ if __name__ == "__main__":
         #theExperiment.irregularVary( 'R', list(np.power(reff4/reff4[-1],0.2)*60), 5)
         #theExperiment.irregularVary( 'R', list( np.power(reff4/reff4[-1],1.0)*70* asls/0.042 ) , 5)
         theExperiment.irregularVary( 'R', list( np.power(reff4/reff4[-1],1.0)*50* asls/0.042 ) , 5)
-        #bolweights = bolshoiSize * np.random.random(size=len(Mhz0))
+        #bolweights = getBolshoiSize() * np.random.random(size=len(Mhz0))
         bolweights =  np.random.random(size=len(Mhz0))
         #theExperiment.irregularVary('bolshoiWeight', [int(bolweights[i]) for i in range(len(bolweights))], 5)
         theExperiment.irregularVary('bolshoiWeight', list(bolweights) ,5)
@@ -1474,8 +1969,8 @@ if __name__ == "__main__":
     re57[0].irregularVary('NChanges', 301)
     #re56[0].vary('whichAccretionHistory',-340,-101,240,0,5)
     re57[0].irregularVary('whichAccretionHistory',-413)
-    #re56[0].irregularVary('bolshoiWeight', bolshoiSize/4)
-    bolweights = bolshoiSize * np.random.random(size=len(Mhz0))
+    #re56[0].irregularVary('bolshoiWeight', getBolshoiSize()/4)
+    bolweights = getBolshoiSize() * np.random.random(size=len(Mhz0))
     re57[0].irregularVary('bolshoiWeight', [int(bolweights[i]) for i in range(len(bolweights))], 5)
 
 
@@ -3124,6 +3619,8 @@ if __name__ == "__main__":
     # Probably there are also other possibilities!
 
     ####### IT'S PROBABLY A BAD IDEA TO MODIFY ANYTHING BELOW THIS LINE!!!
+    jobQueue = JobQueue()
+    queuedModels = []
     for inputString in modelList: # aModelName will therefore be a string, obtained from the command-line args
 
 
@@ -3134,27 +3631,19 @@ if __name__ == "__main__":
             for model in matches: #if(model in allModels): 
                 print ("dbg0",inputString,matches)
                 if(not args.xgrid): #local run
-                    allModels[model].localRun(args.nproc,args.start)
+                    # Runs from every experiment go into one queue, so they can all be run together below.
+                    if model not in queuedModels:
+                        jobQueue.add(allModels[model], args.start, resume=args.resume)
+                        queuedModels.append(model)
                 else: # write a file to run on the xgrid
                     allModels[model].write('runExperiment_'+model+'.txt')
         else:
             print ("You asked me to run ",inputString," but did not define it in the script.")
 
-
-    # now all of our processes have been sent off
-    nPrev = 0
-    while True:
-        nStillRunning=HowManyStillRunning(allProcs)
-        # has anything changed since the last time we checked?
-        if(nStillRunning == nPrev and nStillRunning != 0):
-            # do nothing except wait a little bit
-            time.sleep(2)
-        else:
-            nPrev=nStillRunning
-            if(nPrev == 0):
-                break # we're done!
-            print ("Still waiting for ",nPrev, " processes to finish; I'll check every few seconds for changes.")
+    # now send everything off, and wait for it all to finish
+    jobQueue.run(args.nproc)
     print ("All local runs complete!")
+    localScheduler.report()
 
 
     print ("Time elapsed (seconds): ", time.time()-t0)
@@ -0,0 +1,27 @@
+import subprocess
+import sys
+import argparse
+import numpy as np
+
+# Measure how long it takes a fresh python process to import a module (by default exper), e.g.
+#  $ python importBenchmark.py --budget 1.0
+# Every rank of an MCMC job pays this cost at startup, so importing should do as little work as possible.
+# Python is started and numpy imported before the clock starts. Exits with status 1 if the median
+# import time is over budget.
+
+def importTime(module, n=5):
+    ''' The time in seconds to import module in each of n fresh python processes which have already imported numpy. '''
+    code = "import time; import numpy; t=time.time(); import "+module+"; print(time.time()-t)"
+    return np.array([float(subprocess.check_output([sys.executable, '-c', code]).split()[-1]) for i in range(n)])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure the time to import a module.')
+    parser.add_argument('--module', type=str, default='exper', help="the module to import")
+    parser.add_argument('--n', type=int, default=5, help="the number of times to import it")
+    parser.add_argument('--budget', type=float, default=1.0, help="the maximum acceptable median import time in seconds")
+    args = parser.parse_args()
+    times = importTime(args.module, args.n)
+    print ("Importing ",args.module,": median ",np.median(times)," s, min ",np.min(times)," s, max ",np.max(times)," s (budget ",args.budget," s)")
+    if np.median(times) > args.budget:
+        print ("Over budget!")
+        sys.exit(1)
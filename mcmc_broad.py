@@ -77,8 +77,7 @@ runnumber = 0
 #                for line in collectlines:
 #                    ff.write(line)
 
-globalBolshoiReader = bolshoireader.bolshoireader('rf_registry4.txt',3.0e11,3.0e14, bolshoidir)
-bolshoiSize =  len(globalBolshoiReader.keys)
+# The bolshoireader is exper.getBolshoiReader(), made the first time it's used.
 
 globalPrior = analyticDistributions.jointDistribution(\
         [ analyticDistributions.simpleDistribution( 'loguniform', [haloMassMin, haloMassMax], 'Mh0'), \
@@ -283,7 +282,7 @@ def lnlikelihoodRehash(emceeparams, modelname=None):
         return 0 # something strange has happened.
 
     output = readoutput.Experiment(name)
-    output.read(keepOnly=['vPhi','col','colst','ageSt','Z'])
+    output.read(keepOnly=['vPhi','col','colst','ageSt','Z'], cache=True)
 
 
 
@@ -300,7 +299,7 @@ def lnlikelihoodRehash(emceeparams, modelname=None):
     # read the results of the model
     output = readoutput.Experiment(name)
     # ... but only keep the radial functions to which we will compare real data.
-    output.read(keepOnly=['vPhi'])
+    output.read(keepOnly=['vPhi'], lazy=True)
 
 
     successfullyRun=1
@@ -326,6 +325,9 @@ def lnlikelihood(emceeparams, modelname=None):
 
         # run the experiment.
         expertorun.localRun(1,0,maxTime=3600*2)
+        # an identical model has been run and summarized before, and its summary copied to this model's _sampleInfo.txt
+        if expertorun.reused.get(name) == 'summary':
+            return 0.0
     else:
         name = modelname
 
@@ -333,7 +335,7 @@ def lnlikelihood(emceeparams, modelname=None):
     output = readoutput.Experiment(name)
     # ... but only keep the radial functions to which we will compare real data.
     radialVars = ['vPhi', 'col', 'colst', 'colsfr', 'Z', 'ageRadial']
-    output.read(keepOnly=radialVars, keepStars=True)
+    output.read(keepOnly=radialVars, keepStars=True, lazy=True, redshifts=[0,1,2,3])
 
 
     successfullyRun=1
@@ -360,6 +362,8 @@ def lnlikelihood(emceeparams, modelname=None):
     # 200 + 1 + 24
     outputList = list(emceeparams)+[successfullyRun]+list(toFit)
     np.savetxt( analysisdir+'/'+name+'_sampleInfo.txt', outputList )
+    # keep the summary of this model, so that it can be reused once the output below has been removed.
+    exper.getRunStore().addSummary( analysisdir+name, name, analysisdir+'/'+name+'_sampleInfo.txt' )
 
 
     # shutil.rmtree( analysisdir+'/'+name+'/' )
@@ -998,7 +1002,7 @@ if __name__=="__main__":
 #            0.4, .23,  # conRF, muFgScaling,
 #            .002, # ZIGM, 
 #            8, 220, .5, # R0, V0, epsAcc 
-#            3.0, bolshoiSize/2] # systematicVphiError, bolshoiWeight
+#            3.0, exper.getBolshoiSize()/2] # systematicVphiError, bolshoiWeight
 
    
     #run(400, nwalkers=1024,p00=xmax) 
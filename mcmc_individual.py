@@ -303,7 +303,7 @@ def lnlikelihood(emceeParams):
     experToRun.localRun(1,0,maxTime=3600)
 
     output = readoutput.Experiment(name)
-    output.read(keepOnly=['vPhi','colst'])
+    output.read(keepOnly=['vPhi','colst'], lazy=True, narrow=True)
 
 
     if len(output.models)==0:
@@ -311,7 +311,7 @@ def lnlikelihood(emceeparams, modelname=None):
     # read the results of the model
     output = readoutput.Experiment(name)
     # ... but only keep the radial functions to which we will compare real data.
-    output.read(keepOnly=['vPhi','colst','colH2','colHI'])
+    output.read(keepOnly=['vPhi','colst','colH2','colHI'], lazy=True)
 
 
     if len(output.models)==0:
@@ -18,9 +18,9 @@ c = 2.99792458e10
 
 class halo:
     def __init__(self,mass,z, cos, crf):
-        zz = z
-        if zz<0:
-            zz=0 # Floor z at 0.
+        ''' mass, z and crf may be arrays, e.g. of shape (nt,1) for a halo at each timestep of a model, in which case
+            mInterior, g and rho broadcast them against r, so mInterior(r) with r of shape (nx,) gives an (nt,nx) array.'''
+        zz = np.maximum(z, 0) # Floor z at 0.
         self.mass=mass # Msun
         self.crf = crf
         self.radius = (mass * gpermsun * 3.0/(4.0*np.pi*200.0*cos.rhocrit(zz)))**(1.0/3.0) / cmperkpc # kpc
@@ -31,17 +31,20 @@ class halo:
         a = 0.520 + (0.905 - 0.520)*np.exp(-0.617*zz**1.21)
         b = -0.101 + 0.026*zz
         self.c200 = 10.0 ** (a+b*m + crf)
-        if self.c200!=self.c200:
+        if np.any(self.c200!=self.c200):
             pdb.set_trace()
         self.alpha = 0.0095*nu*nu + 0.155
+        # None of the Einasto profile's normalization depends on r, so work it out once here rather than in every call to mInterior.
+        c200 = self.c200
+        alpha = self.alpha
+        self.rScale = self.radius*cmperkpc / c200
+        self.mNorm = 2.0**(2.0-3.0/alpha)*np.exp(2.0/alpha)*np.pi*alpha**(+3./alpha-1.0)*self.rScale**3.0*scipy.special.gamma(3.0/alpha)
+        self.rhoScale = self.mass/( self.mNorm*( scipy.special.gammainc(3.0/alpha, 2.0*(c200**alpha)/alpha))/gpermsun)
     def mInterior(self,r):
         # r in kpc
-        c200 = self.c200
-        rScale = self.radius*cmperkpc / c200
         alpha = self.alpha
-        self.rhoScale = self.mass/( 2.0**(2.0-3.0/alpha)*np.exp(2.0/alpha)*np.pi*alpha**(+3./alpha-1.0)*rScale*rScale*rScale*scipy.special.gamma(3.0/alpha)*( scipy.special.gammainc(3.0/alpha, 2.0*(c200**alpha)/alpha))/gpermsun)
-        val = self.rhoScale* 2.0**(2.0-3.0/alpha)*np.exp(2.0/alpha)*np.pi*alpha**(+3./alpha-1.0)*rScale*rScale*rScale* scipy.special.gamma(3.0/alpha)*( scipy.special.gammainc(3.0/alpha, 2.0*((r*cmperkpc/rScale)**alpha)/alpha))
-        if val!=val:
+        val = self.rhoScale*self.mNorm*( scipy.special.gammainc(3.0/alpha, 2.0*((r*cmperkpc/self.rScale)**alpha)/alpha))
+        if np.any(val!=val):
             pdb.set_trace()
         return val # grams
       #   val = rhoScaleEinasto(Mh,z) * exp( -2.0/alpha * (pow(x[n]*Radius/rScale, alpha) - 1.0) );
@@ -50,8 +53,7 @@ class halo:
         return G*self.mInterior(r)/(r*cmperkpc)**2.0 # cm/s^2
     def rho(self,r):
         ''' Return the density in g/cm**3 of the dark matter halo at the given spherical radius. Expects r in kpc.'''
-        mi = self.mInterior(r)
-        if r>5000:
+        if np.any(r>5000):
             print ("Did you accidentally request halo.rho(r) with r in cm instead of kpc?")
             assert False
         rScale = self.radius / self.c200 # kpc
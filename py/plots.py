@@ -23,7 +23,7 @@ def makeThePlots(args):
         print ("Beginning to analyze experiment ",modelName)
         theExp = Experiment(modelName)
         print ("Reading in the experiment keeping: ", args.vsr + balanceArgs + AMargs +MONDargs)
-        theExp.read(args.vsr+balanceArgs+AMargs+MONDargs, keepStars=(args.stellarPops or args.quick), computeFit=args.fit, fh=args.fh)
+        theExp.read(args.vsr+balanceArgs+AMargs+MONDargs, keepStars=(args.stellarPops or args.quick), computeFit=args.fit, fh=args.fh, cache=True)
         nts = int(theExp.models[0].p['Noutputs']+1)
         tis = [nts/5,nts/2,nts]
         if args.scalings or args.genzel:
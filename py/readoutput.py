@@ -2,9 +2,12 @@ import numpy as np
 import pdb
 import struct
 import glob
+import fnmatch
 import os
 import random
 import copy
+import json
+import zlib
 import verticalProfile
 import halo
 from behroozi import *
@@ -31,6 +34,28 @@ Gcgs = 6.67384e-8
 kB = 1.3806488e-16
 gperH = 1.008*1.66053892e-24
 
+# Increment this whenever the way SingleModel.read computes derived quantities changes, so that
+# out-of-date <path>_var.npz caches are ignored.
+varCacheVersion = 3
+
+# While a model is being read in, the unit-converted arrays of its quantities are kept (see convertedArray), since the
+# derived quantities use them over and over. They're thrown away when the model is released, unless this is True.
+keepConverted = False
+
+# The columns of _radial.dat and _evolution.dat, in the order they're written by DiskContents::WriteOutStepFile. Files in
+# the v2 format (see readHeaderV2) carry these names with them, and their columns are put in this order when they're read in.
+radialColumns = ['x', 'tau', 'taup', 'col', 'sig', 'colst', 'sigstR', 'dcoldt', 'dsigdt',
+    'dcolstdt', 'unused', 'Q', 'dZDiskOdtAdv', 'MdotMRI', 'beta', 'uu', 'fg', 'qMostUnstable', 'lambdaT', 'Mt',
+    'dZDiskOdt', 'ZDiskO', 'Qst', 'Qg', 'QR', 'QWS', 'QRW', 'sigstZ', 'colSFR', 'colAccr', 'dQdS', 'dQds',
+    'dQdSerr', 'dQdserr', 'yy', 'torqueErr', 'vrg', 'CuStarsOut', 'Mdot', 'dsigdtTrans', 'dsigdtDdx', 'dsigdtHeat',
+    'dtaupdx', 'dsigdx', 'dsigdtCool', 'dZDiskOdtDiff', 'alpha', 'fH2', 'CumulativeTorqueErr', 'CumulativeTorqueErr2',
+    'd2taudx2', 'CumulativeSF', 'dcoldtIncoming', 'dcoldtOutgoing', 'MassLoadingFactor', 'colvPhiDisk',
+    'colstvPhiDisk', 'ZDiskFe', 'dcolREC', 'dcolIArec', 'dsigdtSN', 'dsigdtAccr']
+evolutionColumns = ['step', 't', 'dt', 'MBulge', 'ZBulgeFe', 'MHalo', 'gasFraction', 'MtMax',
+    'MdotCenter', 'z', 'SFR', 'deltaGasMass', 'deltaStellarMass', 'cumulativeGasMassThroughIB',
+    'cumulativeStellarMassThroughIB', 'cumulativeStarFormationMass', 'cumulativeMassAccreted', 'CumulativeTorque',
+    'Mh', 'MdotAccr', 'MdotAccrInner', 'MdotAccrStars', 'ZBulgeO']
+
 #RedBlueCM = cm = plt.get_cmap('RdBu')
 
 #cm = plt.get_cmap('gist_rainbow')
@@ -66,6 +91,43 @@ def filledPlots(qvecs, perc, thisCM, ax, xx):
 
 
 
+def castIfFits(arr, dtype):
+    ''' arr as an array of the floating point type dtype (e.g. np.float32), unless it isn't floating point to begin with,
+        or some of its values are too large or too small (other than 0) for dtype, in which case it's returned unchanged.'''
+    arr = np.asarray(arr)
+    dtype = np.dtype(dtype)
+    if arr.dtype.kind != 'f' or arr.dtype == dtype:
+        return arr
+    absArr = np.abs(arr[np.isfinite(arr)])
+    if len(absArr)>0 and (np.max(absArr) > np.finfo(dtype).max or np.min(absArr[absArr>0], initial=np.inf) < np.finfo(dtype).tiny):
+        return arr
+    return arr.astype(dtype)
+
+def asDouble(values):
+    ''' values as float64 if they've been stored at lower precision (see castIfFits), so that unit conversions are done in float64.'''
+    if getattr(values, 'dtype', None) == np.float32:
+        return values.astype(np.float64)
+    return values
+
+def convertedArray(var, which):
+    ''' The whole of var.arr (var being a RadialFunction or TimeFunction) in cgs or sensible units, according to which. If
+        var.keepConverted is set (see VarRegistry), this is computed once and kept, read-only, until var.arr is replaced or
+        the conversion factor changes - after changing var.arr in place, call var.clearConverted(). Otherwise, and for
+        arrays stored at reduced precision (see castIfFits), a new array is returned every time.'''
+    conv = var.cgsConv if which=='cgs' else var.sensibleConv
+    if not getattr(var, 'keepConverted', False):
+        return asDouble(var.arr)*conv
+    cache = var.__dict__.setdefault('converted', {})
+    if which in cache:
+        arr, cachedConv, values = cache[which]
+        if arr is var.arr and cachedConv is conv: # conv may be an array, so check it's the same object
+            return values
+    values = asDouble(var.arr)*conv
+    if getattr(var.arr, 'dtype', None) != np.float32 and isinstance(values, np.ndarray):
+        values.setflags(write=False)
+        cache[which] = (var.arr, conv, values)
+    return values
+
 class RadialFunction:
     def __init__(self, arr, name, cgsConv=1.0, sensibleConv=1.0,
             texString='', inner=None, outer=None, log=True, theRange=None):
@@ -89,43 +151,48 @@ class RadialFunction:
     def inner(self,timeIndex=None,cgs=False):
         if(cgs):
             if(timeIndex is not None and hasattr(self.innerVal,"__len__")):
-                return self.innerVal[timeIndex]*self.cgsConv
-            return self.innerVal*self.cgsConv
+                return asDouble(self.innerVal[timeIndex])*self.cgsConv
+            return asDouble(self.innerVal)*self.cgsConv
         else:
             if(timeIndex is not None and hasattr(self.innerVal,"__len__")):
-                return self.innerVal[timeIndex]*self.sensibleConv
-            return self.innerVal*self.sensibleConv
+                return asDouble(self.innerVal[timeIndex])*self.sensibleConv
+            return asDouble(self.innerVal)*self.sensibleConv
     def outer(self,timeIndex=None,cgs=False):
         if(cgs):
             if(timeIndex is not None and hasattr(self.outerVal,"__len__")):
-                return self.outerVal[timeIndex]*self.cgsConv
-            return self.outerVal*self.cgsConv
+                return asDouble(self.outerVal[timeIndex])*self.cgsConv
+            return asDouble(self.outerVal)*self.cgsConv
         else:
             if(timeIndex is not None and hasattr(self.outerVal,"__len__")):
-                return self.outerVal[timeIndex]*self.sensibleConv
-            return self.outerVal*self.sensibleConv
-    def cgs(self,timeIndex=None,locIndex=None):
-        if(timeIndex is None and locIndex is None):
-            return self.arr[:,:]*self.cgsConv
-        elif(timeIndex is not None and locIndex is not None):
-            return self.arr[timeIndex,locIndex]*self.cgsConv
-        elif(timeIndex is not None and locIndex is None):
-            return self.arr[timeIndex,:]*self.cgsConv
-        elif(timeIndex is None and locIndex is not None):
-            return self.arr[:,locIndex]*self.cgsConv
-        else:
-            print( "Something has gone wrong in cgs" )
-    def sensible(self,timeIndex=None,locIndex=None):
+                return asDouble(self.outerVal[timeIndex])*self.sensibleConv
+            return asDouble(self.outerVal)*self.sensibleConv
+    def select(self, values, timeIndex=None, locIndex=None):
         if(timeIndex is None and locIndex is None):
-            return self.arr[:,:]*self.sensibleConv
+            return values[:,:]
         elif(timeIndex is not None and locIndex is not None):
-            return self.arr[timeIndex,locIndex]*self.sensibleConv
+            return values[timeIndex,locIndex]
         elif(timeIndex is not None and locIndex is None):
-            return self.arr[timeIndex,:]*self.sensibleConv
-        elif(timeIndex is None and locIndex is not None):
-            return self.arr[:,locIndex]*self.sensibleConv
+            return values[timeIndex,:]
         else:
-            print ("Something has gone wrong in sensible")
+            return values[:,locIndex]
+    def cgs(self,timeIndex=None,locIndex=None,out=None):
+        ''' The values in cgs units. While the model is being read in (or with keepConverted), the result may be a read-only
+            view of an array that's kept around for the next call; to get a fresh copy, or write into an existing array, pass out.'''
+        if out is not None:
+            return np.multiply(self.select(self.arr,timeIndex,locIndex), self.cgsConv, out=out)
+        return self.select(convertedArray(self,'cgs'),timeIndex,locIndex)
+    def sensible(self,timeIndex=None,locIndex=None,out=None):
+        ''' The values in sensible units - see cgs. '''
+        if out is not None:
+            return np.multiply(self.select(self.arr,timeIndex,locIndex), self.sensibleConv, out=out)
+        return self.select(convertedArray(self,'sensible'),timeIndex,locIndex)
+    def clearConverted(self):
+        self.converted = {}
+    def __getstate__(self):
+        # the converted arrays can always be recomputed, so don't pickle them.
+        state = dict(self.__dict__)
+        state.pop('converted', None)
+        return state
     def atR(self, rNew, rVec, timeIndex, sensible=True):
         #if(len(rVec) != len(self.sensible(timeIndex=timeIndex))):
         #    pdb.set_trace()
@@ -141,6 +208,24 @@ class RadialFunction:
         ret = np.where(rNew > rMax*onesVec, self.outer(timeIndex)*onesVec, ret)
         return ret
 
+    def atRAll(self, rNew, rVec, sensible=True):
+        ''' atR at every timestep at once, for the radii rNew (the same at every timestep). Returns an array of shape (nt, len(rNew)).'''
+        assert len(rVec) == np.shape(self.arr)[1]
+        if(sensible):
+            f = interp1d(rVec,self.sensible(),kind='linear',axis=1,bounds_error=False)
+        else:
+            f = interp1d(rVec,self.cgs(),kind='linear',axis=1,bounds_error=False)
+        ret = f(rNew)
+        ret = np.where(rNew[None,:] < np.min(rVec), np.reshape(self.inner(),(-1,1)), ret)
+        ret = np.where(rNew[None,:] > np.max(rVec), np.reshape(self.outer(),(-1,1)), ret)
+        return ret
+
+    def setPrecision(self, dtype):
+        ''' Store the values with the floating point type dtype where they fit - see castIfFits. '''
+        self.arr = castIfFits(self.arr, dtype)
+        self.innerVal = castIfFits(self.innerVal, dtype)
+        self.outerVal = castIfFits(self.outerVal, dtype)
+
     def range(self):
         if(self.theRange is None):
             return self.theRange
@@ -176,17 +261,31 @@ class TimeFunction:
         self.theRange=theRange
         #if log and not theRange is None:
         #    self.arr=np.clip(self.arr, 0, theRange[1])
-    def cgs(self,timeIndex=None,locIndex=None):
+    def cgs(self,timeIndex=None,locIndex=None,out=None):
+        ''' The values in cgs units. As for RadialFunction, the result may be a read-only view unless out is given.'''
+        if out is not None:
+            return np.multiply(self.arr if timeIndex is None else self.arr[timeIndex], self.cgsConv, out=out)
         if(timeIndex is not None):
-            return self.arr[timeIndex]*self.cgsConv
-        return self.arr * self.cgsConv
-    def sensible(self,timeIndex=None,locIndex=None):
+            return convertedArray(self,'cgs')[timeIndex]
+        return convertedArray(self,'cgs')
+    def sensible(self,timeIndex=None,locIndex=None,out=None):
+        if out is not None:
+            return np.multiply(self.arr if timeIndex is None else self.arr[timeIndex], self.sensibleConv, out=out)
         if(timeIndex is not None):
             try:
-                return self.arr[timeIndex]*self.sensibleConv
+                return convertedArray(self,'sensible')[timeIndex]
             except:
                 pdb.set_trace()
-        return self.arr * self.sensibleConv
+        return convertedArray(self,'sensible')
+    def clearConverted(self):
+        self.converted = {}
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('converted', None)
+        return state
+    def setPrecision(self, dtype):
+        ''' Store the values with the floating point type dtype where they fit - see castIfFits. '''
+        self.arr = castIfFits(self.arr, dtype)
     def range(self):
         if(self.theRange is None):
             return self.theRange
@@ -194,6 +293,177 @@ class TimeFunction:
             return np.percentile(self.arr,(.2,99.8))*sensibleConv
 
 
+class VarRegistry(dict):
+    ''' A dictionary of RadialFunctions and TimeFunctions, most of which are derived from one another.
+        Derived quantities are registered with define() along with the quantities they depend on, and are
+        only computed (once) the first time they're accessed. keys(), "in", len() and iteration only see
+        the quantities which are visible, i.e. every TimeFunction, but only those RadialFunctions which
+        have been kept with keep().'''
+    def __init__(self):
+        dict.__init__(self)
+        self.producers = {} # name -> (names, fn) where fn computes every quantity in names
+        self.kinds = {} # name -> RadialFunction or TimeFunction
+        self.inputs = {} # name -> list of the names of the quantities it's computed from
+        self.columns = {} # name -> list of the columns of the raw dataCube its producer reads directly
+        self.visible = {} # ordered set of the names which show up in keys()
+        self.computing = [] # stack of names currently being computed, to catch circular dependencies
+        self.keepConverted = True # whether the quantities stored here keep their unit-converted arrays (see convertedArray)
+    def define(self, names, kind, inputs, fn, columns=[]):
+        ''' Register fn, a function of no arguments which computes the quantity named names (or each quantity
+            in the list names) from the quantities listed in inputs. fn should either return the new
+            RadialFunction/TimeFunction (a list of them, in the same order as names), or assign them itself.
+            kind is RadialFunction or TimeFunction (or a list of them, in the same order as names).
+            columns lists the columns of SingleModel.dataCube which fn reads itself.'''
+        if not isinstance(names, list):
+            names = [names]
+            kind = [kind]
+        elif not isinstance(kind, list):
+            kind = [kind]*len(names)
+        for name,k in zip(names,kind):
+            self.producers[name] = (names, fn)
+            self.kinds[name] = k
+            self.inputs[name] = list(inputs)
+            self.columns[name] = list(columns)
+            self.visible[name] = None
+    def __missing__(self, key):
+        # dict.__getitem__ ends up here if key has not been computed (or does not exist)
+        if key not in self.producers:
+            raise KeyError(key)
+        if key in self.computing:
+            raise ValueError("Circular dependency while computing "+key+": "+str(self.computing))
+        names, fn = self.producers[key]
+        self.computing.append(key)
+        try:
+            result = fn()
+        finally:
+            self.computing.pop()
+        if result is not None:
+            if len(names)==1:
+                result = [result]
+            for name,value in zip(names,result):
+                value.keepConverted = self.keepConverted
+                dict.__setitem__(self, name, value)
+        return dict.__getitem__(self, key)
+    def __setitem__(self, key, value):
+        if hasattr(value, 'arr') and not hasattr(value, 'keepConverted'):
+            value.keepConverted = self.keepConverted
+        dict.__setitem__(self, key, value)
+        if key not in self.kinds:
+            # Registered quantities are already visible unless they've been hidden by keep()
+            self.visible[key] = None
+    def __delitem__(self, key):
+        if key not in self.visible and not dict.__contains__(self, key):
+            raise KeyError(key)
+        dict.pop(self, key, None)
+        self.visible.pop(key, None)
+        self.producers.pop(key, None)
+    def __contains__(self, key):
+        return key in self.visible
+    def __iter__(self):
+        return iter(list(self.visible.keys()))
+    def __len__(self):
+        return len(self.visible)
+    def keys(self):
+        return self.visible.keys()
+    def values(self):
+        return [self[key] for key in list(self.visible.keys())]
+    def items(self):
+        return [(key,self[key]) for key in list(self.visible.keys())]
+    def get(self, key, default=None):
+        if key in self.visible:
+            return self[key]
+        return default
+    def __reduce__(self):
+        # Only quantities which have already been computed survive pickling/deepcopying.
+        return (VarRegistry, (), dict(keepConverted=self.keepConverted), None, iter([(key,dict.__getitem__(self,key)) for key in self.visible if dict.__contains__(self,key)]))
+    def isComputed(self, key):
+        return dict.__contains__(self, key)
+    def kind(self, key):
+        ''' RadialFunction or TimeFunction, without computing the quantity if possible. '''
+        if key in self.kinds:
+            return self.kinds[key]
+        return type(self[key])
+    def requires(self, names):
+        ''' The names of every quantity needed to compute the quantities in names, including those in names.'''
+        needed = []
+        toCheck = list(names)
+        while len(toCheck)>0:
+            name = toCheck.pop()
+            if name not in needed:
+                needed.append(name)
+                toCheck += self.inputs.get(name, [])
+        return needed
+    def rawColumns(self, names):
+        ''' The columns of the dataCube needed to compute the quantities in names.'''
+        columns = set()
+        for name in self.requires(names):
+            columns.update(self.columns.get(name, []))
+        return sorted(columns)
+    def keep(self, whitelist):
+        ''' Hide every RadialFunction not in whitelist. Hidden quantities can still be computed, e.g. as inputs to others.'''
+        for name in list(self.visible.keys()):
+            if self.kind(name) is RadialFunction and name not in whitelist:
+                del self.visible[name]
+    def evaluate(self):
+        ''' Compute every visible quantity which hasn't been computed yet.'''
+        for name in list(self.visible.keys()):
+            self[name]
+    def release(self):
+        ''' Forget how to compute anything, throwing away hidden quantities and visible ones which were never computed.'''
+        for name in list(dict.keys(self)):
+            if name not in self.visible:
+                dict.pop(self, name)
+        for name in list(self.visible.keys()):
+            if not dict.__contains__(self, name):
+                del self.visible[name]
+        self.producers = {}
+        self.inputs = {}
+        self.columns = {}
+        # the converted arrays would otherwise double or triple the memory the model takes up.
+        self.keepConverted = keepConverted
+        for name in list(dict.keys(self)):
+            var = dict.__getitem__(self, name)
+            var.keepConverted = keepConverted
+            if not keepConverted:
+                var.clearConverted()
+    def setPrecision(self, dtype):
+        ''' Store every quantity computed so far at lower precision, where its values fit. dtype is either a floating point
+            type like np.float32 for every quantity, or a dict from names to types for only some of them.'''
+        for name in list(dict.keys(self)):
+            if isinstance(dtype, dict):
+                if name in dtype:
+                    dict.__getitem__(self, name).setPrecision(dtype[name])
+            else:
+                dict.__getitem__(self, name).setPrecision(dtype)
+
+def varToCache(name, var, arrays):
+    ''' Add the arrays of the RadialFunction or TimeFunction var to the dict arrays, and return a
+        json-serializable dict of everything else needed to reconstruct it with varFromCache. '''
+    arrays[name+'.arr'] = np.asarray(var.arr)
+    meta = dict(kind=type(var).__name__, name=var.name, cgsConv=float(var.cgsConv), sensibleConv=float(var.sensibleConv), \
+            texString=var.texString, log=bool(var.log))
+    if var.theRange is not None:
+        meta['theRange'] = [float(x) for x in var.theRange]
+    if isinstance(var, RadialFunction):
+        arrays[name+'.inner'] = np.asarray(var.innerVal)
+        arrays[name+'.outer'] = np.asarray(var.outerVal)
+    return meta
+
+def varFromCache(name, meta, npz):
+    ''' Reconstruct the RadialFunction or TimeFunction stored by varToCache in the (loaded) npz file npz.'''
+    if meta['kind'] == 'RadialFunction':
+        inner = npz[name+'.inner']
+        outer = npz[name+'.outer']
+        if np.ndim(inner)==0:
+            inner = inner.item()
+        if np.ndim(outer)==0:
+            outer = outer.item()
+        return RadialFunction( npz[name+'.arr'], meta['name'], meta['cgsConv'], meta['sensibleConv'], meta['texString'], \
+                inner=inner, outer=outer, log=meta['log'], theRange=meta.get('theRange'))
+    return TimeFunction( npz[name+'.arr'], meta['name'], meta['cgsConv'], meta['sensibleConv'], meta['texString'], \
+            log=meta['log'], theRange=meta.get('theRange'))
+
+
 class SingleModel:
     def __init__(self,path):
         self.path=path
@@ -268,542 +538,542 @@ class SingleModel:
             sums[ti] = theSum
         return sums
 
-    def read(self, keepOnly=[], keepStars=False, paramsOnly=False, computeFit=False, fh=0.3):
+    def read(self, keepOnly=[], keepStars=False, paramsOnly=False, computeFit=False, fh=0.3, lazy=False, cache=False, incremental=False, narrow=False, redshifts=None, dtype=None):
+        ''' Read in the model. With cache=True, derived quantities are stored in and read back from <path>_var.npz. With narrow=True, only the quantities in keepOnly (and r, rb, dA, rx and dr) are kept,
+            TimeFunctions included, and only the columns of _radial.dat they're computed from are read in.
+            Given a list of redshifts, only the timesteps nearest to each of them are read in, in that order (see selectSteps).
+            With dtype=np.float32 (or a dict of types for particular quantities), everything is still computed in float64,
+            but stored at the lower precision once release() is called, i.e. right away unless lazy or incremental.
+            With lazy or incremental, the model is still being read in until release() is called, so until then cgs() and
+            sensible() may return read-only arrays (see RadialFunction.cgs) - copy them before changing them in place.'''
         print ("Reading in model ",self.path)
-        with open(self.path+'_comment.txt','r') as comment:
-            lines = comment.readlines()
-            # paramnames - copied from exper.py's experiment class.
-            paramnames = ['nx','eta','epsff','tauHeat','analyticQ', \
-                    'cosmologyOn','xmin','NActive','NPassive','vphiR', \
-                    'R','gasTemp','Qlim','fg0','phi0', \
-                    'zstart','tmax','stepmax','TOL','muNorm', \
-                    'muColScaling','b','innerPowerLaw','softening', \
-                    'diskScaleLength','whichAccretionHistory','alphaMRI' \
-                    ,'thickness','migratePassive','fixedQ','kappaMetals', \
-                    'Mh0','minSigSt','NChanges','dbg','accScaleLength', \
-                    'zquench','zrelax','xiREC','RfREC','deltaOmega', \
-                    'Noutputs','accNorm','accAlphaZ','accAlphaMh', \
-                    'accCeiling','fscatter','invMassRatio','fcool', \
-                    'whichAccretionProfile','alphaAccretionProfile', \
-                    'widthAccretionProfile','fH2Min','tDepH2SC','ZIGM','fg0mult','ZIGMfac','chiZslope','deltaBeta','yREC', \
-                    'concentrationRandomFactor','muFgScaling','muMhScaling','ksuppress', 'kpower', \
-                    'MQuench','epsquench','muQuench','stScaleReduction','gaScaleReduction','ZMix', \
-                    'energyInjectionFactor', 'CloudHeatingRate','AccretionHeatingRate']
-            params=[]
-            line = lines[-1] # get the last line
-            tmp = line.split() # split the line into a list of strings
-            for k,pname in enumerate(paramnames):
-                self.p[pname] = float(tmp[k+2]) # k=0 is the run name which we already have
-            #for k,line in enumerate(lines):
-            #    cloc = line.find(':')
-            #    if(cloc != -1):
-            #        params.append(float(line[cloc+1:-1]))
-            for k,p in enumerate(params):
-                self.p[paramnames[k]] = p
-        auxparams=[]
-        with open(self.path+'_aux.txt','r') as aux:
-            lines = aux.readlines()
-            for k,line in enumerate(lines):
-                cloc = line.find(':')
-                if(cloc!=-1):
-                    auxparams.append(float(line[cloc+1:-1]))
-        self.p['md0'] = auxparams[0]
-        self.p['ND08attempts'] = auxparams[1]
-        irfs=[]
-        try:
-            with open(self.path+'_inputRandomFactors.txt','r') as irf:
-                # Record input random factors, if they exist, as x0, x1, ...
-                lines = irf.readlines()
-                for k,line in enumerate(lines):
-                    irfs.append('x'+str(k))
-                    self.p[irfs[-1]] = float(line)
-        except:
-            print ("Failed to read in <path>_inputRandomFactors.txt")
-        irfYs=[]
-        try:
-            with open(self.path+'_inputRandomFactorsY.txt','r') as irfY:
-                # Record input random factors, if they exist, as y0, y1, ...
-                lines = irfY.readlines()
-                for k,line in enumerate(lines):
-                    irfYs.append('y'+str(k))
-                    self.p[irfYs[-1]] = float(line)
-        except:
-            print ("Failed to read in <path>_inputRandomFactorsY.txt")
+        p, pLog = readParams(self.path)
+        self.p.update(p)
         self.pLog={}
         for par in self.p.keys():
-            self.pLog[par] = True # set all parameters to be logarithmic by default
-        # except for the following
-        for par in ['xiREC','b','innerPowerLaw','zrelax','zstart','zquench','concentrationRandomFactor','accAlphZ','accAlphaMh','alphaAccretionProfile','whichAccretionHistory','whichAccretionProfile','concentrationRandomFactor','muFgScaling','ND08attempts','muColScaling']+irfs+irfYs:
-            self.pLog[par] = False
+            self.pLog[par] = True
+        self.pLog.update(pLog)
         if paramsOnly:
             return
+        if redshifts is not None and incremental:
+            raise ValueError("read() can't select redshifts from a model read incrementally: "+self.path)
+        self.incremental = incremental
+        self.dtype = dtype
+        self.readArgs = dict(keepOnly=keepOnly, keepStars=keepStars, computeFit=computeFit, fh=fh, cache=cache and redshifts is None, narrow=narrow)
+        self.evOffset = 0
+        self.radialIndex = []
+        self.header = None
+        self.nsteps = 0
+        self.stepIndices = None
+        self.readSteps()
+        if redshifts is not None:
+            self.selectSteps(redshifts)
+        if incremental and self.nsteps<2:
+            # Nothing much to look at yet - wait for refresh() to find some timesteps.
+            print ("Model ",self.path," has not written enough timesteps yet: ",self.nsteps)
+            self.var=VarRegistry()
+            return
+        self.defineVars(**self.readArgs)
+        if incremental:
+            # Hang on to the raw data so that refresh() can add to it.
+            if not lazy:
+                self.var.evaluate()
+        elif not lazy:
+            self.release()
+    def readSteps(self):
+        ''' Read in the timesteps of _evolution.dat and _radial.dat that have been written since the last call, starting
+            from the byte offsets reached last time. Only timesteps which are complete in both files are taken, so this can be
+            used on a model that is still running. Returns the number of new timesteps.'''
+        nsteps = self.nsteps
+        if nsteps==0:
+            self.header = readHeaderV2(self.path+'_radial.dat')
+        if self.header is not None:
+            return self.readStepsV2()
+        self.radialIndex = radialIndex(self.path+'_radial.dat', index=self.radialIndex)
         with open(self.path+'_evolution.dat','rb') as evolution:
-            ncolev, =struct.unpack('i',evolution.read(4))
-            self.ncolev=ncolev
-            arr = evolution.read()
-            evarray = np.fromstring(arr)
-            self.nsteps = int(len(evarray)/ncolev)
-            try:
-                self.evarray = np.reshape(evarray,(self.nsteps,self.ncolev))
-            except:
-                print ("Failed to reshape array. Off by one error?", np.shape(evarray),self.nsteps,self.ncolev,self.nsteps*self.ncolev,self.path)
-                
-        with open(self.path+'_radial.dat','rb') as radial:
-            dataCube=[]
-            for i in range(self.nsteps):
-                ncolstep, = struct.unpack('i',radial.read(4))
-                nrowstep, = struct.unpack('i',radial.read(4))
-                strSqArr = radial.read(8*ncolstep*nrowstep)
-                sqArr = np.fromstring(strSqArr)
-                dataCube.append(np.reshape(sqArr,(nrowstep,ncolstep)))
-            self.dataCube = np.array(dataCube)
+            if self.evOffset==0:
+                self.ncolev, = struct.unpack('i',evolution.read(4))
+                self.evOffset = 4
+                self.evarray = np.zeros((0,self.ncolev))
+            evolution.seek(self.evOffset)
+            evarray = np.fromfile(evolution)
+        nnew = int(len(evarray)/self.ncolev)
+        if nnew*self.ncolev != len(evarray) and not self.incremental:
+            print ("WARNING: ignoring a partially written timestep in ",self.path+'_evolution.dat', np.shape(evarray), self.ncolev)
+        nnew = min(nnew, len(self.radialIndex)-nsteps)
+        if nnew>0 or nsteps==0:
+            self.evarray = np.concatenate((self.evarray, np.reshape(evarray[:nnew*self.ncolev],(nnew,self.ncolev))))
+            self.evOffset += 8*nnew*self.ncolev
+            self.nsteps = nsteps+nnew
+            # self.dataCube is a view of the file on disk - columns are only read in as they are used below.
+            self.dataCube = memmapRadial(self.path+'_radial.dat', self.nsteps, index=self.radialIndex)
+        return nnew
+    def selectSteps(self, redshifts):
+        ''' Keep only the timestep nearest (in the redshift column of _evolution.dat) to each of redshifts, so that timeIndex=i
+            refers to redshifts[i]. Only those timesteps' blocks of _radial.dat are read from disk, and likewise _stars.dat
+            with keepStars. The indices of the steps in the full run are kept in self.stepIndices. Quantities which involve more
+            than one timestep, i.e. dt, LXProxy, mstarIntegrated, mOut and metalMassCGM (and so metalsCGMpISM), are computed between the selected
+            steps, so they won't agree with a full read. The derived quantities are not cached.'''
+        self.stepIndices = np.array([Nearest(self.evarray[:,9], z)[0] for z in redshifts], dtype=int)
+        self.evarray = self.evarray[self.stepIndices]
+        # Fancy indexing the memmap copies out just these records.
+        self.dataCube = self.dataCube[self.stepIndices]
+        self.nsteps = len(self.stepIndices)
+    def readStepsV2(self):
+        ''' readSteps for a model written in the v2 format. Every timestep is at a known offset, so the files are just
+            mapped again up to the last timestep that's complete in both of them. If _radial.dat is compressed, its timesteps
+            are only decompressed when they're used (see ChunkedArray).'''
+        nsteps = self.nsteps
+        evHeader = readHeaderV2(self.path+'_evolution.dat')
+        if evHeader is None:
+            raise ValueError("_radial.dat is in the v2 format but _evolution.dat is not: "+self.path)
+        self.header = readHeaderV2(self.path+'_radial.dat')
+        self.evHeader = evHeader
+        n = min(self.header['nsteps'], evHeader['nsteps'])
+        self.ncolev = len(evolutionColumns)
+        self.evarray = np.array(memmapV2(self.path+'_evolution.dat', evHeader, n, evolutionColumns)[:,0,:])
+        if self.header['version']==3:
+            self.chunkIndex = chunkIndex(self.path+'_radial.dat', self.header, index=getattr(self, 'chunkIndex', None) if nsteps>0 else None)
+            n = min(n, len(self.chunkIndex))
+            self.evarray = self.evarray[:n]
+            self.dataCube = ChunkedArray(self.path+'_radial.dat', self.header, self.chunkIndex[:n], radialColumns, \
+                    previous=self.dataCube if nsteps>0 else None)
+        else:
+            self.dataCube = memmapV2(self.path+'_radial.dat', self.header, n, radialColumns)
+        self.nsteps = n
+        return n-nsteps
+    def refresh(self, lazy=False):
+        ''' For a model read with read(..., incremental=True), e.g. one that is still running, read in any timesteps written
+            since the last read or refresh. The raw data is appended to, but the derived quantities are all recomputed
+            (only as they're accessed if lazy). With keepStars, the stellar populations are read in again from scratch.
+            Returns the number of new timesteps.'''
+        if not getattr(self, 'incremental', False):
+            raise ValueError("refresh() needs the model to have been read with read(..., incremental=True): "+self.path)
+        nsteps = self.nsteps
+        nnew = self.readSteps()
+        if self.nsteps<2 or (nnew==0 and nsteps>=2):
+            return nnew
+        if getattr(self, 'varCache', None) is not None:
+            self.varCache.close()
+            self.varCache = None
+        self.defineVars(**self.readArgs)
+        if not lazy:
+            self.var.evaluate()
+        return nnew
+    def defineVars(self, keepOnly=[], keepStars=False, computeFit=False, fh=0.3, cache=False, narrow=False):
+        ''' Register every derived quantity in self.var, from self.evarray and self.dataCube. '''
         if keepStars:
-            with open(self.path+'_stars.dat','rb') as stars:
-                for i in range(self.nsteps):
-                    NABp1, = struct.unpack('i', stars.read(4)) # NAgeBins+1
-                    sz, = struct.unpack('i', stars.read(4)) # sps.size()
-                    nnx, = struct.unpack('i', stars.read(4)) # nx
-                    x = np.fromstring(stars.read(8*nnx))
-                    if i==0:
-                        age = np.zeros((NABp1, self.nsteps))
-                        startingAge = np.zeros((NABp1, self.nsteps))
-                        endingAge = np.zeros((NABp1, self.nsteps))
-                        col = np.zeros((NABp1, self.nsteps, nnx))
-                        sigR = np.zeros((NABp1, self.nsteps, nnx))
-                        sigZ = np.zeros((NABp1, self.nsteps, nnx))
-                        ZOst = np.zeros((NABp1, self.nsteps, nnx))
-                        ZFest = np.zeros((NABp1, self.nsteps, nnx))
-                    for j in range(sz):
-                        temp = np.fromstring( stars.read(8*1))
-                        age[j,i] = temp[0]
-                        startingAge[j,i] = np.fromstring(stars.read(8*1))[0]
-                        endingAge[j,i] =np.fromstring( stars.read(8*1))[0]
-                        col[j,i,:] = np.fromstring(stars.read(8*nnx))
-                        sigR[j,i,:] = np.fromstring(stars.read(8*nnx))
-                        sigZ[j,i,:] = np.fromstring(stars.read(8*nnx))
-                        ZOst[j,i,:] = np.fromstring(stars.read(8*nnx))
-                        ZFest[j,i,:] = np.fromstring(stars.read(8*nnx))
+            age, startingAge, endingAge, col, sigR, sigZ, ZOst, ZFest = readStars(self.path+'_stars.dat', self.nsteps, steps=getattr(self, 'stepIndices', None))
+            NABp1 = np.shape(col)[0]
 
         # Alright, at this point we've read in the critical data.
         # Let's try to store it in a more comprehensible manner.
         # Keep in mind that self.dataCube ~ (timestep, nx, var)
         # And self.evarray ~ (timestep, var)
-        self.var={}
+        # Each quantity below is registered along with the names of the quantities it's computed from,
+        # and is only actually computed when it's first needed - see VarRegistry.
+        self.var=VarRegistry()
         starList=[]
 
         if keepStars:
-            ageAccum = np.zeros(np.shape(col[0]))
-            colAccum = np.zeros(np.shape(col[0]))
-            for j in range(NABp1):
+            def defineStars(j):
                 stj=str(j).zfill(2)
-                self.var['colst'+stj] = RadialFunction( copy.deepcopy(col[j]), 'colst'+stj, \
+                self.var.define('colst'+stj, RadialFunction, [], lambda: RadialFunction( copy.deepcopy(col[j]), 'colst'+stj, \
                     self.p['md0']*gpermsun/(self.p['vphiR']*self.p['R']*speryear*1.0e5*cmperkpc), \
                     self.p['md0']*cmperpc*cmperpc/(self.p['vphiR']*self.p['R']*speryear*1.0e5*cmperkpc), \
-                    r'$\Sigma_{*,'+stj+'} (M_\odot\ pc^{-2})$',theRange=[0.5,3000])
-                self.var['sigstR'+stj] = RadialFunction( \
-                        np.copy(sigR[j]*self.p['vphiR']), 'sigstR'+stj, \
-                        1.0e5,1.0, r'$\sigma_{r,*,'+stj+'}$ (km s$^{-1}$)',log=True)
-                self.var['sigstZ'+stj] = RadialFunction( \
-                        np.copy(sigZ[j]*self.p['vphiR']), 'sigstZ'+stj, \
-                        1.0e5,1.0, r'$\sigma_{z,*,'+stj+'}$ (km s$^{-1}$)',log=True)
-                self.var['Zst'+stj] = RadialFunction( \
-                        np.copy(ZFest[j])*1.06+np.copy(ZOst[j])*2.09,'Zst'+stj,cgsConv=1.0,sensibleConv=1.0/.02, \
-                        texString=r'$Z_{*,'+stj+'} (Z_\odot)$')
-                alph = np.log10( np.copy(ZOst[j]) /  np.copy(ZFest[j]))
-                nanalph = np.isnan(alph)
-                alph[nanalph] = -2 # put in a weird value to indicate this is invalid. Should never matter since averages should be multiplied by colst's.
-                self.var['alphaFeSt'+stj] = RadialFunction( \
+                    r'$\Sigma_{*,'+stj+'} (M_\odot\ pc^{-2})$',theRange=[0.5,3000]))
+                self.var.define('sigstR'+stj, RadialFunction, [], lambda: RadialFunction( \
+                        sigR[j]*self.p['vphiR'], 'sigstR'+stj, \
+                        1.0e5,1.0, r'$\sigma_{r,*,'+stj+'}$ (km s$^{-1}$)',log=True))
+                self.var.define('sigstZ'+stj, RadialFunction, [], lambda: RadialFunction( \
+                        sigZ[j]*self.p['vphiR'], 'sigstZ'+stj, \
+                        1.0e5,1.0, r'$\sigma_{z,*,'+stj+'}$ (km s$^{-1}$)',log=True))
+                self.var.define('Zst'+stj, RadialFunction, [], lambda: RadialFunction( \
+                        ZFest[j]*1.06+ZOst[j]*2.09,'Zst'+stj,cgsConv=1.0,sensibleConv=1.0/.02, \
+                        texString=r'$Z_{*,'+stj+'} (Z_\odot)$'))
+                def alphaFeSt():
+                    alph = np.log10( ZOst[j] / ZFest[j] )
+                    nanalph = np.isnan(alph)
+                    alph[nanalph] = -2 # put in a weird value to indicate this is invalid. Should never matter since averages should be multiplied by colst's.
+                    return RadialFunction( \
                         alph,'alphaFeSt'+stj,cgsConv=1.0,sensibleConv=1.0, \
                         texString=r'$[\alpha/\mathrm{Fe}]_{*,'+stj+'} $')
-                self.var['ageSt'+stj] = TimeFunction( \
-                        np.copy(age[j]), 'ageSt'+stj, \
-                        cgsConv = speryear, texString='Age (Gyr)',log=False)
-                self.var['startingAgeSt'+stj] = TimeFunction( \
-                        np.copy(startingAge[j]), 'startingAgeSt'+stj, \
-                        cgsConv = speryear, texString='Age (Gyr)',log=False)
-                self.var['endingAgeSt'+stj] = TimeFunction( \
-                        np.copy(endingAge[j]), 'endingAgeSt'+stj, \
-                        cgsConv = speryear, texString='Age (Gyr)',log=False)
-                starList = starList + [ 'colst'+stj, 'sigstR'+stj, 'sigstZ'+stj, 'Zst'+stj, 'alphaFeSt'+stj, 'ageSt'+stj, 'startingAgeSt'+stj, 'endingAgeSt'+stj ]
-        
-                ageTile = np.tile( self.var['ageSt'+stj].cgs(), (int(self.p['nx']),1) ).T
-                ageAccum += self.var['colst'+stj].cgs()*ageTile
-                colAccum += self.var['colst'+stj].cgs()
-            self.var['ageRadial'] = RadialFunction( ageAccum/colAccum, 'ageRadial', cgsConv=1.0, sensibleConv=1.0/speryear/1.0e9, texString=r'Age at $z=0$ (Gyr)', log=True, theRange=[0, 14])
+                self.var.define('alphaFeSt'+stj, RadialFunction, [], alphaFeSt)
+                self.var.define('ageSt'+stj, TimeFunction, [], lambda: TimeFunction( \
+                        age[j], 'ageSt'+stj, \
+                        cgsConv = speryear, texString='Age (Gyr)',log=False))
+                self.var.define('startingAgeSt'+stj, TimeFunction, [], lambda: TimeFunction( \
+                        startingAge[j], 'startingAgeSt'+stj, \
+                        cgsConv = speryear, texString='Age (Gyr)',log=False))
+                self.var.define('endingAgeSt'+stj, TimeFunction, [], lambda: TimeFunction( \
+                        endingAge[j], 'endingAgeSt'+stj, \
+                        cgsConv = speryear, texString='Age (Gyr)',log=False))
+                return [ 'colst'+stj, 'sigstR'+stj, 'sigstZ'+stj, 'Zst'+stj, 'alphaFeSt'+stj, 'ageSt'+stj, 'startingAgeSt'+stj, 'endingAgeSt'+stj ]
+            for j in range(NABp1):
+                starList = starList + defineStars(j)
+            def ageRadial():
+                ageAccum = np.zeros(np.shape(col[0]))
+                colAccum = np.zeros(np.shape(col[0]))
+                for j in range(NABp1):
+                    stj=str(j).zfill(2)
+                    ageTile = np.tile( self.var['ageSt'+stj].cgs(), (int(self.p['nx']),1) ).T
+                    ageAccum += self.var['colst'+stj].cgs()*ageTile
+                    colAccum += self.var['colst'+stj].cgs()
+                return RadialFunction( ageAccum/colAccum, 'ageRadial', cgsConv=1.0, sensibleConv=1.0/speryear/1.0e9, texString=r'Age at $z=0$ (Gyr)', log=True, theRange=[0, 14])
+            self.var.define('ageRadial', RadialFunction, [name for name in starList if name[:5]=='colst' or name[:5]=='ageSt'], ageRadial)
             starList.append('ageRadial')
-            
 
 
-        self.var['step'] = TimeFunction( \
-                np.copy(self.evarray[:,0]), \
-                'step',1,1,'Number of Steps',log=False)
-        self.var['t'] = TimeFunction(\
-                np.copy(self.evarray[:,1]),'t', \
+
+        self.var.define('step', TimeFunction, [], lambda: TimeFunction( \
+                self.evarray[:,0], \
+                'step',1,1,'Number of Steps',log=False))
+        self.var.define('t', TimeFunction, [], lambda: TimeFunction(\
+                self.evarray[:,1],'t', \
                 2.0*pi*cmperkpc*self.p['R']/(1.0e5*self.p['vphiR']) ,\
                 2.0*pi*cmperkpc*self.p['R']/(1.0e5*self.p['vphiR']*speryear*1.0e9), \
-                'Time since zstart (Gyr)',log=False)
+                'Time since zstart (Gyr)',log=False))
         self.nt = len(self.evarray[:,1])
-        dt = np.abs( self.var['t'].cgs(timeIndex=range(1,self.nt)) - self.var['t'].cgs(timeIndex=range(self.nt-1)) )
-        dt = [dt[0]]+list(dt)
-        self.var['dt'] = TimeFunction( dt, 'dt', cgsConv=1.0, sensibleConv=1.0/speryear, texString=r'$dt$ (yr)')
-        self.var['z'] = TimeFunction(np.copy(self.evarray[:,9]),'z',1,1,'z',log=False)
-        self.var['onePlusZ'] = TimeFunction(self.var['z'].cgs()+1.0, 'onePlusZ', 1, 1, r'$1+z$', log=True)
-        self.var['r'] = RadialFunction( \
+        def dt():
+            dt = np.abs( self.var['t'].cgs(timeIndex=range(1,self.nt)) - self.var['t'].cgs(timeIndex=range(self.nt-1)) )
+            dt = [dt[0]]+list(dt)
+            return TimeFunction( dt, 'dt', cgsConv=1.0, sensibleConv=1.0/speryear, texString=r'$dt$ (yr)')
+        self.var.define('dt', TimeFunction, ['t'], dt)
+        self.var.define('z', TimeFunction, [], lambda: TimeFunction(self.evarray[:,9],'z',1,1,'z',log=False))
+        self.var.define('onePlusZ', TimeFunction, ['z'], lambda: TimeFunction(self.var['z'].cgs()+1.0, 'onePlusZ', 1, 1, r'$1+z$', log=True))
+        self.var.define('r', RadialFunction, [], lambda: RadialFunction( \
                 np.copy(self.dataCube[:,:,0]),'r', \
-                self.p['R']*cmperkpc,self.p['R'],'r (kpc)',log=False)
+                self.p['R']*cmperkpc,self.p['R'],'r (kpc)',log=False), columns=[0])
         dlnx=-log(self.p['xmin'])/(self.p['nx']-1.0)
         nxI = int(self.p['nx'])
         # This assumes the grid is fixed and logarithmic. If the code is modified so that
         # this changes, dx could easily be printed by the code.
-        self.var['dr'] = RadialFunction( \
-                np.copy(self.dataCube[:,:,0]) * dlnx, 'dr', \
-                self.p['R']*cmperkpc,self.p['R'],'$\Delta$r (kpc)')
+        self.var.define('dr', RadialFunction, [], lambda: RadialFunction( \
+                self.dataCube[:,:,0] * dlnx, 'dr', \
+                self.p['R']*cmperkpc,self.p['R'],'$\Delta$r (kpc)'), columns=[0])
         # r on the boundaries between cells (code units, i.e. x=r/R)
-        internalR = np.sqrt(self.dataCube[:,0:-1,0]*self.dataCube[:,1:,0])
-        self.var['rb'] = RadialFunction( \
-            np.column_stack((internalR[:,0]-self.dataCube[:,0,0]*dlnx, \
-                             internalR, \
-                             internalR[:,-1]+self.dataCube[:,-1,0]*dlnx)),
-            'rb',self.p['R']*cmperkpc,self.p['R'],'r border (kpc)',log=False)
+        def internalR():
+            return np.sqrt(self.dataCube[:,0:-1,0]*self.dataCube[:,1:,0])
+        def rbInner():
+            # the inner edge of the innermost cell (code units)
+            return np.sqrt(self.dataCube[:,0,0]*self.dataCube[:,1,0])-self.dataCube[:,0,0]*dlnx
+        def rb():
+            iR = internalR()
+            return RadialFunction( \
+                np.column_stack((iR[:,0]-self.dataCube[:,0,0]*dlnx, \
+                             iR, \
+                             iR[:,-1]+self.dataCube[:,-1,0]*dlnx)),
+                'rb',self.p['R']*cmperkpc,self.p['R'],'r border (kpc)',log=False)
+        self.var.define('rb', RadialFunction, [], rb, columns=[0])
 #        self.var['dA'] = RadialFunction( \
 #                2.0*pi* self.dataCube[:,:,0] *self.dataCube[:,:,0] * sinh(dlnx), 'dA', \
 #                (self.p['R']*cmperkpc)**2.0,self.p['R']**2.0,'$\Delta$A (kpc$^2$)')
-        self.var['MassLoadingFactor'] = RadialFunction( \
+        self.var.define('MassLoadingFactor', RadialFunction, [], lambda: RadialFunction( \
                 np.copy(self.dataCube[:,:,54]),'MassLoadingFactor', \
-                1.0,1.0, r'$\dot{\Sigma}_{out}/\dot{\Sigma}_*^{SF}$')
-        self.var['dA'] = RadialFunction( \
-                pi*(np.power(self.getData('rb',locIndex=range(1,nxI+1),cgs=True),2.0) \
-                - np.power(self.getData('rb',locIndex=range(nxI),cgs=True),2.0)), \
-                'dA',1.0,1.0/cmperkpc**2.0, r'dA (kpc$^{2}$)',inner=pi*np.power(self.getData('rb',locIndex=0,cgs=True),2.0))
-        self.var['col'] =RadialFunction( \
+                1.0,1.0, r'$\dot{\Sigma}_{out}/\dot{\Sigma}_*^{SF}$'), columns=[54])
+        self.var.define('dA', RadialFunction, ['rb'], lambda: RadialFunction( \
+                pi*(np.power(self.var['rb'].cgs(locIndex=range(1,nxI+1)),2.0) \
+                - np.power(self.var['rb'].cgs(locIndex=range(nxI)),2.0)), \
+                'dA',1.0,1.0/cmperkpc**2.0, r'dA (kpc$^{2}$)',inner=pi*np.power(self.var['rb'].cgs(locIndex=0),2.0)))
+        self.var.define('col', RadialFunction, [], lambda: RadialFunction( \
                 np.copy(self.dataCube[:,:,3]),'col', \
                 self.p['md0']*gpermsun/(self.p['vphiR']*self.p['R']*speryear*1.0e5*cmperkpc), \
                 self.p['md0']*cmperpc*cmperpc/(self.p['vphiR']*self.p['R']*speryear*1.0e5*cmperkpc), \
-                r'$\Sigma (M_\odot\ pc^{-2})$',theRange=[0.1,30000])
-        self.var['colvPhiDisk'] =RadialFunction( \
+                r'$\Sigma (M_\odot\ pc^{-2})$',theRange=[0.1,30000]), columns=[3])
+        self.var.define('colvPhiDisk', RadialFunction, [], lambda: RadialFunction( \
                 np.copy(self.dataCube[:,:,55]),'colvPhiDisk', \
                 self.p['md0']*gpermsun/(self.p['vphiR']*self.p['R']*speryear*1.0e5*cmperkpc), \
                 self.p['md0']*cmperpc*cmperpc/(self.p['vphiR']*self.p['R']*speryear*1.0e5*cmperkpc), \
-                r'$\bar{\Sigma} (M_\odot\ pc^{-2})$',theRange=[0.1,30000])
+                r'$\bar{\Sigma} (M_\odot\ pc^{-2})$',theRange=[0.1,30000]), columns=[55])
         # Conversion from code units to Msun/pc^2 for column density-like units
         colSensibleConv = self.p['md0']*cmperpc*cmperpc/(self.p['vphiR']*self.p['R']*speryear*1.0e5*cmperkpc)
-        self.var['colst'] =RadialFunction( \
+        self.var.define('colst', RadialFunction, ['rb'], lambda: RadialFunction( \
                 np.copy(self.dataCube[:,:,5]),'colst', \
                 self.p['md0']*gpermsun/(self.p['vphiR']*self.p['R']*speryear*1.0e5*cmperkpc), \
                 self.p['md0']*cmperpc*cmperpc/(self.p['vphiR']*self.p['R']*speryear*1.0e5*cmperkpc), \
                 r'$\Sigma_* (M_\odot\ pc^{-2})$', \
-                inner=self.evarray[:,3]*2.0*self.p['md0']*self.p['R']*kmperkpc/(speryear*self.p['vphiR']*self.var['rb'].sensible(None,0)**2.0 * pcperkpc**2.0 *colSensibleConv), theRange=[2.0e-2, 1.0e5])
-        self.var['colstvPhiDisk'] =RadialFunction( \
+                inner=self.evarray[:,3]*2.0*self.p['md0']*self.p['R']*kmperkpc/(speryear*self.p['vphiR']*self.var['rb'].sensible(None,0)**2.0 * pcperkpc**2.0 *colSensibleConv), theRange=[2.0e-2, 1.0e5]), columns=[5])
+        self.var.define('colstvPhiDisk', RadialFunction, ['rb'], lambda: RadialFunction( \
                 np.copy(self.dataCube[:,:,56]),'colstvPhiDisk', \
                 self.p['md0']*gpermsun/(self.p['vphiR']*self.p['R']*speryear*1.0e5*cmperkpc), \
                 self.p['md0']*cmperpc*cmperpc/(self.p['vphiR']*self.p['R']*speryear*1.0e5*cmperkpc), \
                 r'$\bar{\Sigma}_* (M_\odot\ pc^{-2})$', \
-                inner=self.evarray[:,3]*2.0*self.p['md0']*self.p['R']*kmperkpc/(speryear*self.p['vphiR']*self.var['rb'].sensible(None,0)**2.0 * pcperkpc**2.0 *colSensibleConv))
-        self.var['sigstR'] = RadialFunction( \
-                np.copy(self.dataCube[:,:,6]*self.p['vphiR']), 'sigstR', \
-                1.0e5,1.0, r'$\sigma_{r,*}$ (km s$^{-1}$)',log=True)
-        self.var['sigstZ'] = RadialFunction( \
-                np.copy(self.dataCube[:,:,27]*self.p['vphiR']), 'sigstZ', \
-                1.0e5,1.0, r'$\sigma_{z,*}$ (km s$^{-1}$)',log=True)
-        self.var['hStars'] = RadialFunction( \
+                inner=self.evarray[:,3]*2.0*self.p['md0']*self.p['R']*kmperkpc/(speryear*self.p['vphiR']*self.var['rb'].sensible(None,0)**2.0 * pcperkpc**2.0 *colSensibleConv)), columns=[56])
+        self.var.define('sigstR', RadialFunction, [], lambda: RadialFunction( \
+                self.dataCube[:,:,6]*self.p['vphiR'], 'sigstR', \
+                1.0e5,1.0, r'$\sigma_{r,*}$ (km s$^{-1}$)',log=True), columns=[6])
+        self.var.define('sigstZ', RadialFunction, [], lambda: RadialFunction( \
+                self.dataCube[:,:,27]*self.p['vphiR'], 'sigstZ', \
+                1.0e5,1.0, r'$\sigma_{z,*}$ (km s$^{-1}$)',log=True), columns=[27])
+        self.var.define('hStars', RadialFunction, ['sigstZ','col','colst'], lambda: RadialFunction( \
                 self.var['sigstZ'].cgs()*self.var['sigstZ'].cgs() / (np.pi*Gcgs*(self.var['col'].cgs()+self.var['colst'].cgs())), \
-                'hStars', cgsConv=1.0, sensibleConv=1.0/cmperpc, texString=r'$h_* (pc)$',log=True, theRange=[1.0,3000.0])
-        self.var['sig'] =RadialFunction( \
-                np.copy(self.dataCube[:,:,4]*self.p['vphiR']),'sig', \
-                1.0e5,1.0, r'$\sigma$ (km s$^{-1}$)',log=True, theRange=[7.0,90.0])
-        self.var['hGas'] = RadialFunction( \
+                'hStars', cgsConv=1.0, sensibleConv=1.0/cmperpc, texString=r'$h_* (pc)$',log=True, theRange=[1.0,3000.0]))
+        self.var.define('sig', RadialFunction, [], lambda: RadialFunction( \
+                self.dataCube[:,:,4]*self.p['vphiR'],'sig', \
+                1.0e5,1.0, r'$\sigma$ (km s$^{-1}$)',log=True, theRange=[7.0,90.0]), columns=[4])
+        self.var.define('hGas', RadialFunction, ['sig','col','sigstZ','colst'], lambda: RadialFunction( \
                 self.var['sig'].cgs()*self.var['sig'].cgs() / (np.pi*Gcgs*(self.var['col'].cgs()+ self.var['sig'].cgs()/self.var['sigstZ'].cgs()*self.var['colst'].cgs())), \
-                'hGas', cgsConv=1.0, sensibleConv=1.0/cmperpc, texString=r'$h_g (pc)$',log=True, theRange=[1.0,3000.0])
-        self.var['maxsig'] = TimeFunction(np.amax(self.dataCube[:,:,4]*self.p['vphiR'],axis=1), \
-                'maxsig',1.0e5,1.0,r'$\max(\sigma)$',log=True, theRange=[5,110])
-        self.var['avgsig'] = TimeFunction(np.sum( self.var['sig'].sensible()*self.var['dA'].sensible()*self.var['col'].sensible(), axis=1 )/np.sum(self.var['dA'].sensible()*self.var['col'].sensible(), axis=1), 'avgsig', sensibleConv=1.0, cgsConv=1.0e5, texString=r'$\langle\sigma\rangle$')
-        self.var['mdotBulgeG'] = TimeFunction(np.copy(self.evarray[:,8]),'mdotBulgeG', \
-                self.p['md0']*gpermsun/speryear,self.p['md0'],r'$\dot{M}_{\mathrm{Bulge}\ \mathrm{(gas)}} (M_\odot/yr)$', theRange=[1.0e-7,100])
-        self.var['mdotAccr'] = TimeFunction( \
-                self.evarray[:,19],'mdotAccr',  gpermsun/speryear,1.0,r'$\dot{M}_\mathrm{ext}$')
-        self.var['mdotAccrSt'] = TimeFunction( \
-                self.evarray[:,21],'mdotAccrSt',gpermsun/speryear,1.0,r'$\dot{M}_{*,\mathrm{ext}} (M_\odot/\mathrm{yr})$')
-        self.var['mergerFraction'] = TimeFunction( \
-                self.var['mdotAccrSt'].sensible()/self.var['mdotAccr'].sensible(), 'mergerFraction', 1.0, 1.0, r'$\dot{M}_{*,\mathrm{ext}}/\dot{M}_\mathrm{ext}$', log=False)
-        self.var['feedingEfficiency'] = TimeFunction( \
+                'hGas', cgsConv=1.0, sensibleConv=1.0/cmperpc, texString=r'$h_g (pc)$',log=True, theRange=[1.0,3000.0]))
+        self.var.define('maxsig', TimeFunction, [], lambda: TimeFunction(np.amax(self.dataCube[:,:,4]*self.p['vphiR'],axis=1), \
+                'maxsig',1.0e5,1.0,r'$\max(\sigma)$',log=True, theRange=[5,110]), columns=[4])
+        self.var.define('avgsig', TimeFunction, ['sig','dA','col'], lambda: TimeFunction(np.sum( self.var['sig'].sensible()*self.var['dA'].sensible()*self.var['col'].sensible(), axis=1 )/np.sum(self.var['dA'].sensible()*self.var['col'].sensible(), axis=1), 'avgsig', sensibleConv=1.0, cgsConv=1.0e5, texString=r'$\langle\sigma\rangle$'))
+        self.var.define('mdotBulgeG', TimeFunction, [], lambda: TimeFunction(self.evarray[:,8],'mdotBulgeG', \
+                self.p['md0']*gpermsun/speryear,self.p['md0'],r'$\dot{M}_{\mathrm{Bulge}\ \mathrm{(gas)}} (M_\odot/yr)$', theRange=[1.0e-7,100]))
+        self.var.define('mdotAccr', TimeFunction, [], lambda: TimeFunction( \
+                self.evarray[:,19],'mdotAccr',  gpermsun/speryear,1.0,r'$\dot{M}_\mathrm{ext}$'))
+        self.var.define('mdotAccrSt', TimeFunction, [], lambda: TimeFunction( \
+                self.evarray[:,21],'mdotAccrSt',gpermsun/speryear,1.0,r'$\dot{M}_{*,\mathrm{ext}} (M_\odot/\mathrm{yr})$'))
+        self.var.define('mergerFraction', TimeFunction, ['mdotAccrSt','mdotAccr'], lambda: TimeFunction( \
+                self.var['mdotAccrSt'].sensible()/self.var['mdotAccr'].sensible(), 'mergerFraction', 1.0, 1.0, r'$\dot{M}_{*,\mathrm{ext}}/\dot{M}_\mathrm{ext}$', log=False))
+        self.var.define('feedingEfficiency', TimeFunction, ['mdotBulgeG'], lambda: TimeFunction( \
                 np.clip(self.var['mdotBulgeG'].sensible()/self.evarray[:,19], 0,10.0), 'feedingEfficiency', \
-                1.0,1.0,r'$\dot{M}_\mathrm{bulge}/\dot{M}_{ext}$', theRange=[1.0e-7,10.0])
-        self.var['dcoldt'] = RadialFunction( \
+                1.0,1.0,r'$\dot{M}_\mathrm{bulge}/\dot{M}_{ext}$', theRange=[1.0e-7,10.0]))
+        self.var.define('dcoldt', RadialFunction, [], lambda: RadialFunction( \
                 np.copy(self.dataCube[:,:,7]),'dcoldt',self.p['md0']*gpermsun/(speryear*2.0*pi*(self.p['R']*cmperkpc)**2.0), \
-                self.p['md0']/(2.0*pi*(self.p['R'])**2.0),r'$\partial \Sigma/\partial t$ (M$_\odot$ yr$^{-1}$ kpc$^{-2}$)')
-        self.var['dcolstdt'] = RadialFunction( \
+                self.p['md0']/(2.0*pi*(self.p['R'])**2.0),r'$\partial \Sigma/\partial t$ (M$_\odot$ yr$^{-1}$ kpc$^{-2}$)'), columns=[7])
+        self.var.define('dcolstdt', RadialFunction, [], lambda: RadialFunction( \
                 np.copy(self.dataCube[:,:,9]),'dcoldt',self.p['md0']*gpermsun/(speryear*2.0*pi*(self.p['R']*cmperkpc)**2.0), \
-                self.p['md0']/(2.0*pi*(self.p['R'])**2.0),r'$\partial \Sigma_*/\partial t$ (M$_\odot$ yr$^{-1}$ kpc$^{-2}$)')
-        self.var['colAccr'] = RadialFunction( \
+                self.p['md0']/(2.0*pi*(self.p['R'])**2.0),r'$\partial \Sigma_*/\partial t$ (M$_\odot$ yr$^{-1}$ kpc$^{-2}$)'), columns=[9])
+        self.var.define('colAccr', RadialFunction, ['MassLoadingFactor'], lambda: RadialFunction( \
                 np.copy(self.dataCube[:,:,29]),'colAccr', \
                 self.p['md0']*gpermsun/(speryear*2.0*pi*(self.p['R']**2.0)*cmperkpc*cmperkpc),\
                 self.p['md0']/(2.0*pi*self.p['R']**2.0), \
                 r'$\dot{\Sigma}_{cos} (M_\odot\ yr^{-1}\ kpc^{-2})$', \
-                inner=2.0*(self.evarray[:,20])*self.p['RfREC']/((self.p['RfREC']+self.var['MassLoadingFactor'].inner())*np.power(internalR[:,0]-self.dataCube[:,0,0]*dlnx,2.0)), \
-                theRange = [1.0e-5,1.0])
-        mdotCodeUnits = np.column_stack((self.evarray[:,8],np.copy(self.dataCube[:,:,38])/self.p['md0']))
-        self.var['Mdot'] = RadialFunction( \
-                mdotCodeUnits, 'Mdot', \
+                inner=2.0*(self.evarray[:,20])*self.p['RfREC']/((self.p['RfREC']+self.var['MassLoadingFactor'].inner())*np.power(rbInner(),2.0)), \
+                theRange = [1.0e-5,1.0]), columns=[0, 29])
+        self.var.define('Mdot', RadialFunction, [], lambda: RadialFunction( \
+                np.column_stack((self.evarray[:,8],self.dataCube[:,:,38]/self.p['md0'])), 'Mdot', \
                 self.p['md0']*gpermsun/speryear, \
-                self.p['md0'],r'$\dot{M}$ (M$_\odot$ yr$^{-1}$)',log=False)
+                self.p['md0'],r'$\dot{M}$ (M$_\odot$ yr$^{-1}$)',log=False), columns=[38])
 
-        self.var['dsigdtLoss'] = RadialFunction( np.copy(self.dataCube[:,:,44]), 'dsigdtLoss', cgsConv=1.0e10*self.p['vphiR']*self.p['vphiR']/(2.0*np.pi*self.p['R']*cmperkpc), sensibleConv=1.0e5*self.p['vphiR']*self.p['vphiR']*speryear*1.0e9/(2.0*np.pi*self.p['R']*cmperkpc), texString=r'\partial \sigma/\partial t |_\mathrm{diss} (\mathrm{km}\ \mathrm{s}^{-1}\ \mathrm{Gyr}^{-1})' )
-        self.var['dsigdtGI'] = RadialFunction( np.copy(self.dataCube[:,:,41]), 'dsigdtGI', cgsConv=1.0e10*self.p['vphiR']*self.p['vphiR']/(2.0*np.pi*self.p['R']*cmperkpc), sensibleConv=1.0e5*self.p['vphiR']*self.p['vphiR']*speryear*1.0e9/(2.0*np.pi*self.p['R']*cmperkpc), texString=r'\partial \sigma/\partial t |_\mathrm{GI} (\mathrm{km}\ \mathrm{s}^{-1}\ \mathrm{Gyr}^{-1})' )
-        self.var['dsigdtAdv'] = RadialFunction( np.copy(self.dataCube[:,:,39] + self.dataCube[:,:,40]), 'dsigdtAdv', cgsConv=1.0e10*self.p['vphiR']*self.p['vphiR']/(2.0*np.pi*self.p['R']*cmperkpc), sensibleConv=1.0e5*self.p['vphiR']*self.p['vphiR']*speryear*1.0e9/(2.0*np.pi*self.p['R']*cmperkpc), texString=r'\partial \sigma/\partial t |_\mathrm{adv} (\mathrm{km}\ \mathrm{s}^{-1}\ \mathrm{Gyr}^{-1})' )
-        self.var['dsigdtSN'] = RadialFunction( np.copy(self.dataCube[:,:,60]), 'dsigdtSN', cgsConv=1.0e10*self.p['vphiR']*self.p['vphiR']/(2.0*np.pi*self.p['R']*cmperkpc), sensibleConv=1.0e5*self.p['vphiR']*self.p['vphiR']*speryear*1.0e9/(2.0*np.pi*self.p['R']*cmperkpc), texString=r'\partial \sigma/\partial t |_\mathrm{SN} (\mathrm{km}\ \mathrm{s}^{-1}\ \mathrm{Gyr}^{-1})' )
-        self.var['dsigdtAccr'] = RadialFunction( np.copy(self.dataCube[:,:,61]), 'dsigdtAccr', cgsConv=1.0e10*self.p['vphiR']*self.p['vphiR']/(2.0*np.pi*self.p['R']*cmperkpc), sensibleConv=1.0e5*self.p['vphiR']*self.p['vphiR']*speryear*1.0e9/(2.0*np.pi*self.p['R']*cmperkpc), texString=r'\partial \sigma/\partial t |_\mathrm{Accr} (\mathrm{km}\ \mathrm{s}^{-1}\ \mathrm{Gyr}^{-1})' )
+        self.var.define('dsigdtLoss', RadialFunction, [], lambda: RadialFunction( np.copy(self.dataCube[:,:,44]), 'dsigdtLoss', cgsConv=1.0e10*self.p['vphiR']*self.p['vphiR']/(2.0*np.pi*self.p['R']*cmperkpc), sensibleConv=1.0e5*self.p['vphiR']*self.p['vphiR']*speryear*1.0e9/(2.0*np.pi*self.p['R']*cmperkpc), texString=r'\partial \sigma/\partial t |_\mathrm{diss} (\mathrm{km}\ \mathrm{s}^{-1}\ \mathrm{Gyr}^{-1})' ), columns=[44])
+        self.var.define('dsigdtGI', RadialFunction, [], lambda: RadialFunction( np.copy(self.dataCube[:,:,41]), 'dsigdtGI', cgsConv=1.0e10*self.p['vphiR']*self.p['vphiR']/(2.0*np.pi*self.p['R']*cmperkpc), sensibleConv=1.0e5*self.p['vphiR']*self.p['vphiR']*speryear*1.0e9/(2.0*np.pi*self.p['R']*cmperkpc), texString=r'\partial \sigma/\partial t |_\mathrm{GI} (\mathrm{km}\ \mathrm{s}^{-1}\ \mathrm{Gyr}^{-1})' ), columns=[41])
+        self.var.define('dsigdtAdv', RadialFunction, [], lambda: RadialFunction( self.dataCube[:,:,39] + self.dataCube[:,:,40], 'dsigdtAdv', cgsConv=1.0e10*self.p['vphiR']*self.p['vphiR']/(2.0*np.pi*self.p['R']*cmperkpc), sensibleConv=1.0e5*self.p['vphiR']*self.p['vphiR']*speryear*1.0e9/(2.0*np.pi*self.p['R']*cmperkpc), texString=r'\partial \sigma/\partial t |_\mathrm{adv} (\mathrm{km}\ \mathrm{s}^{-1}\ \mathrm{Gyr}^{-1})' ), columns=[39, 40])
+        self.var.define('dsigdtSN', RadialFunction, [], lambda: RadialFunction( np.copy(self.dataCube[:,:,60]), 'dsigdtSN', cgsConv=1.0e10*self.p['vphiR']*self.p['vphiR']/(2.0*np.pi*self.p['R']*cmperkpc), sensibleConv=1.0e5*self.p['vphiR']*self.p['vphiR']*speryear*1.0e9/(2.0*np.pi*self.p['R']*cmperkpc), texString=r'\partial \sigma/\partial t |_\mathrm{SN} (\mathrm{km}\ \mathrm{s}^{-1}\ \mathrm{Gyr}^{-1})' ), columns=[60])
+        self.var.define('dsigdtAccr', RadialFunction, [], lambda: RadialFunction( np.copy(self.dataCube[:,:,61]), 'dsigdtAccr', cgsConv=1.0e10*self.p['vphiR']*self.p['vphiR']/(2.0*np.pi*self.p['R']*cmperkpc), sensibleConv=1.0e5*self.p['vphiR']*self.p['vphiR']*speryear*1.0e9/(2.0*np.pi*self.p['R']*cmperkpc), texString=r'\partial \sigma/\partial t |_\mathrm{Accr} (\mathrm{km}\ \mathrm{s}^{-1}\ \mathrm{Gyr}^{-1})' ), columns=[61])
 
 
-        self.var['colTr'] = RadialFunction( \
+        self.var.define('colTr', RadialFunction, ['Mdot','dA'], lambda: RadialFunction( \
                 (self.var['Mdot'].cgs(locIndex=range(1,nxI+1))-self.var['Mdot'].cgs(locIndex=range(nxI)))/self.var['dA'].cgs(), \
-                'colTr',1.0, speryear*cmperkpc**2.0/gpermsun, r'$\dot{\Sigma}_{tr}$ (M$_\odot$ yr$^{-1}$ kpc$^{-2}$)',log=False, theRange=[-10,10])
-        self.var['colREC'] = RadialFunction( self.dataCube[:,:,58], 'colREC', cgsConv= self.p['md0']*gpermsun/(speryear*2.0*pi*(self.p['R']**2.0)*cmperkpc*cmperkpc), sensibleConv=self.p['md0']/(2.0*pi*self.p['R']**2.0), texString=r'$\dot{\Sigma}_{*,\mathrm{rec}} (M_\odot\ \mathrm{yr}^{-1}\ \mathrm{kpc}^{-2})$', theRange=[1.0e-7, 10.0] )
-        self.var['colIA'] = RadialFunction( self.dataCube[:,:,59], 'colIA',  cgsConv= self.p['md0']*gpermsun/(speryear*2.0*pi*(self.p['R']**2.0)*cmperkpc*cmperkpc), sensibleConv=self.p['md0']/(2.0*pi*self.p['R']**2.0), texString=r'$\dot{\Sigma}_{*,\mathrm{IA}} (\mathrm{SN}_\mathrm{IA}\ \mathrm{yr}^{-1}\ \mathrm{kpc}^{-2})$', theRange=[1.0e-7, 1.0] )
-        self.var['colsfr'] = RadialFunction( \
+                'colTr',1.0, speryear*cmperkpc**2.0/gpermsun, r'$\dot{\Sigma}_{tr}$ (M$_\odot$ yr$^{-1}$ kpc$^{-2}$)',log=False, theRange=[-10,10]))
+        self.var.define('colREC', RadialFunction, [], lambda: RadialFunction( np.copy(self.dataCube[:,:,58]), 'colREC', cgsConv= self.p['md0']*gpermsun/(speryear*2.0*pi*(self.p['R']**2.0)*cmperkpc*cmperkpc), sensibleConv=self.p['md0']/(2.0*pi*self.p['R']**2.0), texString=r'$\dot{\Sigma}_{*,\mathrm{rec}} (M_\odot\ \mathrm{yr}^{-1}\ \mathrm{kpc}^{-2})$', theRange=[1.0e-7, 10.0] ), columns=[58])
+        self.var.define('colIA', RadialFunction, [], lambda: RadialFunction( np.copy(self.dataCube[:,:,59]), 'colIA',  cgsConv= self.p['md0']*gpermsun/(speryear*2.0*pi*(self.p['R']**2.0)*cmperkpc*cmperkpc), sensibleConv=self.p['md0']/(2.0*pi*self.p['R']**2.0), texString=r'$\dot{\Sigma}_{*,\mathrm{IA}} (\mathrm{SN}_\mathrm{IA}\ \mathrm{yr}^{-1}\ \mathrm{kpc}^{-2})$', theRange=[1.0e-7, 1.0] ), columns=[59])
+        self.var.define('colsfr', RadialFunction, ['MassLoadingFactor'], lambda: RadialFunction( \
                 np.copy(self.dataCube[:,:,28]),'colsfr', \
                 self.p['md0']*gpermsun/(speryear*2.0*pi*(self.p['R']**2.0)*cmperkpc*cmperkpc),\
                 self.p['md0']/(2.0*pi*self.p['R']**2.0), \
                 r'$\dot{\Sigma}_*^{SF} (M_\odot\ \mathrm{yr}^{-1}\ \mathrm{kpc}^{-2})$', \
-                inner=2.0*(self.evarray[:,8]+self.evarray[:,20])*self.p['RfREC']/((self.p['RfREC']+self.var['MassLoadingFactor'].inner())*np.power(internalR[:,0]-self.dataCube[:,0,0]*dlnx,2.0)) , theRange = [2.0e-6,5.0])
-        self.var['sfsig'] = TimeFunction(np.sum( self.var['sig'].sensible()*self.var['dA'].sensible()*self.var['colsfr'].sensible(), axis=1 )/np.sum(self.var['dA'].sensible()*self.var['colsfr'].sensible(), axis=1), 'sfsig', sensibleConv=1.0, cgsConv=1.0e5, texString=r'$\langle\sigma\rangle_\mathrm{SF}$', theRange=[5, 110])
-        self.var['colOut'] = RadialFunction( \
+                inner=2.0*(self.evarray[:,8]+self.evarray[:,20])*self.p['RfREC']/((self.p['RfREC']+self.var['MassLoadingFactor'].inner())*np.power(rbInner(),2.0)) , theRange = [2.0e-6,5.0]), columns=[0, 28])
+        self.var.define('sfsig', TimeFunction, ['sig','dA','colsfr'], lambda: TimeFunction(np.sum( self.var['sig'].sensible()*self.var['dA'].sensible()*self.var['colsfr'].sensible(), axis=1 )/np.sum(self.var['dA'].sensible()*self.var['colsfr'].sensible(), axis=1), 'sfsig', sensibleConv=1.0, cgsConv=1.0e5, texString=r'$\langle\sigma\rangle_\mathrm{SF}$', theRange=[5, 110]))
+        self.var.define('colOut', RadialFunction, ['colsfr','MassLoadingFactor'], lambda: RadialFunction( \
                 self.var['colsfr'].sensible()*self.var['MassLoadingFactor'].sensible(), 'colOut', \
                 cgsConv = gpermsun/speryear/cmperkpc**2, sensibleConv=1.0,
-                inner = self.var['colsfr'].inner()*self.var['MassLoadingFactor'].inner(), texString=r'$\dot{\Sigma}_\mathrm{out}$', theRange=[1.0e-5, 10.0])
-        self.var['colTrPerAccr'] = RadialFunction( np.clip( np.abs(self.var['colTr'].cgs())/self.var['colAccr'].cgs(), 0,10), 'colTrPerAccr', \
-                texString=r'$|\dot{\Sigma}_{tr}|/\dot{\Sigma}_{accr}$', theRange=[1.0e-5,10.0])
-        self.var['colOutPerAccr'] = RadialFunction( np.clip(self.var['colOut'].cgs()/self.var['colAccr'].cgs(), 0,10), 'colOutPerAccr', \
-                texString=r'$\dot{\Sigma}_{out}/\dot{\Sigma}_{accr}$', theRange=[1.0e-5, 10.0])
-        self.var['colSfrPerAccr'] = RadialFunction( np.clip(self.var['colsfr'].cgs()/self.var['colAccr'].cgs(), 0,10), 'colSfrPerAccr', \
-                texString=r'$\dot{\Sigma}_{out}/\dot{\Sigma}_{accr}$', theRange=[1.0e-5, 10.0])
-
-        self.var['Q'] = RadialFunction( \
-                np.copy(self.dataCube[:,:,11]),'Q',1.0,1.0,r'Q',theRange=[.3,30.0])
-        self.var['Qg'] = RadialFunction( \
-                np.copy(self.dataCube[:,:,23]),'Qg',1.0,1.0,r'$Q_g$',theRange=[.1,30.0])
-        self.var['Qst'] = RadialFunction( \
-                np.copy(self.dataCube[:,:,22]),'Qst',1.0,1.0,r'$Q_*$',theRange=[.1,30.0])
-        self.var['Qavg'] = TimeFunction( np.average( self.var['Qg'].sensible(), axis=1, weights= self.var['colsfr'].sensible()*self.var['dA'].sensible()), 'Qavg', theRange=[0.3, 10.0], texString=r'$\langle Q_g \rangle_\mathrm{SFR}$') 
-        self.var['tDepRadial'] = RadialFunction( \
+                inner = self.var['colsfr'].inner()*self.var['MassLoadingFactor'].inner(), texString=r'$\dot{\Sigma}_\mathrm{out}$', theRange=[1.0e-5, 10.0]))
+        self.var.define('colTrPerAccr', RadialFunction, ['colTr','colAccr'], lambda: RadialFunction( np.clip( np.abs(self.var['colTr'].cgs())/self.var['colAccr'].cgs(), 0,10), 'colTrPerAccr', \
+                texString=r'$|\dot{\Sigma}_{tr}|/\dot{\Sigma}_{accr}$', theRange=[1.0e-5,10.0]))
+        self.var.define('colOutPerAccr', RadialFunction, ['colOut','colAccr'], lambda: RadialFunction( np.clip(self.var['colOut'].cgs()/self.var['colAccr'].cgs(), 0,10), 'colOutPerAccr', \
+                texString=r'$\dot{\Sigma}_{out}/\dot{\Sigma}_{accr}$', theRange=[1.0e-5, 10.0]))
+        self.var.define('colSfrPerAccr', RadialFunction, ['colsfr','colAccr'], lambda: RadialFunction( np.clip(self.var['colsfr'].cgs()/self.var['colAccr'].cgs(), 0,10), 'colSfrPerAccr', \
+                texString=r'$\dot{\Sigma}_{out}/\dot{\Sigma}_{accr}$', theRange=[1.0e-5, 10.0]))
+
+        self.var.define('Q', RadialFunction, [], lambda: RadialFunction( \
+                np.copy(self.dataCube[:,:,11]),'Q',1.0,1.0,r'Q',theRange=[.3,30.0]), columns=[11])
+        self.var.define('Qg', RadialFunction, [], lambda: RadialFunction( \
+                np.copy(self.dataCube[:,:,23]),'Qg',1.0,1.0,r'$Q_g$',theRange=[.1,30.0]), columns=[23])
+        self.var.define('Qst', RadialFunction, [], lambda: RadialFunction( \
+                np.copy(self.dataCube[:,:,22]),'Qst',1.0,1.0,r'$Q_*$',theRange=[.1,30.0]), columns=[22])
+        self.var.define('Qavg', TimeFunction, ['Qg','colsfr','dA'], lambda: TimeFunction( np.average( self.var['Qg'].sensible(), axis=1, weights= self.var['colsfr'].sensible()*self.var['dA'].sensible()), 'Qavg', theRange=[0.3, 10.0], texString=r'$\langle Q_g \rangle_\mathrm{SFR}$') )
+        self.var.define('tDepRadial', RadialFunction, ['col','colsfr'], lambda: RadialFunction( \
                 self.var['col'].cgs()/self.var['colsfr'].cgs(), 'tDepRadial',\
-                1.0, 1.0/speryear, r'$t_\mathrm{dep} = \Sigma/\dot{\Sigma}_*^{SF} (yr)$')
-        self.var['fH2']= RadialFunction(np.copy(self.dataCube[:,:,47]),'fH2',1.0,1.0,r'$f_{\mathrm{H}_2}$',log=False,theRange=[0.0,1.0])
-        self.var['colH2']= RadialFunction(np.copy(self.dataCube[:,:,47]) * self.var['col'].sensible(),'colH2', \
-                cgsConv = gpermsun/cmperpc**2, texString=r'$\Sigma_{\mathrm{H}_2}$',log=True,theRange=[0.02,3000.0])
-        self.var['MH2'] = TimeFunction( np.sum(self.var['colH2'].cgs()*self.var['dA'].cgs(),axis=1), 'MH2', cgsConv=1.0, sensibleConv=1.0/gpermsun, texString=r'$M_{\mathrm{H}_2}\ M_\odot$')
-        HIradius=[]
-        self.var['Z'] = RadialFunction(np.copy(self.dataCube[:,:,21])*2.09+np.copy(self.dataCube[:,:,57])*1.06,'Z',cgsConv=1.0,sensibleConv=1.0/.02,texString=r'$Z_g (Z_\odot)$')
-        self.var['alphaFe'] = RadialFunction( np.log10((self.dataCube[:,:,21]/self.dataCube[:,:,57])/(0.0057/0.0013)), 'alphaFe', cgsConv=1.0, sensibleConv=1.0, texString=r'$[\alpha/\mathrm{Fe}]$', log=False )
+                1.0, 1.0/speryear, r'$t_\mathrm{dep} = \Sigma/\dot{\Sigma}_*^{SF} (yr)$'))
+        self.var.define('fH2', RadialFunction, [], lambda: RadialFunction(np.copy(self.dataCube[:,:,47]),'fH2',1.0,1.0,r'$f_{\mathrm{H}_2}$',log=False,theRange=[0.0,1.0]), columns=[47])
+        self.var.define('colH2', RadialFunction, ['col'], lambda: RadialFunction(self.dataCube[:,:,47] * self.var['col'].sensible(),'colH2', \
+                cgsConv = gpermsun/cmperpc**2, texString=r'$\Sigma_{\mathrm{H}_2}$',log=True,theRange=[0.02,3000.0]), columns=[47])
+        self.var.define('MH2', TimeFunction, ['colH2','dA'], lambda: TimeFunction( np.sum(self.var['colH2'].cgs()*self.var['dA'].cgs(),axis=1), 'MH2', cgsConv=1.0, sensibleConv=1.0/gpermsun, texString=r'$M_{\mathrm{H}_2}\ M_\odot$'))
+        self.var.define('Z', RadialFunction, [], lambda: RadialFunction(self.dataCube[:,:,21]*2.09+self.dataCube[:,:,57]*1.06,'Z',cgsConv=1.0,sensibleConv=1.0/.02,texString=r'$Z_g (Z_\odot)$'), columns=[21, 57])
+        self.var.define('alphaFe', RadialFunction, [], lambda: RadialFunction( np.log10((self.dataCube[:,:,21]/self.dataCube[:,:,57])/(0.0057/0.0013)), 'alphaFe', cgsConv=1.0, sensibleConv=1.0, texString=r'$[\alpha/\mathrm{Fe}]$', log=False ), columns=[21, 57])
         # note that at this moment vPhi as defined below should really be vcirc, the circular velocity of the potential
         # In the next two variables, we attempt to define the true average azimuthal velocities accounting for asymmetric drift/pressure terms.
-        self.var['vPhi'] = RadialFunction(np.copy(self.dataCube[:,:,15]),'vPhi',self.p['vphiR']*1.0e5,self.p['vphiR'], \
-                 r'$v_\mathrm{circ}$ (km/s)',log=True)
-        self.var['Mh'] = TimeFunction(self.evarray[:,18],'Mh',gpermsun,1.0,r'$M_h (M_\odot)$', theRange=[1.0e9, 1.0e13])
+        self.var.define('vPhi', RadialFunction, [], lambda: RadialFunction(np.copy(self.dataCube[:,:,15]),'vPhi',self.p['vphiR']*1.0e5,self.p['vphiR'], \
+                 r'$v_\mathrm{circ}$ (km/s)',log=True), columns=[15])
+        self.var.define('Mh', TimeFunction, [], lambda: TimeFunction(self.evarray[:,18],'Mh',gpermsun,1.0,r'$M_h (M_\odot)$', theRange=[1.0e9, 1.0e13]))
         # Mdotext * 2pi R/vphiR ~ Msun/yr * kpc / (km/s) * g/Msun * km/kpc * yr/s -- checks out
-        self.var['mCentral'] = TimeFunction( \
+        def mCentralUnfiltered():
+            return TimeFunction( \
                 self.evarray[:,3], 'mCentral',
                 self.p['md0']*2.0*pi*self.p['R']/self.p['vphiR'] *gpermsun* kmperkpc/speryear, \
                 self.p['md0']*2.0*pi*self.p['R']/self.p['vphiR'] * kmperkpc/speryear, \
                 r'$M_\mathrm{center}\ (M_\odot)$')
-        deriv = np.zeros(len(self.var['mCentral'].sensible()))
-        deriv[:-1] = (self.var['mCentral'].sensible()[1:]-self.var['mCentral'].sensible()[:-1])/np.abs(self.var['t'].sensible()[1:]-self.var['t'].sensible()[:-1])
-        self.var['LXProxy'] = TimeFunction( self.var['mCentral'].sensible()*deriv , 'LXProxy', texString=r'$M_\mathrm{central}\dot{M}_\mathrm{central}$' )
-        self.var['mStellarHalo'] = TimeFunction( \
+        def LXProxy():
+            mCentral = mCentralUnfiltered()
+            deriv = np.zeros(len(mCentral.sensible()))
+            deriv[:-1] = (mCentral.sensible()[1:]-mCentral.sensible()[:-1])/np.abs(self.var['t'].sensible()[1:]-self.var['t'].sensible()[:-1])
+            return TimeFunction( mCentral.sensible()*deriv , 'LXProxy', texString=r'$M_\mathrm{central}\dot{M}_\mathrm{central}$' )
+        self.var.define('LXProxy', TimeFunction, ['t'], LXProxy)
+        self.var.define('mStellarHalo', TimeFunction, [], lambda: TimeFunction( \
                 self.evarray[:,5], 'mStellarHalo',
                 self.p['md0']*2.0*pi*self.p['R']/self.p['vphiR'] *gpermsun* kmperkpc/speryear, \
                 self.p['md0']*2.0*pi*self.p['R']/self.p['vphiR'] * kmperkpc/speryear, \
-                r'$M_\mathrm{center}\ (M_\odot)$')
-        tempmstar = TimeFunction( \
-                self.var['mCentral'].sensible() + fh*self.var['mStellarHalo'].sensible() + 
+                r'$M_\mathrm{center}\ (M_\odot)$'))
+        def mCentral():
+            mCentral = mCentralUnfiltered()
+            tempmstar = TimeFunction( \
+                mCentral.sensible() + fh*self.var['mStellarHalo'].sensible() +
                 np.sum( self.var['dA'].sensible()*self.var['colst'].sensible()*1.0e6, 1 ), \
                 'mstar',gpermsun,1.0,r'$M_*$ (M$_\odot$)', theRange=[0.9e7, 1.1e11])
-        mcfilter = self.var['mCentral'].cgs()/tempmstar.cgs()>0.05
-        self.var['mCentral'].arr[mcfilter]=0.0 ### a horrifying hack to get around the fact that dwarf galaxies are unresolved b/c of too-large radii
-
-        self.var['mstar'] = TimeFunction( \
-                self.var['mCentral'].sensible() + fh*self.var['mStellarHalo'].sensible() + 
+            mcfilter = mCentral.cgs()/tempmstar.cgs()>0.05
+            mCentral.arr[mcfilter]=0.0 ### a horrifying hack to get around the fact that dwarf galaxies are unresolved b/c of too-large radii
+            mCentral.clearConverted()
+            return mCentral
+        self.var.define('mCentral', TimeFunction, ['mStellarHalo','dA','colst'], mCentral)
+
+        self.var.define('mstar', TimeFunction, ['mCentral','mStellarHalo','dA','colst'], lambda: TimeFunction( \
+                self.var['mCentral'].sensible() + fh*self.var['mStellarHalo'].sensible() +
                 np.sum( self.var['dA'].sensible()*self.var['colst'].sensible()*1.0e6, 1 ), \
-                'mstar',gpermsun,1.0,r'$M_*$ (M$_\odot$)', theRange=[0.3e7, 8.1e11])
-
-        self.var['stellarHaloFraction'] = TimeFunction( self.var['mStellarHalo'].sensible()/self.var['mstar'].sensible(), 'stellarHaloFraction', 1.0, 1.0, r'$M_{*,\mathrm{halo}}/M_*$', log=False)
-
-
-        self.var['kappaZlimit'] = RadialFunction( self.var['r'].cgs()*self.var['sig'].cgs(), 'kappaZlimit', cgsConv=1.0, sensibleConv=speryear*1.0e9/cmperkpc**2, texString = r'$r\sigma (\mathrm{kpc}^2\ \mathrm{Gyr}^{-1})$', theRange=[1.0e-2, 1.0e4])
-        firstEstimate = 3.32e-3 * self.p['kappaMetals']*self.var['Qg'].cgs() * np.pi*np.power(self.var['sig'].cgs(),3.0) / (Gcgs * self.var['col'].cgs()) 
-        filt = firstEstimate > self.var['kappaZlimit'].cgs()
-        firstEstimate[filt] = self.var['kappaZlimit'].cgs()[filt]
-        self.var['kappaZ'] = RadialFunction( firstEstimate, 'kappaZ', cgsConv=1.0, sensibleConv = 1.0/cmperkpc**2 *speryear*1.0e9, texString=r'$\kappa_Z (\mathrm{kpc}^2\ \mathrm{Gyr}^{-1})$', theRange=[1.0e-2, 1.0e4])
-        self.var['kappaZconservativeLimit'] = RadialFunction( self.var['hGas'].cgs()*self.var['sig'].cgs(),'kappaZconservativeLimit', cgsConv=1.0, sensibleConv=speryear*1.0e9/cmperkpc**2, texString = r'$H\sigma (\mathrm{kpc}^2\ \mathrm{Gyr}^{-1})$', theRange=[1.0e-2, 1.0e4])
-     
-        mstdist = np.column_stack( (self.var['mCentral'].cgs()  , self.var['colst'].cgs()*self.var['dA'].cgs()) ) # stellar mass in each bin
-        mstcu = np.cumsum(mstdist, axis=1) #
-        gascu = np.cumsum( self.var['col'].cgs()*self.var['dA'].cgs(), axis=1 )
-        sfrcu = np.cumsum( np.column_stack((self.var['mdotBulgeG'].cgs() * self.p['RfREC']/(self.p['RfREC']+self.var['MassLoadingFactor'].inner()),  self.var['colsfr'].cgs()*self.var['dA'].cgs())), axis=1  )
-        #sfrcu = np.cumsum( np.column_stack( (self.var['mdotBulgeG'].cgs()*  self.p['RfREC']/((self.p['RfREC']+self.var['MassLoadingFactor'].inner())) , self.var['colsfr'].cgs()*self.var['dA'].cgs(), axis=1 ) ))
-        halfMassRadiiStars = []
-        halfMassEst = []
-        c82Stars = [] # ratio of the radii containing 80% and 20% of the stellar mass
-        halfMassRadiiGas = []
-        halfMassRadiiSFR = []
-        gradZAtHalfSFR = []
-        bmassExtrap = []
-        fgHalfMassStars=[]
-        fgTwoHalfMassStars=[]
-        ri10, _ = Nearest( self.var['r'].sensible(timeIndex=0), 10.0) # index closest to 10 kpc
-        ri2, _ = Nearest( self.var['r'].sensible(timeIndex=0), 2.0) # index closest to 2 kpc
-        r9s = []
-        r8s = []
-        r2s = []
-        rds = []
-        metallicityGradientsR90 = []
-        metallicityGradients2kpc = []
-        radiusOfMaxColumnDensity = []
-        radiusOfMaxSFR = []
-        v22s=[]
-        for z in range(np.shape(mstcu)[0]):
-            sthalfind = np.searchsorted(mstcu[z,:], [mstcu[z,-1]*0.5])[0] 
-            st2halfind, _ = Nearest(self.var['r'].sensible(timeIndex=0), self.var['r'].sensible(timeIndex=0,locIndex=sthalfind)*2.0) 
+                'mstar',gpermsun,1.0,r'$M_*$ (M$_\odot$)', theRange=[0.3e7, 8.1e11]))
+
+        self.var.define('stellarHaloFraction', TimeFunction, ['mStellarHalo','mstar'], lambda: TimeFunction( self.var['mStellarHalo'].sensible()/self.var['mstar'].sensible(), 'stellarHaloFraction', 1.0, 1.0, r'$M_{*,\mathrm{halo}}/M_*$', log=False))
+
+
+        self.var.define('kappaZlimit', RadialFunction, ['r','sig'], lambda: RadialFunction( self.var['r'].cgs()*self.var['sig'].cgs(), 'kappaZlimit', cgsConv=1.0, sensibleConv=speryear*1.0e9/cmperkpc**2, texString = r'$r\sigma (\mathrm{kpc}^2\ \mathrm{Gyr}^{-1})$', theRange=[1.0e-2, 1.0e4]))
+        def kappaZ():
+            firstEstimate = 3.32e-3 * self.p['kappaMetals']*self.var['Qg'].cgs() * np.pi*np.power(self.var['sig'].cgs(),3.0) / (Gcgs * self.var['col'].cgs())
+            filt = firstEstimate > self.var['kappaZlimit'].cgs()
+            firstEstimate[filt] = self.var['kappaZlimit'].cgs()[filt]
+            return RadialFunction( firstEstimate, 'kappaZ', cgsConv=1.0, sensibleConv = 1.0/cmperkpc**2 *speryear*1.0e9, texString=r'$\kappa_Z (\mathrm{kpc}^2\ \mathrm{Gyr}^{-1})$', theRange=[1.0e-2, 1.0e4])
+        self.var.define('kappaZ', RadialFunction, ['Qg','sig','col','kappaZlimit'], kappaZ)
+        self.var.define('kappaZconservativeLimit', RadialFunction, ['hGas','sig'], lambda: RadialFunction( self.var['hGas'].cgs()*self.var['sig'].cgs(),'kappaZconservativeLimit', cgsConv=1.0, sensibleConv=speryear*1.0e9/cmperkpc**2, texString = r'$H\sigma (\mathrm{kpc}^2\ \mathrm{Gyr}^{-1})$', theRange=[1.0e-2, 1.0e4]))
+
+        halfMassNames = ['metallicityGradientR90', 'metallicityGradient2kpc', 'BMassFromExtrap', 'r9', 'r8', 'r2', 'rd82', 'vPhi22', 'fghm', 'fg2hm', \
+                'halfMassStars', 'naiveScaleLength', 'radiusOfMaximumColumnDensity', 'radiusOfMaximumSFR', 'halfMassEst', 'c82', 'halfMassGas', \
+                'naiveGasScaleLength', 'halfMassSFR', 'metallicityGradient']
+        def halfMass():
+            mstdist = np.column_stack( (self.var['mCentral'].cgs()  , self.var['colst'].cgs()*self.var['dA'].cgs()) ) # stellar mass in each bin
+            mstcu = np.cumsum(mstdist, axis=1) #
+            gascu = np.cumsum( self.var['col'].cgs()*self.var['dA'].cgs(), axis=1 )
+            sfrcu = np.cumsum( np.column_stack((self.var['mdotBulgeG'].cgs() * self.p['RfREC']/(self.p['RfREC']+self.var['MassLoadingFactor'].inner()),  self.var['colsfr'].cgs()*self.var['dA'].cgs())), axis=1  )
+            # Everything below is computed for every timestep at once: each index is an array over timesteps.
+            nt = np.shape(mstcu)[0]
+            ts = np.arange(nt)
+            r0 = self.var['r'].sensible(timeIndex=0)
+            rSensible = self.var['r'].sensible()
+            rCgs = self.var['r'].cgs()
+            ri10, _ = Nearest( r0, 10.0) # index closest to 10 kpc
+            ri2, _ = Nearest( r0, 2.0) # index closest to 2 kpc
+
+            sthalfind = searchsortedRows(mstcu, mstcu[:,-1]*0.5)
+            st2halfind = nearestIndices(r0, r0[sthalfind]*2.0)
             sthalfindest = sthalfind # initialize our guess for the radial index at which we will find the "observed" half mass.
             while True:
-                st3halfind, _ = Nearest(self.var['r'].sensible(timeIndex=0), self.var['r'].sensible(timeIndex=0,locIndex=sthalfindest)*3.0) 
-                sthalfindestNEW = np.searchsorted(mstcu[z,:], [mstcu[z,st3halfind]*0.5])[0]
-                if sthalfindestNEW ==sthalfindest:
-                    # converged
-                    sthalfindest=sthalfindestNEW # finished iterating - before we leave, update.
+                # Timesteps which have converged stay put, so keep iterating until they all have.
+                st3halfind = nearestIndices(r0, r0[sthalfindest]*3.0)
+                sthalfindestNEW = searchsortedRows(mstcu, mstcu[ts,st3halfind]*0.5)
+                if np.all(sthalfindestNEW == sthalfindest):
                     break
-                else:
-                    # not converged yet - update our estimate.
-                    sthalfindest=sthalfindestNEW
-            halfMassEst.append(self.var['r'].sensible(timeIndex=0, locIndex=sthalfindest))
-            st2ind = np.searchsorted(mstcu[z,:], [mstcu[z,-1]*0.2])[0] 
-            st8ind = np.searchsorted(mstcu[z,:], [mstcu[z,-1]*0.8])[0] 
-            
-            r9ind = np.searchsorted(sfrcu[z,:ri10], [sfrcu[z,ri10]*0.9])[0] # radius containing 90% of SFR within 10 kpc.
-            if r9ind<=1:
-                r9ind=2 # if there's sooo much accretion into the central region that r90 is unresolved
+                sthalfindest = sthalfindestNEW
+            halfMassEst = r0[sthalfindest]
+            st2ind = searchsortedRows(mstcu, mstcu[:,-1]*0.2)
+            st8ind = searchsortedRows(mstcu, mstcu[:,-1]*0.8)
+
+            r9ind = searchsortedRows(sfrcu[:,:ri10], sfrcu[:,ri10]*0.9) # radius containing 90% of SFR within 10 kpc.
+            for z in np.nonzero(r9ind<=1)[0]:
                 print ("WARNING: extremely concentrated SFR ",z)
-            r9 = self.var['r'].cgs(timeIndex=z, locIndex=r9ind)
-            r9s.append(r9)
-            rir904, _ = Nearest( self.var['r'].sensible(timeIndex=0), r9/4.0 ) # radial index of 1/4 of r90
+            r9ind[r9ind<=1] = 2 # if there's sooo much accretion into the central region that r90 is unresolved
+            r9s = rCgs[ts,r9ind]
+            rir904 = nearestIndices( r0, r9s/4.0 ) # radial index of 1/4 of r90
 
-            # Measure the metallicity gradients following Ma, Hopkins+ (2016)
-            rgrid = np.arange( self.var['r'].sensible(timeIndex=0, locIndex=rir904), self.var['r'].sensible(timeIndex=0, locIndex=r9ind), 0.2 )
-            Zgridded = self.var['Z'].atR(rgrid, self.var['r'].sensible(timeIndex=0), z, sensible=False)
-            try:
-                m, b = np.polyfit(rgrid, np.log10(Zgridded), 1)
-            except:
-                pdb.set_trace()
-            metallicityGradientsR90.append( m )
+            # Measure the metallicity gradients following Ma, Hopkins+ (2016), on a grid with 0.2 kpc spacing.
+            metallicityGradientsR90 = np.zeros(nt)
+            for start in np.unique(rir904):
+                rows = np.nonzero(rir904==start)[0]
+                metallicityGradientsR90[rows] = gridSlopes(self.var['Z'], r0, r0[start], r0[r9ind[rows]], rows)
 
-            
             if ri2<=1:
                 ri2 = 2
                 print ("WARNING: 2 kpc not resolved")
-            rgrid = np.arange( self.var['r'].sensible(timeIndex=0, locIndex=0), self.var['r'].sensible(timeIndex=0, locIndex=ri2), 0.2 )
-            Zgridded = self.var['Z'].atR(rgrid, self.var['r'].sensible(timeIndex=0), z, sensible=False)
-            m, b = np.polyfit(rgrid, np.log10(Zgridded), 1)
-            metallicityGradients2kpc.append( m )
-
-
-            #np.sum( (np.log10(self.var['Z'].cgs())[:,1:] - np.log10(self.var['Z'].cgs())[:,:-1])*mg[:,:-1]/(self.var['r'].sensible()[:,1:] - self.var['r'].sensible()[:,:-1]), axis=1)/np.sum(mg,axis=1)
-
-
-
-            #if sthalfind>=nxIt-1:
-            #    sthalfind=0
-            #if st2ind>=nxIt-1:
-            #    st2ind=0
-            #if st8ind>=nxIt-1:
-            #    st8ind=0
-            halfMassRadiiStars.append( self.var['r'].sensible(timeIndex=z, locIndex=sthalfind) )
-            st22ind = np.searchsorted( self.var['r'].sensible(timeIndex=z), halfMassRadiiStars[-1]*1.7*2.2 )
-            if st22ind==len(self.var['r'].sensible(timeIndex=z)):
-                st22ind -= 1
-            v22s.append( self.var['vPhi'].sensible(timeIndex=z, locIndex=st22ind) )
-            fgHalfMassStars.append( gascu[z,sthalfind]/ (mstcu[z, sthalfind] + gascu[z,sthalfind]) )
-            fgTwoHalfMassStars.append( gascu[z,st2halfind]/ (mstcu[z, st2halfind] + gascu[z,st2halfind]) )
-            c82Stars.append( self.var['r'].sensible(timeIndex=z, locIndex=st8ind)/  self.var['r'].sensible(timeIndex=z, locIndex=st2ind) )
-            r8 = self.var['r'].cgs(timeIndex=z, locIndex=st8ind)
-            r2 = self.var['r'].cgs(timeIndex=z, locIndex=st2ind)
-            cst8 = self.var['colst'].cgs(timeIndex=z, locIndex=st8ind)
-            cst2 = self.var['colst'].cgs(timeIndex=z, locIndex=st2ind)
-
-            argOfMaxColumnDensity = np.argmax(self.var['col'].cgs(timeIndex=z))
-            if argOfMaxColumnDensity==0:
-                radiusOfMaxColumnDensity.append(0.0) # if the column density increases all the way to the center of our grid, the max is 'unresolved'
-            else:
-                radiusOfMaxColumnDensity.append( self.var['r'].cgs(timeIndex=z, locIndex=argOfMaxColumnDensity) )
-
-            argOfMaxSFR = np.argmax(self.var['colsfr'].cgs(timeIndex=z))
-            if argOfMaxSFR==0:
-                radiusOfMaxSFR.append(0.0) # if the column density increases all the way to the center of our grid, the max is 'unresolved'
-            else:
-                radiusOfMaxSFR.append( self.var['r'].cgs(timeIndex=z, locIndex=argOfMaxSFR) )
+            metallicityGradients2kpc = gridSlopes(self.var['Z'], r0, r0[0], np.repeat(r0[ri2], nt), ts)
+
+            halfMassRadiiStars = rSensible[ts,sthalfind]
+            st22ind = searchsortedRows(rSensible, halfMassRadiiStars*1.7*2.2)
+            st22ind[st22ind==np.shape(rSensible)[1]] -= 1
+            v22s = self.var['vPhi'].sensible()[ts,st22ind]
+            fgHalfMassStars = gascu[ts,sthalfind]/ (mstcu[ts, sthalfind] + gascu[ts,sthalfind])
+            fgTwoHalfMassStars = gascu[ts,st2halfind]/ (mstcu[ts, st2halfind] + gascu[ts,st2halfind])
+            c82Stars = rSensible[ts,st8ind]/rSensible[ts,st2ind] # ratio of the radii containing 80% and 20% of the stellar mass
+            r8s = rCgs[ts,st8ind]
+            r2s = rCgs[ts,st2ind]
+            cst8 = self.var['colst'].cgs()[ts,st8ind]
+            cst2 = self.var['colst'].cgs()[ts,st2ind]
+
+            # if the column density increases all the way to the center of our grid, the max is 'unresolved'
+            argOfMaxColumnDensity = np.argmax(self.var['col'].cgs(), axis=1)
+            radiusOfMaxColumnDensity = np.where(argOfMaxColumnDensity==0, 0.0, rCgs[ts,argOfMaxColumnDensity])
+            argOfMaxSFR = np.argmax(self.var['colsfr'].cgs(), axis=1)
+            radiusOfMaxSFR = np.where(argOfMaxSFR==0, 0.0, rCgs[ts,argOfMaxSFR])
             ## col=A exp(-r/rd)
             ## log col = log A - r/rd
             ## log cst8 = log A - r8/rd
             ## log cst2 = log A - r2/rd
             ## log cst8 - log cst2 = -r8/rd + r2/rd
             ## rd = (r2-r8)/(logcst8 - logcst2)
-            ## log A = log cst8 + r8/rd
-            rd = (r2-r8)/(np.log(cst8) - np.log(cst2))
-            rds.append(rd)
-            r8s.append(r8)
-            r2s.append(r2)
-            A = np.exp( np.log(cst8) + r8/rd)
-            bmassExtrap.append( mstcu[z,-1]*0.8 - 2.0*np.pi*cst8*r8*r8 ) # grams apparently
-            halfMassRadiiGas.append( self.var['rb'].sensible(timeIndex=z, locIndex= np.searchsorted(gascu[z,:], [gascu[z,-1]/2.0])[0] )  )
-            sfrhalfind = np.searchsorted(sfrcu[z,:], [sfrcu[z,-1]/2.0])[0]
-            halfMassRadiiSFR.append( self.var['rb'].sensible(timeIndex=z, locIndex=sfrhalfind  )  )
-
-
-            gradZAtHalfSFR.append( ( (np.log10(self.var['Z'].cgs())[z,1:] - np.log10(self.var['Z'].cgs())[z,:-1])/(self.var['r'].sensible()[z,1:] - self.var['r'].sensible()[z,:-1]) )[sfrhalfind] )
-
-        self.var['metallicityGradientR90'] = TimeFunction(metallicityGradientsR90, 'metallicityGradientR90', cgsConv=1.0/cmperkpc, sensibleConv=1.0, texString=r'$\partial\log_{10}Z/\partial r |_{(0.25-1) R_{90}}$', log=False, theRange=[-0.5, 0.05])
-        self.var['metallicityGradient2kpc'] = TimeFunction(metallicityGradients2kpc, 'metallicityGradient2kpc', cgsConv=1.0/cmperkpc, sensibleConv=1.0, texString=r'$\partial\log_{10}Z/\partial r |_{2\ \mathrm{kpc}}$', log=False, theRange=[-0.5, 0.05])
-
-        self.var['BMassFromExtrap'] = TimeFunction( bmassExtrap, 'BMassFromExtrap', cgsConv=1.0, sensibleConv=1.0/gpermsun, texString=r'$M_B (M_\odot)$ extrapolated' )
-        self.var['BTExtrap'] = TimeFunction( self.var['BMassFromExtrap'].sensible()/self.var['mstar'].sensible(), 'BMassFromExtrap', texString=r'BT extrapolated', log=False)
-
-        self.var['r9'] = TimeFunction( r9s, 'r9', sensibleConv=1/cmperkpc, texString=r'$r_{90\%\ \mathrm{SFR}} (kpc)$')
-        self.var['r8'] = TimeFunction( r8s, 'r8', sensibleConv=1/cmperkpc, texString=r'$r_{80\% M_*} (kpc)$')
-        self.var['r2'] = TimeFunction( r2s, 'r2', sensibleConv=1/cmperkpc, texString=r'$r_{20\% M_*} (kpc)$')
-        self.var['rd82'] = TimeFunction( rds, 'rd82', sensibleConv=1/cmperkpc, texString=r'$r_{d,82} (kpc)$')
-
-        self.var['vPhi22'] = TimeFunction( v22s, 'vPhi22', sensibleConv=1, cgsConv=1.0e5, texString=r'$v_{2.2} (\mathrm{km}/\mathrm{s})$', theRange=[10,500])
-        self.var['fghm'] = TimeFunction( fgHalfMassStars, 'fghm', sensibleConv=1, texString=r'$\langle f_g \rangle_{r_*}$')
-        self.var['fg2hm'] = TimeFunction( fgTwoHalfMassStars, 'fg2hm', sensibleConv=1, texString=r'$\langle f_g \rangle_{2r_*}$')
-        self.var['halfMassStars'] = TimeFunction( halfMassRadiiStars, 'halfMassStars', cgsConv = cmperkpc, texString=r'$r_*$ (kpc)', theRange=[0.1, 10.0])
-        self.var['naiveScaleLength'] = TimeFunction( np.array(halfMassRadiiStars)/1.69, 'naiveScaleLength', cgsConv=cmperkpc, texString=r'$r_d (kpc)$', theRange=[0.1, 10.0])
-        ## This will extract the global maximum in gas column density at any given redshift, and divide by the half stellar mass radius.
-        self.var['radiusOfMaximumColumnDensity'] = TimeFunction( np.array(radiusOfMaxColumnDensity)/self.var['halfMassStars'].cgs(), 'radiusOfMaximumColumnDensity', texString=r'$r_{\max(\Sigma)}/r_*$', log=False, theRange=[0,1.5])
-        self.var['radiusOfMaximumSFR'] = TimeFunction( np.array(radiusOfMaxSFR)/self.var['halfMassStars'].cgs(), 'radiusOfMaximumSFR', texString=r'$r_{\max(\dot{\Sigma}^\mathrm{SF})}/r_*$', log=False, theRange=[0,0.4])
-
-        self.var['halfMassEst'] = TimeFunction( halfMassEst, 'halfMassEst', cgsConv = cmperkpc, texString=r'$r_{*,\mathrm{est}}$ (kpc)', theRange=[0.1, 10.0])
-        self.var['c82'] = TimeFunction( c82Stars, 'c82', cgsConv = 1.0, texString=r'$c_{82} = r_{80}/r_{20}$ ', theRange=[2.0, 30.0])
-        self.var['halfMassGas'] = TimeFunction( halfMassRadiiGas, 'halfMassGas', cgsConv = cmperkpc, texString=r'$r_g$ (kpc)')
-        self.var['naiveGasScaleLength'] = TimeFunction( np.array(halfMassRadiiGas)/1.69, 'naiveGasScaleLength', cgsConv=cmperkpc, texString=r'$r_{d,g} (kpc)$', theRange=[0.1, 10.0])
-        self.var['halfMassSFR'] = TimeFunction( halfMassRadiiSFR, 'halfMassSFR', cgsConv = cmperkpc, texString=r'$r_\mathrm{SFR}$ (kpc)')
-        self.var['metallicityGradient'] = TimeFunction( gradZAtHalfSFR, 'metallicityGradient', cgsConv=1.0/cmperkpc, sensibleConv=1.0, texString=r'$\partial \log_{10} Z/\partial r\ (r_\mathrm{SFR})$', log=False, theRange=[-0.5, 0.05])
-
-
-        rAcc = -(self.var['r'].sensible(locIndex=1) - self.var['r'].sensible(locIndex=2)) \
-                /np.log(self.var['colAccr'].sensible(locIndex=1)/self.var['colAccr'].sensible(locIndex=2))
-        if(rAcc[0] < 0): # we're not using an exponential profile apparently!
-            rAccInd = np.argmax(self.var['colAccr'].sensible()*self.var['r'].sensible(), axis=1)
-            rAcc = self.var['r'].sensible(timeIndex=range(self.nt),locIndex=rAccInd)
+            rds = (r2s-r8s)/(np.log(cst8) - np.log(cst2))
+            bmassExtrap = mstcu[:,-1]*0.8 - 2.0*np.pi*cst8*r8s*r8s # grams apparently
+            halfMassRadiiGas = self.var['rb'].sensible()[ts, searchsortedRows(gascu, gascu[:,-1]/2.0)]
+            sfrhalfind = searchsortedRows(sfrcu, sfrcu[:,-1]/2.0)
+            halfMassRadiiSFR = self.var['rb'].sensible()[ts, sfrhalfind]
+            logZ = np.log10(self.var['Z'].cgs())
+            gradZAtHalfSFR = ( (logZ[:,1:] - logZ[:,:-1])/(rSensible[:,1:] - rSensible[:,:-1]) )[ts,sfrhalfind]
+
+            self.var['metallicityGradientR90'] = TimeFunction(metallicityGradientsR90, 'metallicityGradientR90', cgsConv=1.0/cmperkpc, sensibleConv=1.0, texString=r'$\partial\log_{10}Z/\partial r |_{(0.25-1) R_{90}}$', log=False, theRange=[-0.5, 0.05])
+            self.var['metallicityGradient2kpc'] = TimeFunction(metallicityGradients2kpc, 'metallicityGradient2kpc', cgsConv=1.0/cmperkpc, sensibleConv=1.0, texString=r'$\partial\log_{10}Z/\partial r |_{2\ \mathrm{kpc}}$', log=False, theRange=[-0.5, 0.05])
+
+            self.var['BMassFromExtrap'] = TimeFunction( bmassExtrap, 'BMassFromExtrap', cgsConv=1.0, sensibleConv=1.0/gpermsun, texString=r'$M_B (M_\odot)$ extrapolated' )
+
+            self.var['r9'] = TimeFunction( r9s, 'r9', sensibleConv=1/cmperkpc, texString=r'$r_{90\%\ \mathrm{SFR}} (kpc)$')
+            self.var['r8'] = TimeFunction( r8s, 'r8', sensibleConv=1/cmperkpc, texString=r'$r_{80\% M_*} (kpc)$')
+            self.var['r2'] = TimeFunction( r2s, 'r2', sensibleConv=1/cmperkpc, texString=r'$r_{20\% M_*} (kpc)$')
+            self.var['rd82'] = TimeFunction( rds, 'rd82', sensibleConv=1/cmperkpc, texString=r'$r_{d,82} (kpc)$')
+
+            self.var['vPhi22'] = TimeFunction( v22s, 'vPhi22', sensibleConv=1, cgsConv=1.0e5, texString=r'$v_{2.2} (\mathrm{km}/\mathrm{s})$', theRange=[10,500])
+            self.var['fghm'] = TimeFunction( fgHalfMassStars, 'fghm', sensibleConv=1, texString=r'$\langle f_g \rangle_{r_*}$')
+            self.var['fg2hm'] = TimeFunction( fgTwoHalfMassStars, 'fg2hm', sensibleConv=1, texString=r'$\langle f_g \rangle_{2r_*}$')
+            self.var['halfMassStars'] = TimeFunction( halfMassRadiiStars, 'halfMassStars', cgsConv = cmperkpc, texString=r'$r_*$ (kpc)', theRange=[0.1, 10.0])
+            self.var['naiveScaleLength'] = TimeFunction( np.array(halfMassRadiiStars)/1.69, 'naiveScaleLength', cgsConv=cmperkpc, texString=r'$r_d (kpc)$', theRange=[0.1, 10.0])
+            ## This will extract the global maximum in gas column density at any given redshift, and divide by the half stellar mass radius.
+            self.var['radiusOfMaximumColumnDensity'] = TimeFunction( np.array(radiusOfMaxColumnDensity)/self.var['halfMassStars'].cgs(), 'radiusOfMaximumColumnDensity', texString=r'$r_{\max(\Sigma)}/r_*$', log=False, theRange=[0,1.5])
+            self.var['radiusOfMaximumSFR'] = TimeFunction( np.array(radiusOfMaxSFR)/self.var['halfMassStars'].cgs(), 'radiusOfMaximumSFR', texString=r'$r_{\max(\dot{\Sigma}^\mathrm{SF})}/r_*$', log=False, theRange=[0,0.4])
+
+            self.var['halfMassEst'] = TimeFunction( halfMassEst, 'halfMassEst', cgsConv = cmperkpc, texString=r'$r_{*,\mathrm{est}}$ (kpc)', theRange=[0.1, 10.0])
+            self.var['c82'] = TimeFunction( c82Stars, 'c82', cgsConv = 1.0, texString=r'$c_{82} = r_{80}/r_{20}$ ', theRange=[2.0, 30.0])
+            self.var['halfMassGas'] = TimeFunction( halfMassRadiiGas, 'halfMassGas', cgsConv = cmperkpc, texString=r'$r_g$ (kpc)')
+            self.var['naiveGasScaleLength'] = TimeFunction( np.array(halfMassRadiiGas)/1.69, 'naiveGasScaleLength', cgsConv=cmperkpc, texString=r'$r_{d,g} (kpc)$', theRange=[0.1, 10.0])
+            self.var['halfMassSFR'] = TimeFunction( halfMassRadiiSFR, 'halfMassSFR', cgsConv = cmperkpc, texString=r'$r_\mathrm{SFR}$ (kpc)')
+            self.var['metallicityGradient'] = TimeFunction( gradZAtHalfSFR, 'metallicityGradient', cgsConv=1.0/cmperkpc, sensibleConv=1.0, texString=r'$\partial \log_{10} Z/\partial r\ (r_\mathrm{SFR})$', log=False, theRange=[-0.5, 0.05])
+        self.var.define(halfMassNames, TimeFunction, ['mCentral','colst','dA','col','mdotBulgeG','MassLoadingFactor','colsfr','r','Z','vPhi','rb'], halfMass)
+        self.var.define('BTExtrap', TimeFunction, ['BMassFromExtrap','mstar'], lambda: TimeFunction( self.var['BMassFromExtrap'].sensible()/self.var['mstar'].sensible(), 'BMassFromExtrap', texString=r'BT extrapolated', log=False))
+
+
+        def accretionRadius():
+            rAcc = -(self.var['r'].sensible(locIndex=1) - self.var['r'].sensible(locIndex=2)) \
+                    /np.log(self.var['colAccr'].sensible(locIndex=1)/self.var['colAccr'].sensible(locIndex=2))
+            if(rAcc[0] < 0): # we're not using an exponential profile apparently!
+                rAccInd = np.argmax(self.var['colAccr'].sensible()*self.var['r'].sensible(), axis=1)
+                rAcc = self.var['r'].sensible(timeIndex=range(self.nt),locIndex=rAccInd)
+            return TimeFunction( \
+                    rAcc, 'accretionRadius', cgsConv=cmperkpc, texString=r'$r_\mathrm{acc}$',log=False)
 #        self.var['scaleRadius'] = TimeFunction( \
 #                self.p['accScaleLength']*np.power(self.var['Mh'].sensible()/self.p['Mh0'],self.p['alphaAccretionProfile']), \
 #                'accScaleLength',cmperkpc,1.0,r'$r_\mathrm{acc}$ (kpc)',log=False)
-        self.var['accretionRadius'] = TimeFunction( \
-                rAcc, 'accretionRadius', cgsConv=cmperkpc, texString=r'$r_\mathrm{acc}$',log=False)
+        self.var.define('accretionRadius', TimeFunction, ['r','colAccr'], accretionRadius)
 
 
 
         if computeFit:
-            self.globalPowerlaw()
-            self.globalMBulge()
-            self.var['fCentral2'] = TimeFunction( self.var['mCentral'].sensible()/self.var['stFit2MBulge'].sensible(), 'fCentral2', 1,1, r'$M_\mathrm{central} / M_B$', log=True)
+            self.var.define(['stFit2Rd','stFit2Ro','stFit2Rw','stFit2Nb','stFit2Nw','stFit2NTries','stFit2MBulge','stFit2MDisk','stFit2Residual','colstFit2','stFit2BT','stFit3BT'], \
+                    [TimeFunction]*8+[RadialFunction]*2+[TimeFunction]*2, ['r','z','colst','halfMassStars','mstar'], self.globalPowerlaw)
+            self.var.define(['stFitRd','stFitRb','stFitRo','stFitRw','stFitNb','stFitNw','stFitNTries','stFitMBulge','stFitMDisk','stFitResidual','colstFit','stFitBT'], \
+                    [TimeFunction]*9+[RadialFunction]*2+[TimeFunction], ['r','z','colst','halfMassStars'], self.globalMBulge)
+            self.var.define('fCentral2', TimeFunction, ['mCentral','stFit2MBulge'], lambda: TimeFunction( self.var['mCentral'].sensible()/self.var['stFit2MBulge'].sensible(), 'fCentral2', 1,1, r'$M_\mathrm{central} / M_B$', log=True))
 
         #mbulge,_,fcentral,scaleLengths = self.computeMBulge()
         #self.var['mBulge'] = TimeFunction(mbulge,'mBulge',gpermsun,1.0,r'$M_B (M_\odot)$')
@@ -814,323 +1084,365 @@ class SingleModel:
 
         #self.var['fCentral'] = TimeFunction( self.var['mCentral'].sensible()/self.var['stFitMBulge'].sensible(), 'fCentral', 1,1, r'$M_\mathrm{central} / M_B$', log=True)
 
-        cos = halo.Cosmology()
-        vPhiDM = np.zeros((len(self.var['Mh'].sensible()), len(self.var['r'].sensible(timeIndex=0))))
-        vPhiBulge = np.zeros((len(self.var['Mh'].sensible()), len(self.var['r'].sensible(timeIndex=0))))
-        for i in range(len(self.var['Mh'].sensible())):
-            thisHalo = halo.halo(self.var['Mh'].sensible(timeIndex=i),self.var['z'].sensible(timeIndex=i),cos,0) 
-            for j in range(len(self.var['r'].sensible(timeIndex=0))):
-                vPhiDM[i,j] = np.sqrt( Gcgs * thisHalo.mInterior(self.var['r'].sensible(timeIndex=0,locIndex=j)) / self.var['r'].cgs(timeIndex=0,locIndex=j) )
-                vPhiBulge[i,j] = np.sqrt( Gcgs * self.var['mCentral'].cgs(timeIndex=i) / self.var['r'].cgs(timeIndex=0,locIndex=j) )
-
-        self.var['vPhiDM'] = RadialFunction(np.copy(vPhiDM),'vPhiDM', cgsConv=1.0, sensibleConv=1.0e-5, \
-                 texString=r'$v_{\phi,\mathrm{DM}}$ (km/s)',log=False)
-        self.var['vPhiBulge'] = RadialFunction(np.copy(vPhiBulge), 'vPhiBulge', cgsConv=1.0, sensibleConv=1.0e-5, \
-                 texString=r'$v_{\phi, \mathrm{bulge}}$ (km/s)',log=False)
-        vPhiDisk = np.power(self.var['vPhi'].cgs(),2.0) - np.power(self.var['vPhiDM'].cgs(),2.0) - np.power(self.var['vPhiBulge'].cgs(),2.0)
-        bad = np.logical_or(vPhiDisk != vPhiDisk, vPhiDisk<0)
-        vPhiDisk[bad] = 0
-        self.var['vPhiDisk'] = RadialFunction(np.sqrt(vPhiDisk) , 'vPhiDisk', cgsConv=1.0, sensibleConv=1.0e-5, texString=r'$v_{\phi, \mathrm{disk}} (km/s)$', log=False)
-        
-        self.var['gbar'] = RadialFunction( (np.power(self.var['vPhiDisk'].cgs(),2.0)+np.power(self.var['vPhiBulge'].cgs(),2.0))/self.var['r'].cgs(), 'gbar', cgsConv = 1.0, sensibleConv = 1.0e-2, texString=r'$g_\mathrm{bar} (\mathrm{m}\ \mathrm{s}^{-2})$', log=True, theRange=[1.0e-12, 3.0e-8] )
-        self.var['gtot'] = RadialFunction( np.power(self.var['vPhi'].cgs(),2.0)/self.var['r'].cgs(), 'gtot', cgsConv = 1.0, sensibleConv = 1.0e-2, texString=r'$g_\mathrm{tot} (\mathrm{m}\ \mathrm{s}^{-2})$', log=True, theRange=[1.0e-12, 3.0e-8] )
-
-
-        self.var['vOverSigGas'] = RadialFunction(self.var['vPhi'].sensible()/self.var['sig'].sensible(),'vOverSigGas',texString=r'$v_\phi/\sigma$',log=True)
-        self.var['vOverSigStR'] = RadialFunction(self.var['vPhi'].sensible()/self.var['sigstR'].sensible(),'vOverSigStR',texString=r'$v_\phi/\sigma_{*,r}$',log=True)
-        self.var['vOverSigStZ'] = RadialFunction(self.var['vPhi'].sensible()/self.var['sigstZ'].sensible(),'vOverSigStZ',texString=r'$v_\phi/\sigma_{*,z}$',log=True)
-        self.var['spEnergy'] = RadialFunction(np.sqrt(np.power(self.var['vPhi'].sensible(),2.0) + 1.5*np.power(self.var['sig'].sensible(),2.0)), 'spEnergy', sensibleConv=1.0, cgsConv=1.0e5, texString=r'$\sqrt{v_\phi^2 + 1.5 \sigma^2}$')
-
-        self.var['vrst'] = RadialFunction(np.copy(self.dataCube[:,:,34]),'vrst',self.p['vphiR']*1.0e5,self.p['vphiR'], \
-                 r'$v_{r,*}$',log=False)
-        self.var['vrg'] = RadialFunction(np.copy(self.dataCube[:,:,36]),'vrg',self.p['vphiR']*1.0e5,self.p['vphiR'], \
-                 r'$v_{r,g}$',log=False)
-        self.var['NHI'] = RadialFunction(self.getData('col',cgs=True)*(1.0-self.getData('fH2'))*(1.0-self.getData('Z',cgs=True))/gperH,\
-                'NHI', 1.0,1.0,r'$N_{\mathrm{HI}}$ (cm$^{-2}$)', theRange=[1.0e17, 1.0e22])
-        self.var['sfr'] = TimeFunction( \
+        def vPhiDMBulge():
+            cos = halo.Cosmology()
+            # One halo per timestep, broadcast against the radial grid, so these are both (nt, nx).
+            thisHalo = halo.halo(self.var['Mh'].sensible()[:,None],self.var['z'].sensible()[:,None],cos,0)
+            r = self.var['r'].cgs(timeIndex=0)[None,:]
+            vPhiDM = np.sqrt( Gcgs * thisHalo.mInterior(self.var['r'].sensible(timeIndex=0)[None,:]) / r )
+            vPhiBulge = np.sqrt( Gcgs * self.var['mCentral'].cgs()[:,None] / r )
+
+            return [ RadialFunction(vPhiDM,'vPhiDM', cgsConv=1.0, sensibleConv=1.0e-5, \
+                     texString=r'$v_{\phi,\mathrm{DM}}$ (km/s)',log=False), \
+                     RadialFunction(vPhiBulge, 'vPhiBulge', cgsConv=1.0, sensibleConv=1.0e-5, \
+                     texString=r'$v_{\phi, \mathrm{bulge}}$ (km/s)',log=False) ]
+        self.var.define(['vPhiDM','vPhiBulge'], RadialFunction, ['Mh','z','r','mCentral'], vPhiDMBulge)
+        def vPhiDisk():
+            vPhiDisk = np.power(self.var['vPhi'].cgs(),2.0) - np.power(self.var['vPhiDM'].cgs(),2.0) - np.power(self.var['vPhiBulge'].cgs(),2.0)
+            bad = np.logical_or(vPhiDisk != vPhiDisk, vPhiDisk<0)
+            vPhiDisk[bad] = 0
+            return RadialFunction(np.sqrt(vPhiDisk) , 'vPhiDisk', cgsConv=1.0, sensibleConv=1.0e-5, texString=r'$v_{\phi, \mathrm{disk}} (km/s)$', log=False)
+        self.var.define('vPhiDisk', RadialFunction, ['vPhi','vPhiDM','vPhiBulge'], vPhiDisk)
+
+        self.var.define('gbar', RadialFunction, ['vPhiDisk','vPhiBulge','r'], lambda: RadialFunction( (np.power(self.var['vPhiDisk'].cgs(),2.0)+np.power(self.var['vPhiBulge'].cgs(),2.0))/self.var['r'].cgs(), 'gbar', cgsConv = 1.0, sensibleConv = 1.0e-2, texString=r'$g_\mathrm{bar} (\mathrm{m}\ \mathrm{s}^{-2})$', log=True, theRange=[1.0e-12, 3.0e-8] ))
+        self.var.define('gtot', RadialFunction, ['vPhi','r'], lambda: RadialFunction( np.power(self.var['vPhi'].cgs(),2.0)/self.var['r'].cgs(), 'gtot', cgsConv = 1.0, sensibleConv = 1.0e-2, texString=r'$g_\mathrm{tot} (\mathrm{m}\ \mathrm{s}^{-2})$', log=True, theRange=[1.0e-12, 3.0e-8] ))
+
+
+        self.var.define('vOverSigGas', RadialFunction, ['vPhi','sig'], lambda: RadialFunction(self.var['vPhi'].sensible()/self.var['sig'].sensible(),'vOverSigGas',texString=r'$v_\phi/\sigma$',log=True))
+        self.var.define('vOverSigStR', RadialFunction, ['vPhi','sigstR'], lambda: RadialFunction(self.var['vPhi'].sensible()/self.var['sigstR'].sensible(),'vOverSigStR',texString=r'$v_\phi/\sigma_{*,r}$',log=True))
+        self.var.define('vOverSigStZ', RadialFunction, ['vPhi','sigstZ'], lambda: RadialFunction(self.var['vPhi'].sensible()/self.var['sigstZ'].sensible(),'vOverSigStZ',texString=r'$v_\phi/\sigma_{*,z}$',log=True))
+        self.var.define('spEnergy', RadialFunction, ['vPhi','sig'], lambda: RadialFunction(np.sqrt(np.power(self.var['vPhi'].sensible(),2.0) + 1.5*np.power(self.var['sig'].sensible(),2.0)), 'spEnergy', sensibleConv=1.0, cgsConv=1.0e5, texString=r'$\sqrt{v_\phi^2 + 1.5 \sigma^2}$'))
+
+        self.var.define('vrst', RadialFunction, [], lambda: RadialFunction(np.copy(self.dataCube[:,:,34]),'vrst',self.p['vphiR']*1.0e5,self.p['vphiR'], \
+                 r'$v_{r,*}$',log=False), columns=[34])
+        self.var.define('vrg', RadialFunction, [], lambda: RadialFunction(np.copy(self.dataCube[:,:,36]),'vrg',self.p['vphiR']*1.0e5,self.p['vphiR'], \
+                 r'$v_{r,g}$',log=False), columns=[36])
+        self.var.define('NHI', RadialFunction, ['col','fH2','Z'], lambda: RadialFunction(self.var['col'].cgs()*(1.0-self.var['fH2'].sensible())*(1.0-self.var['Z'].cgs())/gperH,\
+                'NHI', 1.0,1.0,r'$N_{\mathrm{HI}}$ (cm$^{-2}$)', theRange=[1.0e17, 1.0e22]))
+        self.var.define('sfr', TimeFunction, ['mdotBulgeG','MassLoadingFactor','dA','colsfr'], lambda: TimeFunction( \
                 self.var['mdotBulgeG'].sensible()*self.p['RfREC']/(self.p['RfREC']+self.var['MassLoadingFactor'].inner()) \
                 +np.sum( self.var['dA'].sensible()*self.var['colsfr'].sensible(), 1 ), \
-                'sfr',gpermsun/speryear, 1.0, r'$\dot{M}_\mathrm{SF}\ (M_\odot\ \mathrm{yr}^{-1}$)', theRange=[5.0e-5,1.0e3])
+                'sfr',gpermsun/speryear, 1.0, r'$\dot{M}_\mathrm{SF}\ (M_\odot\ \mathrm{yr}^{-1}$)', theRange=[5.0e-5,1.0e3]))
 
 
-        self.var['mstarIntegrated'] = TimeFunction( self.var['mstar'].cgs(timeIndex=0) + np.cumsum(self.var['sfr'].cgs()*self.var['dt'].cgs()), 'mstarIntegrated', cgsConv=1.0, sensibleConv=1.0/gpermsun, texString=r'$\int \mathrm{SFR} dt$')
+        self.var.define('mstarIntegrated', TimeFunction, ['mstar','sfr','dt'], lambda: TimeFunction( self.var['mstar'].cgs(timeIndex=0) + np.cumsum(self.var['sfr'].cgs()*self.var['dt'].cgs()), 'mstarIntegrated', cgsConv=1.0, sensibleConv=1.0/gpermsun, texString=r'$\int \mathrm{SFR} dt$'))
 
-        self.var['sigmaPerSFR'] = TimeFunction( np.sqrt(self.var['maxsig'].sensible()**2.0 - 7.601**2.0)/self.var['sfr'].sensible(), 'sigmaPerSFR', sensibleConv=1.0, cgsConv=1.0e5/(gpermsun/speryear), texString=r'$\sigma_\mathrm{max}/\mathrm{SFR} (\mathrm{km}/\mathrm{s}/(M_\odot/\mathrm{yr}))$' , theRange=[0.1,50.0])
-        onekpc = np.searchsorted( self.var['r'].sensible(timeIndex=-1), 1.0 )+1
-        if onekpc>=self.p['nx']:
-            onekpc=int(self.p['nx']-1)
+        self.var.define('sigmaPerSFR', TimeFunction, ['maxsig','sfr'], lambda: TimeFunction( np.sqrt(self.var['maxsig'].sensible()**2.0 - 7.601**2.0)/self.var['sfr'].sensible(), 'sigmaPerSFR', sensibleConv=1.0, cgsConv=1.0e5/(gpermsun/speryear), texString=r'$\sigma_\mathrm{max}/\mathrm{SFR} (\mathrm{km}/\mathrm{s}/(M_\odot/\mathrm{yr}))$' , theRange=[0.1,50.0]))
+        def onekpc():
+            onekpc = np.searchsorted( self.var['r'].sensible(timeIndex=-1), 1.0 )+1
+            if onekpc>=self.p['nx']:
+                onekpc=int(self.p['nx']-1)
+            return onekpc
 
-        self.var['v1kpc'] = TimeFunction( np.sqrt(  np.sum( (15.0**2.0 + np.power(self.var['vPhi'].sensible(locIndex=range(onekpc)),2.0)+np.power(self.var['sig'].sensible(locIndex=range(onekpc)),2.0))* self.var['dA'].cgs(locIndex=range(onekpc)) * self.var['col'].cgs(locIndex=range(onekpc)),axis=1)/np.sum(  self.var['dA'].cgs(locIndex=range(onekpc)) * self.var['col'].cgs(locIndex=range(onekpc)),axis=1 )   ), 'v1kpc', sensibleConv=1.0, cgsConv=1.0e5, texString=r'$\langle \sqrt{v_\phi^2 + \sigma^2} \rangle_\mathrm{1 kpc}$ ') # "beam-smeared" velocity dispersion in central kpc
+        def v1kpc():
+            onekpcI = onekpc()
+            return TimeFunction( np.sqrt(  np.sum( (15.0**2.0 + np.power(self.var['vPhi'].sensible(locIndex=range(onekpcI)),2.0)+np.power(self.var['sig'].sensible(locIndex=range(onekpcI)),2.0))* self.var['dA'].cgs(locIndex=range(onekpcI)) * self.var['col'].cgs(locIndex=range(onekpcI)),axis=1)/np.sum(  self.var['dA'].cgs(locIndex=range(onekpcI)) * self.var['col'].cgs(locIndex=range(onekpcI)),axis=1 )   ), 'v1kpc', sensibleConv=1.0, cgsConv=1.0e5, texString=r'$\langle \sqrt{v_\phi^2 + \sigma^2} \rangle_\mathrm{1 kpc}$ ') # "beam-smeared" velocity dispersion in central kpc
+        self.var.define('v1kpc', TimeFunction, ['r','vPhi','sig','dA','col'], v1kpc)
 
-        self.var['v1PerSFR'] = TimeFunction( self.var['v1kpc'].sensible()/self.var['sfr'].sensible(), 'v1PerSFR', sensibleConv=1.0, cgsConv=1.0e5/(gpermsun/speryear), texString=r'$\frac{\langle \sqrt{v_\phi^2 + \sigma^2} \rangle_\mathrm{1 kpc}}{\mathrm{SFR}}$' )
+        self.var.define('v1PerSFR', TimeFunction, ['v1kpc','sfr'], lambda: TimeFunction( self.var['v1kpc'].sensible()/self.var['sfr'].sensible(), 'v1PerSFR', sensibleConv=1.0, cgsConv=1.0e5/(gpermsun/speryear), texString=r'$\frac{\langle \sqrt{v_\phi^2 + \sigma^2} \rangle_\mathrm{1 kpc}}{\mathrm{SFR}}$' ))
 
-        self.var['sfrPerAccr'] = TimeFunction( \
-                np.clip(self.var['sfr'].cgs()/self.var['mdotAccr'].cgs(),0,10),'sfrPerAccr',1.0,1.0, theRange=[1.0e-3,10.0], texString=r'$\dot{M}_*/\dot{M}_\mathrm{accr}$')
+        self.var.define('sfrPerAccr', TimeFunction, ['sfr','mdotAccr'], lambda: TimeFunction( \
+                np.clip(self.var['sfr'].cgs()/self.var['mdotAccr'].cgs(),0,10),'sfrPerAccr',1.0,1.0, theRange=[1.0e-3,10.0], texString=r'$\dot{M}_*/\dot{M}_\mathrm{accr}$'))
 
         def areaWeightedWithin( varName, maxRadius):
             radiusInd = np.searchsorted( self.var['r'].sensible(timeIndex=-1), maxRadius)
             mInt = np.sum(self.var['dA'].cgs(locIndex=range(radiusInd))*self.var[varName].cgs(locIndex=range(radiusInd)), 1)
             return mInt
-        eightkpc = np.searchsorted( self.var['r'].sensible(timeIndex=-1), 8.0 )
-        m1kpc = self.var['mCentral'].cgs() + areaWeightedWithin('colst', 1.0) # mass within 1 kpc 
-        self.var['Sigma1'] = TimeFunction( \
+        def Sigma1():
+            m1kpc = self.var['mCentral'].cgs() + areaWeightedWithin('colst', 1.0) # mass within 1 kpc
+            return TimeFunction( \
                 m1kpc/(1.0*cmperkpc)**2.0, 'Sigma1', cgsConv=1.0, sensibleConv = cmperkpc**2/gpermsun, \
                 texString=r'$\langle\Sigma_{*}\rangle_\mathrm{1 kpc}$', theRange=[1.0e7,1.0e10])
-        self.var['rho'] = RadialFunction( 0.5*self.var['col'].cgs()/self.var['hGas'].cgs(), 'rho', 1.0, 1.0, r'$\rho (\mathrm{g}\ \mathrm{cm}^{-3})$' )
-
-        theDeriv = np.zeros( np.shape(self.var['rho'].cgs()) )
-        arg = self.var['rho'].cgs() * np.power(self.var['sig'].cgs(),2.0) # to be numerically differentiated
-        theDeriv[:,:-1] = (arg[:,1:] - arg[:,:-1])/(np.log(self.var['r'].cgs()[:,1:]) - np.log(self.var['r'].cgs()[:,:-1]))
-        theDeriv[:,-1] = theDeriv[:,-2] # just sub in the last value to deal with the fact that this stenciled derivative has 1 fewer radial element than we need.
-        ## vphi^2 = vcirc^2 + (1/rho) * d/dlnr (rho * sig*sig)
-        arg2 = np.power(self.var['vPhi'].cgs(),2.0) + theDeriv/self.var['rho'].cgs()
-        vPhiGas = np.sqrt( np.clip(arg2, 1.0e12, None) ) # guarantee that the final answer is above 10 km/s
-        self.var['vPhiGasRadial'] = RadialFunction( vPhiGas,'vPhiGasRadial', cgsConv=1.0, sensibleConv=1.0e-5, \
-                 texString=r'$v_{\phi,\mathrm{gas}}$ (km/s)',log=True) 
+        self.var.define('Sigma1', TimeFunction, ['mCentral','r','dA','colst'], Sigma1)
+        self.var.define('rho', RadialFunction, ['col','hGas'], lambda: RadialFunction( 0.5*self.var['col'].cgs()/self.var['hGas'].cgs(), 'rho', 1.0, 1.0, r'$\rho (\mathrm{g}\ \mathrm{cm}^{-3})$' ))
+
+        def vPhiGasRadial():
+            theDeriv = np.zeros( np.shape(self.var['rho'].cgs()) )
+            arg = self.var['rho'].cgs() * np.power(self.var['sig'].cgs(),2.0) # to be numerically differentiated
+            theDeriv[:,:-1] = (arg[:,1:] - arg[:,:-1])/(np.log(self.var['r'].cgs()[:,1:]) - np.log(self.var['r'].cgs()[:,:-1]))
+            theDeriv[:,-1] = theDeriv[:,-2] # just sub in the last value to deal with the fact that this stenciled derivative has 1 fewer radial element than we need.
+            ## vphi^2 = vcirc^2 + (1/rho) * d/dlnr (rho * sig*sig)
+            arg2 = np.power(self.var['vPhi'].cgs(),2.0) + theDeriv/self.var['rho'].cgs()
+            vPhiGas = np.sqrt( np.clip(arg2, 1.0e12, None) ) # guarantee that the final answer is above 10 km/s
+            return RadialFunction( vPhiGas,'vPhiGasRadial', cgsConv=1.0, sensibleConv=1.0e-5, \
+                     texString=r'$v_{\phi,\mathrm{gas}}$ (km/s)',log=True)
+        self.var.define('vPhiGasRadial', RadialFunction, ['rho','sig','r','vPhi'], vPhiGasRadial)
 
         # A very rough estimate of the asymmetric drift for the stars
-        vrbarsq = np.power(self.var['sigstR'].cgs(),2.0) + np.power(self.var['vrst'].cgs(),2.0)
-        theDeriv = np.zeros( np.shape(self.var['rho'].cgs()) )
-        arg = np.log(self.var['colst'].cgs()/(2.0*self.var['hStars'].cgs()) * np.power(self.var['sigstR'].cgs(),2.0)) # to be numerically differentiated 
-        theDeriv[:,:-1] = (arg[:,1:] - arg[:,:-1])/(np.log(self.var['r'].cgs()[:,1:]) - np.log(self.var['r'].cgs()[:,:-1]))
-        theDeriv[:,-1] = theDeriv[:,-2] # just sub in the last value to deal with the fact that this stenciled derivative has 1 fewer radial element than we need.
-        dlnrhovrbardlnr = theDeriv
-        va = vrbarsq / (2.0*self.var['vPhi'].cgs()) * ( np.power(self.var['sigstZ'].cgs(),2.0)/vrbarsq - 1.0 - dlnrhovrbardlnr - 0)        
-        self.var['vPhiStarsRadial'] = RadialFunction( self.var['vPhi'].cgs() - va, 'vPhiStarsRadial', cgsConv=1.0, sensibleConv=1.0e-5, texString=r'$v_{\phi,\mathrm{stars}}$ (km/s)', log=True)
-    
-
-
-        self.var['colHI']= RadialFunction(np.clip((1.0-np.copy(self.dataCube[:,:,47])) * self.var['col'].sensible()*0.8 - 2.0* 0.00876/(self.var['rho'].cgs()/gperH),1.0e-4,np.inf),'colHI', \
-                cgsConv = gpermsun/cmperpc**2, sensibleConv=1, texString=r'$\Sigma_{\mathrm{HI}} (M_\odot/\mathrm{pc}^2)$',log=True,theRange=[0.02,3000.0])
-        self.var['MHI'] = TimeFunction( np.sum(self.var['colHI'].cgs()*self.var['dA'].cgs(),axis=1), 'MHI', cgsConv=1.0, sensibleConv=1.0/gpermsun, texString=r'$M_\mathrm{HI}\ (M_\odot)$')
-        for z in range(len(self.var['z'].sensible())):
-            HIdisk = self.var['colHI'].sensible(timeIndex=z) > 1.0 # Where is the HI column density greater than 1 Msun/pc^2
-            if np.any(HIdisk):
-                HIradius.append( np.max(self.var['r'].sensible(timeIndex=z)[HIdisk]) )
-            else:
-                HIradius.append( self.var['r'].sensible(timeIndex=z,locIndex=-1))
-        self.var['broeilsHI'] = TimeFunction(HIradius, 'broeilsHI', cgsConv=cmperkpc,texString=r'$R_{\Sigma_\mathrm{HI} = 1 M_\odot/\mathrm{pc}^2 }\ (\mathrm{kpc})$', theRange=[1.0,60.0])
-        r1 = np.searchsorted(self.var['r'].sensible(timeIndex=-1), 1.0) # find the index of the cell closest to 1 kpc
-        r1 = np.max([r1,2]) # guarantee that quantities defined within 1 kpc are not NaN if xmin>1 kpc. Ideally the user would have specified parameters such that the mesh is resolved further in that 1 kpc, but what can you do?
-        if r1==2:
-            print ("WARNING: Central kpc not resolved at all. Derived quantities defined within central kpc not reliable. Consider adjusting xmin and R: ", self.p['xmin'], self.p['R'], self.p['Mh0'])
-        numerator = np.sum( self.var['col'].cgs(locIndex=range(r1))*self.var['dA'].cgs(locIndex=range(r1))*self.var['rho'].cgs(locIndex=range(r1)), 1 )
-        denominator = np.sum( self.var['col'].cgs(locIndex=range(r1))*self.var['dA'].cgs(locIndex=range(r1)),1 )
-        self.var['rho1'] = TimeFunction( numerator  / denominator   ,  'rho1', 1.0, 1.0, r'$\langle \rho \rangle_\mathrm{1 kpc} (\mathrm{g}\ \mathrm{cm}^{-3})$'  )
-        self.var['mgas']=TimeFunction( \
+        def vPhiStarsRadial():
+            vrbarsq = np.power(self.var['sigstR'].cgs(),2.0) + np.power(self.var['vrst'].cgs(),2.0)
+            theDeriv = np.zeros( np.shape(self.var['rho'].cgs()) )
+            arg = np.log(self.var['colst'].cgs()/(2.0*self.var['hStars'].cgs()) * np.power(self.var['sigstR'].cgs(),2.0)) # to be numerically differentiated
+            theDeriv[:,:-1] = (arg[:,1:] - arg[:,:-1])/(np.log(self.var['r'].cgs()[:,1:]) - np.log(self.var['r'].cgs()[:,:-1]))
+            theDeriv[:,-1] = theDeriv[:,-2] # just sub in the last value to deal with the fact that this stenciled derivative has 1 fewer radial element than we need.
+            dlnrhovrbardlnr = theDeriv
+            va = vrbarsq / (2.0*self.var['vPhi'].cgs()) * ( np.power(self.var['sigstZ'].cgs(),2.0)/vrbarsq - 1.0 - dlnrhovrbardlnr - 0)
+            return RadialFunction( self.var['vPhi'].cgs() - va, 'vPhiStarsRadial', cgsConv=1.0, sensibleConv=1.0e-5, texString=r'$v_{\phi,\mathrm{stars}}$ (km/s)', log=True)
+        self.var.define('vPhiStarsRadial', RadialFunction, ['sigstR','vrst','rho','colst','hStars','r','vPhi','sigstZ'], vPhiStarsRadial)
+
+
+
+        self.var.define('colHI', RadialFunction, ['col','rho'], lambda: RadialFunction(np.clip((1.0-self.dataCube[:,:,47]) * self.var['col'].sensible()*0.8 - 2.0* 0.00876/(self.var['rho'].cgs()/gperH),1.0e-4,np.inf),'colHI', \
+                cgsConv = gpermsun/cmperpc**2, sensibleConv=1, texString=r'$\Sigma_{\mathrm{HI}} (M_\odot/\mathrm{pc}^2)$',log=True,theRange=[0.02,3000.0]), columns=[47])
+        self.var.define('MHI', TimeFunction, ['colHI','dA'], lambda: TimeFunction( np.sum(self.var['colHI'].cgs()*self.var['dA'].cgs(),axis=1), 'MHI', cgsConv=1.0, sensibleConv=1.0/gpermsun, texString=r'$M_\mathrm{HI}\ (M_\odot)$'))
+        def broeilsHI():
+            HIradius=[]
+            for z in range(len(self.var['z'].sensible())):
+                HIdisk = self.var['colHI'].sensible(timeIndex=z) > 1.0 # Where is the HI column density greater than 1 Msun/pc^2
+                if np.any(HIdisk):
+                    HIradius.append( np.max(self.var['r'].sensible(timeIndex=z)[HIdisk]) )
+                else:
+                    HIradius.append( self.var['r'].sensible(timeIndex=z,locIndex=-1))
+            return TimeFunction(HIradius, 'broeilsHI', cgsConv=cmperkpc,texString=r'$R_{\Sigma_\mathrm{HI} = 1 M_\odot/\mathrm{pc}^2 }\ (\mathrm{kpc})$', theRange=[1.0,60.0])
+        self.var.define('broeilsHI', TimeFunction, ['z','colHI','r'], broeilsHI)
+        def rho1():
+            r1 = np.searchsorted(self.var['r'].sensible(timeIndex=-1), 1.0) # find the index of the cell closest to 1 kpc
+            r1 = np.max([r1,2]) # guarantee that quantities defined within 1 kpc are not NaN if xmin>1 kpc. Ideally the user would have specified parameters such that the mesh is resolved further in that 1 kpc, but what can you do?
+            if r1==2:
+                print ("WARNING: Central kpc not resolved at all. Derived quantities defined within central kpc not reliable. Consider adjusting xmin and R: ", self.p['xmin'], self.p['R'], self.p['Mh0'])
+            numerator = np.sum( self.var['col'].cgs(locIndex=range(r1))*self.var['dA'].cgs(locIndex=range(r1))*self.var['rho'].cgs(locIndex=range(r1)), 1 )
+            denominator = np.sum( self.var['col'].cgs(locIndex=range(r1))*self.var['dA'].cgs(locIndex=range(r1)),1 )
+            return TimeFunction( numerator  / denominator   ,  'rho1', 1.0, 1.0, r'$\langle \rho \rangle_\mathrm{1 kpc} (\mathrm{g}\ \mathrm{cm}^{-3})$'  )
+        self.var.define('rho1', TimeFunction, ['r','col','dA','rho'], rho1)
+        self.var.define('mgas', TimeFunction, ['dA','col'], lambda: TimeFunction( \
                 np.sum(self.var['dA'].cgs()*self.var['col'].cgs(), 1),'mgas', \
-                1.0,1.0/gpermsun,r'$M_g$ (M$_\odot$)', theRange=[1e8,1e11])
-        self.var['mbar']=TimeFunction( \
+                1.0,1.0/gpermsun,r'$M_g$ (M$_\odot$)', theRange=[1e8,1e11]))
+        self.var.define('mbar', TimeFunction, ['mgas','mstar'], lambda: TimeFunction( \
                 self.var['mgas'].sensible()+self.var['mstar'].sensible(), 'mbar', cgsConv=gpermsun, sensibleConv=1.0, \
-                texString=r'$M_\mathrm{bar} (M_\odot)$', theRange=[1e8, 3e11])
-
-        self.var['gasToStellarRatio'] = TimeFunction( self.var['mgas'].sensible()/self.var['mstar'].sensible(), 'gasToStellarRatio', texString=r'$M_g/M_*$')
-        self.var['tdep']=TimeFunction( \
-                self.var['mgas'].cgs()/self.var['sfr'].cgs(),'tdep',1.0,1.0/speryear,r't$_\mathrm{dep}$ (yr)')
-        self.var['efficiency'] = TimeFunction( \
-                self.var['mstar'].cgs()/self.var['Mh'].cgs(), 'efficiency',1.0,1.0,r'$M_*/M_h$',log=True)
-        self.var['fg'] = TimeFunction( \
+                texString=r'$M_\mathrm{bar} (M_\odot)$', theRange=[1e8, 3e11]))
+
+        self.var.define('gasToStellarRatio', TimeFunction, ['mgas','mstar'], lambda: TimeFunction( self.var['mgas'].sensible()/self.var['mstar'].sensible(), 'gasToStellarRatio', texString=r'$M_g/M_*$'))
+        self.var.define('tdep', TimeFunction, ['mgas','sfr'], lambda: TimeFunction( \
+                self.var['mgas'].cgs()/self.var['sfr'].cgs(),'tdep',1.0,1.0/speryear,r't$_\mathrm{dep}$ (yr)'))
+        self.var.define('efficiency', TimeFunction, ['mstar','Mh'], lambda: TimeFunction( \
+                self.var['mstar'].cgs()/self.var['Mh'].cgs(), 'efficiency',1.0,1.0,r'$M_*/M_h$',log=True))
+        self.var.define('fg', TimeFunction, ['mgas','mstar'], lambda: TimeFunction( \
                 self.var['mgas'].cgs() / (self.var['mgas'].cgs()+self.var['mstar'].cgs()), \
-                'fg',1.0,1.0,r'$f_g$', log=False)
-        self.var['fgRadial'] = RadialFunction( \
+                'fg',1.0,1.0,r'$f_g$', log=False))
+        self.var.define('fgRadial', RadialFunction, ['col','colst'], lambda: RadialFunction( \
                 self.var['col'].cgs()/(self.var['col'].cgs()+self.var['colst'].cgs()), \
-                'fgRadial',1.0,1.0,r'$f_g = \Sigma/(\Sigma_*+\Sigma)$', log=False)
-        self.var['sSFRRadial'] = RadialFunction( self.var['colsfr'].cgs()/self.var['colst'].cgs(), 'sSFRRadial',
-                sensibleConv=speryear*1.0e9, cgsConv=1.0, texString=r'$\dot{\Sigma}_\mathrm{SF}/\Sigma_* (\mathrm{Gyr}^{-1})$', theRange=[1.0e-3, 10.0])
+                'fgRadial',1.0,1.0,r'$f_g = \Sigma/(\Sigma_*+\Sigma)$', log=False))
+        self.var.define('sSFRRadial', RadialFunction, ['colsfr','colst'], lambda: RadialFunction( self.var['colsfr'].cgs()/self.var['colst'].cgs(), 'sSFRRadial',
+                sensibleConv=speryear*1.0e9, cgsConv=1.0, texString=r'$\dot{\Sigma}_\mathrm{SF}/\Sigma_* (\mathrm{Gyr}^{-1})$', theRange=[1.0e-3, 10.0]))
 
-        self.var['tDepH2Radial'] = RadialFunction( \
+        self.var.define('tDepH2Radial', RadialFunction, ['fH2','col','colsfr'], lambda: RadialFunction( \
                 self.var['fH2'].cgs()*self.var['col'].cgs()/self.var['colsfr'].cgs(), 'tDepH2Radial',\
-                1.0, 1.0/speryear, r'$t_{\mathrm{dep},H_2}\ \mathrm{(yr)}$')
-        self.var['sSFR'] = TimeFunction(self.getData('sfr',cgs=True)/self.getData('mstar',cgs=True) , \
-                'sSFR',1.0,1.0e9*speryear,r'sSFR (Gyr$^{-1}$)', theRange=[3.0e-4, 30.0])
-        mg = self.getData('col',cgs=True)*self.getData('dA',cgs=True)
-        self.var['massWeightedMetallicityGradient'] = TimeFunction( np.sum( (np.log10(self.var['Z'].cgs())[:,1:] - np.log10(self.var['Z'].cgs())[:,:-1])*mg[:,:-1]/(self.var['r'].sensible()[:,1:] - self.var['r'].sensible()[:,:-1]), axis=1)/np.sum(mg,axis=1), \
+                1.0, 1.0/speryear, r'$t_{\mathrm{dep},H_2}\ \mathrm{(yr)}$'))
+        self.var.define('sSFR', TimeFunction, ['sfr','mstar'], lambda: TimeFunction(self.var['sfr'].cgs()/self.var['mstar'].cgs() , \
+                'sSFR',1.0,1.0e9*speryear,r'sSFR (Gyr$^{-1}$)', theRange=[3.0e-4, 30.0]))
+        def mg():
+            return self.var['col'].cgs()*self.var['dA'].cgs()
+        def massWeightedMetallicityGradient():
+            mgArr = mg()
+            return TimeFunction( np.sum( (np.log10(self.var['Z'].cgs())[:,1:] - np.log10(self.var['Z'].cgs())[:,:-1])*mgArr[:,:-1]/(self.var['r'].sensible()[:,1:] - self.var['r'].sensible()[:,:-1]), axis=1)/np.sum(mgArr,axis=1), \
                 'massWeightedMetallicityGradient', cgsConv=1.0/cmperkpc, sensibleConv=1.0, texString=r'$\langle \partial \log_{10} Z/\partial r \rangle$', log=False, theRange=[-0.5,0.05])
-        self.var['integratedZ'] = TimeFunction(np.sum(mg*self.getData('Z',cgs=True),axis=1)/np.sum(mg,axis=1), \
+        self.var.define('massWeightedMetallicityGradient', TimeFunction, ['Z','r','col','dA'], massWeightedMetallicityGradient)
+        def integratedZ():
+            mgArr = mg()
+            return TimeFunction(np.sum(mgArr*self.var['Z'].cgs(),axis=1)/np.sum(mgArr,axis=1), \
                 'integratedZ', cgsConv=1.0, sensibleConv=1.0/.02, texString=r'$Z_g (Z_\odot)$')
-        stZ = np.zeros(np.shape(self.var['Z'].sensible()))
-        alphaFeStNum = np.zeros(np.shape(self.var['Z'].sensible()))
-        alphaFeStDenom = np.zeros(np.shape(self.var['Z'].sensible()))
-        denom = np.zeros(np.shape(self.var['Z'].sensible()))
-        sumcol = np.zeros(np.shape(self.var['Z'].sensible()))
-        for i in range(100):
-            sti = str(i).zfill(2)
-            if 'Zst'+sti in self.var.keys():
-                denom += self.var['colst'+sti].cgs() * self.var['dA'].cgs()
-                sumcol += self.var['colst'+sti].cgs() 
-                stZ += self.var['Zst'+sti].cgs() * self.var['colst'+sti].cgs() * self.var['dA'].cgs() 
-                alphaFeStNum += self.var['colst'+sti].cgs() * self.var['Zst'+sti].cgs() * 1.0/(2.09 +1.06 / np.power(10.0,self.var['alphaFeSt'+sti].cgs())) 
-                alphaFeStDenom += self.var['colst'+sti].cgs() * self.var['Zst'+sti].cgs() * 1.0/(1.06 +2.09* np.power(10.0,self.var['alphaFeSt'+sti].cgs())) 
-                if i==99:
-                    print ("WARNING: MAY HAVE MISSED SOME STELLAR POPULATIONS IN COMPUTING Zst!")
-            else:
-                if i==0 and keepStars:
-                    assert False # Something has gone wrong!
-                break
+        self.var.define('integratedZ', TimeFunction, ['col','dA','Z'], integratedZ)
+        def stZ():
+            stZ = np.zeros(np.shape(self.var['Z'].sensible()))
+            alphaFeStNum = np.zeros(np.shape(self.var['Z'].sensible()))
+            alphaFeStDenom = np.zeros(np.shape(self.var['Z'].sensible()))
+            denom = np.zeros(np.shape(self.var['Z'].sensible()))
+            sumcol = np.zeros(np.shape(self.var['Z'].sensible()))
+            for i in range(100):
+                sti = str(i).zfill(2)
+                if 'Zst'+sti in self.var.keys():
+                    denom += self.var['colst'+sti].cgs() * self.var['dA'].cgs()
+                    sumcol += self.var['colst'+sti].cgs()
+                    stZ += self.var['Zst'+sti].cgs() * self.var['colst'+sti].cgs() * self.var['dA'].cgs()
+                    alphaFeStNum += self.var['colst'+sti].cgs() * self.var['Zst'+sti].cgs() * 1.0/(2.09 +1.06 / np.power(10.0,self.var['alphaFeSt'+sti].cgs()))
+                    alphaFeStDenom += self.var['colst'+sti].cgs() * self.var['Zst'+sti].cgs() * 1.0/(1.06 +2.09* np.power(10.0,self.var['alphaFeSt'+sti].cgs()))
+                    if i==99:
+                        print ("WARNING: MAY HAVE MISSED SOME STELLAR POPULATIONS IN COMPUTING Zst!")
+                else:
+                    if i==0 and keepStars:
+                        assert False # Something has gone wrong!
+                    break
 
-        self.var['colPassiveError'] = RadialFunction( sumcol/self.var['colst'].cgs(), 'colPassiveError', cgsConv=1.0, sensibleConv=1.0, texString=r'$\sum \Sigma_{*,i}/\Sigma_*$')
-        self.var['stZ'] = TimeFunction(np.sum(stZ,axis=1)/np.sum(denom,axis=1), \
-                'stZ', cgsConv=1.0, sensibleConv=1.0/.02, texString=r'$Z_* (Z_\odot)$', theRange=[1.0e-2, 3.0]) 
-        self.var['stZradial'] = RadialFunction(stZ/denom, \
-                'stZradial', cgsConv=1.0, sensibleConv=1.0/.02, texString=r'$Z_* (Z_\odot)$', theRange=[1.0e-2, 3.0]) 
-        self.var['alphaFeStRadial'] = RadialFunction(np.log10((alphaFeStNum/alphaFeStDenom) / (0.0057/0.0013)), \
-                'alphaFeStRadial', cgsConv=1.0, sensibleConv=1.0, texString=r'$[\alpha/\mathrm{Fe}]_*$', log=False) 
-        sfRad = self.getData('colsfr',cgs=True)*self.getData('dA',cgs=True)
-        self.var['sfZ'] = TimeFunction(np.sum(sfRad*self.getData('Z',cgs=True),axis=1)/np.sum(sfRad,axis=1), \
+            return [ RadialFunction( sumcol/self.var['colst'].cgs(), 'colPassiveError', cgsConv=1.0, sensibleConv=1.0, texString=r'$\sum \Sigma_{*,i}/\Sigma_*$'), \
+                TimeFunction(np.sum(stZ,axis=1)/np.sum(denom,axis=1), \
+                    'stZ', cgsConv=1.0, sensibleConv=1.0/.02, texString=r'$Z_* (Z_\odot)$', theRange=[1.0e-2, 3.0]), \
+                RadialFunction(stZ/denom, \
+                    'stZradial', cgsConv=1.0, sensibleConv=1.0/.02, texString=r'$Z_* (Z_\odot)$', theRange=[1.0e-2, 3.0]), \
+                RadialFunction(np.log10((alphaFeStNum/alphaFeStDenom) / (0.0057/0.0013)), \
+                    'alphaFeStRadial', cgsConv=1.0, sensibleConv=1.0, texString=r'$[\alpha/\mathrm{Fe}]_*$', log=False) ]
+        self.var.define(['colPassiveError','stZ','stZradial','alphaFeStRadial'], [RadialFunction,TimeFunction,RadialFunction,RadialFunction], \
+                ['Z','dA','colst']+[name for name in starList if name.startswith(('colst','Zst','alphaFeSt'))], stZ)
+        def sfRad():
+            return self.var['colsfr'].cgs()*self.var['dA'].cgs()
+        def sfZ():
+            sfRadArr = sfRad()
+            return TimeFunction(np.sum(sfRadArr*self.var['Z'].cgs(),axis=1)/np.sum(sfRadArr,axis=1), \
                 'sfZ',cgsConv=1.0,sensibleConv=1.0/.02,texString=r'$\langle Z_g \rangle_{\dot{M}_*} (Z_\odot)$', theRange=[1.0e-2, 3.0])
-        self.var['Z1'] = TimeFunction( np.sum(mg[:,:onekpc] * self.var['Z'].cgs(locIndex=range(onekpc)) ,axis=1)/np.sum(mg[:,:onekpc],axis=1), 'Z1', cgsConv=1.0, sensibleConv=1.0/0.02, texString=r'$Z_\mathrm{1 kpc} (Z_\odot)$' ) 
-        self.var['sffg'] = TimeFunction(np.sum(sfRad*self.getData('fgRadial',cgs=True),axis=1)/np.sum(sfRad,axis=1), \
+        self.var.define('sfZ', TimeFunction, ['colsfr','dA','Z'], sfZ)
+        def Z1():
+            mgArr = mg()
+            onekpcI = onekpc()
+            return TimeFunction( np.sum(mgArr[:,:onekpcI] * self.var['Z'].cgs(locIndex=range(onekpcI)) ,axis=1)/np.sum(mgArr[:,:onekpcI],axis=1), 'Z1', cgsConv=1.0, sensibleConv=1.0/0.02, texString=r'$Z_\mathrm{1 kpc} (Z_\odot)$' )
+        self.var.define('Z1', TimeFunction, ['r','col','dA','Z'], Z1)
+        def sffg():
+            sfRadArr = sfRad()
+            return TimeFunction(np.sum(sfRadArr*self.var['fgRadial'].cgs(),axis=1)/np.sum(sfRadArr,axis=1), \
                 'sffg',cgsConv=1.0,sensibleConv=1.0,texString=r'$f_g$ weighted by SFR')
-        self.var['fH2Integrated'] = TimeFunction( \
-                np.sum(mg*self.var['fH2'].cgs(),axis=1)/np.sum(mg,axis=1), \
+        self.var.define('sffg', TimeFunction, ['colsfr','dA','fgRadial'], sffg)
+        def fH2Integrated():
+            mgArr = mg()
+            return TimeFunction( \
+                np.sum(mgArr*self.var['fH2'].cgs(),axis=1)/np.sum(mgArr,axis=1), \
                 'fH2Integrated',1.0,1.0,r'$f_{\mathrm{H}_2}$',theRange=[0,1], log=False)
-        self.var['fgh2'] = TimeFunction( self.var['MH2'].sensible()/( self.var['MH2'].sensible() + self.var['mstar'].sensible() ), 'fgh2', texString=r'$\frac{M_{\mathrm{H}_2}}{  M_{\mathrm{H}_2} + M_* }$', theRange=[0.01,.99], log=False)
-        self.var['fghi'] = TimeFunction( self.var['MHI'].sensible()/( self.var['MHI'].sensible() + self.var['mstar'].sensible() ), 'fghi', texString=r'$\frac{M_{\mathrm{HI}}}{  M_{\mathrm{HI}} + M_* }$', theRange=[0.01,.99], log=False)
-        self.var['stellarToGasMass'] = TimeFunction( self.var['mstar'].sensible()/ (self.var['MHI'].sensible()+self.var['mgas'].sensible()*self.var['fH2Integrated'].sensible()), 'stellarToGasMass', texString=r'$M_*/M_\mathrm{gas}$')
-        self.var['gasToStellarRatioH2'] = TimeFunction( self.var['mgas'].sensible()*self.var['fH2Integrated'].sensible()/self.var['mstar'].sensible(), 'gasToStellarRatioH2', texString=r'$f_{\mathrm{H}_2} M_g/M_*$')
-        self.var['gasToStellarRatioHI'] = TimeFunction( self.var['MHI'].sensible()/self.var['mstar'].sensible(), 'gasToStellarRatioHI', texString=r'$M_\mathrm{HI}/M_*$')
-        self.var['tDepH2'] = TimeFunction( \
+        self.var.define('fH2Integrated', TimeFunction, ['col','dA','fH2'], fH2Integrated)
+        self.var.define('fgh2', TimeFunction, ['MH2','mstar'], lambda: TimeFunction( self.var['MH2'].sensible()/( self.var['MH2'].sensible() + self.var['mstar'].sensible() ), 'fgh2', texString=r'$\frac{M_{\mathrm{H}_2}}{  M_{\mathrm{H}_2} + M_* }$', theRange=[0.01,.99], log=False))
+        self.var.define('fghi', TimeFunction, ['MHI','mstar'], lambda: TimeFunction( self.var['MHI'].sensible()/( self.var['MHI'].sensible() + self.var['mstar'].sensible() ), 'fghi', texString=r'$\frac{M_{\mathrm{HI}}}{  M_{\mathrm{HI}} + M_* }$', theRange=[0.01,.99], log=False))
+        self.var.define('stellarToGasMass', TimeFunction, ['mstar','MHI','mgas','fH2Integrated'], lambda: TimeFunction( self.var['mstar'].sensible()/ (self.var['MHI'].sensible()+self.var['mgas'].sensible()*self.var['fH2Integrated'].sensible()), 'stellarToGasMass', texString=r'$M_*/M_\mathrm{gas}$'))
+        self.var.define('gasToStellarRatioH2', TimeFunction, ['mgas','fH2Integrated','mstar'], lambda: TimeFunction( self.var['mgas'].sensible()*self.var['fH2Integrated'].sensible()/self.var['mstar'].sensible(), 'gasToStellarRatioH2', texString=r'$f_{\mathrm{H}_2} M_g/M_*$'))
+        self.var.define('gasToStellarRatioHI', TimeFunction, ['MHI','mstar'], lambda: TimeFunction( self.var['MHI'].sensible()/self.var['mstar'].sensible(), 'gasToStellarRatioHI', texString=r'$M_\mathrm{HI}/M_*$'))
+        self.var.define('tDepH2', TimeFunction, ['fH2Integrated','mgas','sfr'], lambda: TimeFunction( \
                 self.var['fH2Integrated'].cgs()*self.var['mgas'].cgs()/self.var['sfr'].cgs(), \
-                'tDepH2', cgsConv=1.0, sensibleConv=1.0/speryear, texString=r'$t_{\mathrm{dep},\mathrm{H}_2} (\mathrm{yr})$', log=True)
-        self.var['vPhiGas'] = TimeFunction( \
+                'tDepH2', cgsConv=1.0, sensibleConv=1.0/speryear, texString=r'$t_{\mathrm{dep},\mathrm{H}_2} (\mathrm{yr})$', log=True))
+        self.var.define('vPhiGas', TimeFunction, ['vPhi','dA','col','mgas'], lambda: TimeFunction( \
                 np.sum(self.var['vPhi'].cgs() * self.var['dA'].cgs() * self.var['col'].cgs(),axis=1)/self.var['mgas'].cgs(),
-                'vPhiGas',cgsConv=1.0,sensibleConv=1.0e-5,texString=r'Gas mass weighted $v_\phi$', log=True)
-        self.var['vPhiStars'] = TimeFunction( \
+                'vPhiGas',cgsConv=1.0,sensibleConv=1.0e-5,texString=r'Gas mass weighted $v_\phi$', log=True))
+        self.var.define('vPhiStars', TimeFunction, ['vPhi','dA','colst','mstar'], lambda: TimeFunction( \
                 np.sum(self.var['vPhi'].cgs() * self.var['dA'].cgs() * self.var['colst'].cgs(),axis=1)/self.var['mstar'].cgs(),
-                'vPhiStars',cgsConv=1.0,sensibleConv=1.0e-5,texString=r'Stellar mass weighted $v_\phi$', log=True)
-        self.var['vPhiOuter'] = TimeFunction( \
-                self.var['vPhi'].cgs(locIndex=-1), 'vPhiOuter',cgsConv=1.0,sensibleConv=1.0e-5,texString=r'$v_\phi(r=R)$', log=True)
-        self.var['MHII'] = TimeFunction( self.var['mgas'].cgs()-self.var['MHI'].cgs()-self.var['MH2'].cgs(), 'MHII', cgsConv=1, sensibleConv=1.0/gpermsun, texString=r'$M_{\mathrm{HII}} (M_\odot)$')
-        self.var['vOverSigGlobal'] = TimeFunction( self.var['vPhiOuter'].cgs()/self.var['maxsig'].cgs() , 'vOverSigGlobal', sensibleConv=1.0, cgsConv=1.0, texString=r'$v_\phi/\sigma_\mathrm{max}$' )
-        self.var['integratedMLF'] = TimeFunction( \
+                'vPhiStars',cgsConv=1.0,sensibleConv=1.0e-5,texString=r'Stellar mass weighted $v_\phi$', log=True))
+        self.var.define('vPhiOuter', TimeFunction, ['vPhi'], lambda: TimeFunction( \
+                self.var['vPhi'].cgs(locIndex=-1), 'vPhiOuter',cgsConv=1.0,sensibleConv=1.0e-5,texString=r'$v_\phi(r=R)$', log=True))
+        self.var.define('MHII', TimeFunction, ['mgas','MHI','MH2'], lambda: TimeFunction( self.var['mgas'].cgs()-self.var['MHI'].cgs()-self.var['MH2'].cgs(), 'MHII', cgsConv=1, sensibleConv=1.0/gpermsun, texString=r'$M_{\mathrm{HII}} (M_\odot)$'))
+        self.var.define('vOverSigGlobal', TimeFunction, ['vPhiOuter','maxsig'], lambda: TimeFunction( self.var['vPhiOuter'].cgs()/self.var['maxsig'].cgs() , 'vOverSigGlobal', sensibleConv=1.0, cgsConv=1.0, texString=r'$v_\phi/\sigma_\mathrm{max}$' ))
+        self.var.define('integratedMLF', TimeFunction, ['MassLoadingFactor','dA','colsfr','sfr'], lambda: TimeFunction( \
                 np.sum(self.var['MassLoadingFactor'].cgs() * self.var['dA'].cgs() * self.var['colsfr'].cgs(),axis=1)/self.var['sfr'].cgs(),
-                'integratedMLF',cgsConv=1.0,sensibleConv=1.0,texString=r'Mass loading factor')
+                'integratedMLF',cgsConv=1.0,sensibleConv=1.0,texString=r'Mass loading factor'))
         fRinst = 0.77
-        denom = self.var['MassLoadingFactor'].cgs()
-        mask = denom<1-fRinst
-        denom[mask] = 1-fRinst
         yie = 0.0133 * 2.09 + 0.0011 * 1.06
 
-        self.var['ZWind'] = TimeFunction( \
+        def ZWind():
+            denom = np.maximum(self.var['MassLoadingFactor'].cgs(), 1-fRinst)
+            return TimeFunction( \
                 np.sum( (self.var['Z'].cgs() + self.p['xiREC']*yie/denom) *   self.var['MassLoadingFactor'].cgs() * self.var['dA'].cgs() * self.var['colsfr'].cgs(),axis=1)/(self.var['integratedMLF'].cgs()*self.var['sfr'].cgs()),
                 'ZWind',cgsConv=1.0,sensibleConv=1.0/.02,texString=r'$Z_w/Z_\odot$')
-        self.var['ZOutZSF'] = TimeFunction( self.var['ZWind'].cgs() * self.var['integratedMLF'].cgs()/yie, 'ZOutZSF', cgsConv=1.0, sensibleConv=1.0, texString=r'$\mu Z_w/y$')
-        self.var['metalMassCGM'] = TimeFunction( np.cumsum( self.var['dt'].cgs() * self.var['integratedMLF'].cgs() * self.var['sfr'].cgs()* self.var['ZWind'].cgs() ), 'metalMassCGM', cgsConv=1.0, sensibleConv=1.0/gpermsun, texString=r'$\int \dot{M}_{\mathrm{out},Z} dt$')
-        self.var['mOut'] = TimeFunction( np.cumsum( self.var['dt'].cgs() * self.var['integratedMLF'].cgs() * self.var['sfr'].cgs() ), 'mOut', cgsConv=1.0, sensibleConv=1.0/gpermsun, texString=r'$ M_{\mathrm{out}}$')
-        self.var['metalMassISM'] = TimeFunction( np.sum( self.var['Z'].cgs() * self.var['dA'].cgs() * self.var['col'].cgs(), axis=1)/self.var['mgas'].cgs(), 'metalMassISM', cgsConv=1.0, sensibleConv=1/0.02, texString=r'$M_{Z,ISM}$' )
-        self.var['metalMassSFR'] = TimeFunction( np.sum( self.var['Z'].cgs() * self.var['dA'].cgs() * self.var['colsfr'].cgs() *self.var['dA'].cgs()*self.var['col'].cgs(), axis=1)/ np.sum( self.var['dA'].cgs()*self.var['col'].cgs() * self.var['dA'].cgs() * self.var['colsfr'].cgs(), axis=1), 'metalMassSFR' , cgsConv=1.0, sensibleConv=1/0.02, texString=r'$M_{Z,SF}$' )
-        self.var['metalsCGMpISM'] = TimeFunction( self.var['metalMassCGM'].cgs()/self.var['metalMassISM'].cgs(), 'metalsCGMpISM', texString=r'$M_{Z,CGM}/M_{Z,ISM}$')
-        self.var['ZOutZDisk'] = TimeFunction( self.var['ZWind'].cgs() * self.var['integratedMLF'].cgs()/ self.var['sfZ'].cgs() , 'ZOutZSF', cgsConv=1.0, sensibleConv=1.0, texString=r'$\mu Z_w/Z_\mathrm{disk}$')
-        self.var['tLoss'] = TimeFunction(self.var['tdep'].cgs()/(self.var['integratedMLF'].cgs()+0.503), 'tLoss', cgsConv=1.0, sensibleConv=1.0/speryear, texString=r'$t_\mathrm{loss} (\mathrm{yr})$')
-        
-        mJeansMask = np.zeros(np.shape(self.var['sig'].sensible()),dtype=float)
-        mJeansMask[self.var['fH2'].sensible()>0.1] = 1.0
-        self.var['MJeans'] = RadialFunction( \
+        self.var.define('ZWind', TimeFunction, ['MassLoadingFactor','Z','dA','colsfr','integratedMLF','sfr'], ZWind)
+        self.var.define('ZOutZSF', TimeFunction, ['ZWind','integratedMLF'], lambda: TimeFunction( self.var['ZWind'].cgs() * self.var['integratedMLF'].cgs()/yie, 'ZOutZSF', cgsConv=1.0, sensibleConv=1.0, texString=r'$\mu Z_w/y$'))
+        self.var.define('metalMassCGM', TimeFunction, ['dt','integratedMLF','sfr','ZWind'], lambda: TimeFunction( np.cumsum( self.var['dt'].cgs() * self.var['integratedMLF'].cgs() * self.var['sfr'].cgs()* self.var['ZWind'].cgs() ), 'metalMassCGM', cgsConv=1.0, sensibleConv=1.0/gpermsun, texString=r'$\int \dot{M}_{\mathrm{out},Z} dt$'))
+        self.var.define('mOut', TimeFunction, ['dt','integratedMLF','sfr'], lambda: TimeFunction( np.cumsum( self.var['dt'].cgs() * self.var['integratedMLF'].cgs() * self.var['sfr'].cgs() ), 'mOut', cgsConv=1.0, sensibleConv=1.0/gpermsun, texString=r'$ M_{\mathrm{out}}$'))
+        self.var.define('metalMassISM', TimeFunction, ['Z','dA','col','mgas'], lambda: TimeFunction( np.sum( self.var['Z'].cgs() * self.var['dA'].cgs() * self.var['col'].cgs(), axis=1)/self.var['mgas'].cgs(), 'metalMassISM', cgsConv=1.0, sensibleConv=1/0.02, texString=r'$M_{Z,ISM}$' ))
+        self.var.define('metalMassSFR', TimeFunction, ['Z','dA','colsfr','col'], lambda: TimeFunction( np.sum( self.var['Z'].cgs() * self.var['dA'].cgs() * self.var['colsfr'].cgs() *self.var['dA'].cgs()*self.var['col'].cgs(), axis=1)/ np.sum( self.var['dA'].cgs()*self.var['col'].cgs() * self.var['dA'].cgs() * self.var['colsfr'].cgs(), axis=1), 'metalMassSFR' , cgsConv=1.0, sensibleConv=1/0.02, texString=r'$M_{Z,SF}$' ))
+        self.var.define('metalsCGMpISM', TimeFunction, ['metalMassCGM','metalMassISM'], lambda: TimeFunction( self.var['metalMassCGM'].cgs()/self.var['metalMassISM'].cgs(), 'metalsCGMpISM', texString=r'$M_{Z,CGM}/M_{Z,ISM}$'))
+        self.var.define('ZOutZDisk', TimeFunction, ['ZWind','integratedMLF','sfZ'], lambda: TimeFunction( self.var['ZWind'].cgs() * self.var['integratedMLF'].cgs()/ self.var['sfZ'].cgs() , 'ZOutZSF', cgsConv=1.0, sensibleConv=1.0, texString=r'$\mu Z_w/Z_\mathrm{disk}$'))
+        self.var.define('tLoss', TimeFunction, ['tdep','integratedMLF'], lambda: TimeFunction(self.var['tdep'].cgs()/(self.var['integratedMLF'].cgs()+0.503), 'tLoss', cgsConv=1.0, sensibleConv=1.0/speryear, texString=r'$t_\mathrm{loss} (\mathrm{yr})$'))
+
+        def MJeans():
+            mJeansMask = np.zeros(np.shape(self.var['sig'].sensible()),dtype=float)
+            mJeansMask[self.var['fH2'].sensible()>0.1] = 1.0
+            return RadialFunction( \
                 np.power(self.var['sig'].cgs(),4.0)/(Gcgs**2.0 *self.var['col'].cgs())*mJeansMask, \
                 'MJeans', 1.0, 1.0/gpermsun, r'2D Jeans Mass where $f_{\mathrm{H}_2}>0.1$ ($M_\odot$)', \
                 theRange=[1.0e5,1.0e9])
+        self.var.define('MJeans', RadialFunction, ['sig','fH2','col'], MJeans)
 
-        self.var['MJeansUnmasked'] = RadialFunction( \
+        self.var.define('MJeansUnmasked', RadialFunction, ['sig','col'], lambda: RadialFunction( \
                 np.power(self.var['sig'].cgs(),4.0)/(Gcgs**2.0 *self.var['col'].cgs()), \
                 'MJeansUnmasked', 1.0, 1.0/gpermsun, r'2D Jeans Mass ($M_\odot$)', \
-                theRange=[1.0e5,1.0e9])
-        mja = np.sum(self.var['MJeansUnmasked'].sensible()*self.var['colsfr'].cgs()*self.var['dA'].cgs(),axis=1)/np.sum(self.var['colsfr'].cgs()*self.var['dA'].cgs(), axis=1)
-        self.var['MJeansAvg'] = TimeFunction( mja, \
-                'MJeansAvg', cgsConv = gpermsun, texString=r'$M_{Jeans}\ (M_\odot)$', theRange=[1.0e5, 1.0e9])
-                
-        mst = self.var['mstar'].cgs()
-        mj = self.var['MJeans'].cgs()
-        for ti in range(len(mst)):
-            mj[ti,:]/=mst[ti]
+                theRange=[1.0e5,1.0e9]))
+        self.var.define('MJeansAvg', TimeFunction, ['MJeansUnmasked','colsfr','dA'], lambda: TimeFunction( np.sum(self.var['MJeansUnmasked'].sensible()*self.var['colsfr'].cgs()*self.var['dA'].cgs(),axis=1)/np.sum(self.var['colsfr'].cgs()*self.var['dA'].cgs(), axis=1), \
+                'MJeansAvg', cgsConv = gpermsun, texString=r'$M_{Jeans}\ (M_\odot)$', theRange=[1.0e5, 1.0e9]))
+
         #self.var['ClumpMassPerDisk'] = RadialFunction( \
         #        mj,'ClumpMassPerDisk',1.0,1.0,r'$M_J/M_*$')
-        colAccr = self.getData('colAccr',cgs=True)
-        colTr = self.getData('colTr',cgs=True)
-        colSFR = self.getData('colsfr',cgs=True)*(self.var['MassLoadingFactor'].sensible()+self.p['RfREC'])
-        dcoldt = self.getData('dcoldt',cgs=True)
-        shareNorm = np.abs(colAccr)+np.abs(colTr)+np.abs(colSFR)
-        self.var['equilibrium'] = RadialFunction( \
-                dcoldt/shareNorm, 'equilibrium', 1.0, 1.0, r'Equilibrium',log=False)
-
-        eqnorm = shareNorm*self.var['dA'].cgs()
-        self.var['integratedEquilibrium'] = TimeFunction( \
+        def shareNorm():
+            colAccr = self.var['colAccr'].cgs()
+            colTr = self.var['colTr'].cgs()
+            colSFR = self.var['colsfr'].cgs()*(self.var['MassLoadingFactor'].sensible()+self.p['RfREC'])
+            return np.abs(colAccr)+np.abs(colTr)+np.abs(colSFR)
+        self.var.define('equilibrium', RadialFunction, ['colAccr','colTr','colsfr','MassLoadingFactor','dcoldt'], lambda: RadialFunction( \
+                self.var['dcoldt'].cgs()/shareNorm(), 'equilibrium', 1.0, 1.0, r'Equilibrium',log=False))
+
+        def integratedEquilibrium():
+            eqnorm = shareNorm()*self.var['dA'].cgs()
+            return TimeFunction( \
                 np.sum(self.var['equilibrium'].cgs()*eqnorm,axis=1)/np.sum(eqnorm,axis=1), \
                 'integratedEquilibrium',1.0,1.0,r'Equilibrium',log=False, theRange=[-1,1])
-        self.var['rx'] = RadialFunction( \
+        self.var.define('integratedEquilibrium', TimeFunction, ['colAccr','colTr','colsfr','MassLoadingFactor','dA','equilibrium'], integratedEquilibrium)
+        self.var.define('rx', RadialFunction, ['r','halfMassStars'], lambda: RadialFunction( \
                 np.array([self.var['r'].sensible(ti)/self.var['halfMassStars'].sensible(timeIndex=ti) for ti in range(self.nt)]), \
-                'rx',1.0,1.0,r'r/r$_{E,*}$',log=False, theRange=[0,3])
-        self.var['rxl'] = RadialFunction( \
+                'rx',1.0,1.0,r'r/r$_{E,*}$',log=False, theRange=[0,3]))
+        self.var.define('rxl', RadialFunction, ['r','halfMassEst'], lambda: RadialFunction( \
                 np.array([self.var['r'].sensible(ti)/(np.power(self.var['halfMassEst'].sensible(timeIndex=ti),1.0/0.90)*10.0**(0.03/0.9)) for ti in range(self.nt)]), \
-                'rxl',1.0,1.0,r'r/r$_{E,\mathrm{opt,est}}$',log=False, theRange=[0,3])
-
-        self.var['Sigma1p5'] = TimeFunction( \
-                self.var['mstar'].sensible()/np.power(self.var['halfMassStars'].sensible(),1.5), 'Sigma1p5', sensibleConv=1.0, cgsConv=gpermsun/cmperkpc**1.5,texString=r'$\Sigma_{1.5}\ (M_\odot/\mathrm{kpc}^{1.5})$')
-        self.var['specificJRadial'] = RadialFunction( self.var['r'].cgs() * self.var['vPhi'].cgs(), 'specificJRadial', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j\ (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$')
-        self.var['JColGas'] = RadialFunction( self.var['r'].cgs() *self.var['r'].cgs() * self.var['vPhi'].cgs() * self.var['col'].cgs(), 'JColGas', sensibleConv=1.0e-5/cmperkpc**2/gpermsun*cmperpc**2, cgsConv=1.0, texString=r'$r^2 v_\phi\Sigma\ (\mathrm{kpc}^2\ \mathrm{km}/\mathrm{s}\ M_\odot/\mathrm{pc}^2$')
-        self.var['JColStars'] = RadialFunction( self.var['r'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs() * self.var['colst'].cgs(), 'JColSt', sensibleConv=1.0e-5/cmperkpc**2/gpermsun*cmperpc**2, cgsConv=1.0, texString=r'$r^2v_\phi\Sigma_*\ (\mathrm{kpc}^2\ \mathrm{km}/\mathrm{s}\ M_\odot/\mathrm{pc}^2$')
-
-        #try:
-        maxGIRadius = np.zeros(len(self.var['z'].cgs()))
-        minGIRadius = np.zeros(len(self.var['z'].cgs()))
-        fractionGI = np.zeros(len(self.var['z'].cgs()))
-        for i in range(len(self.var['z'].cgs())):
-            unstable = self.var['Q'].sensible(timeIndex=i) < self.p['fixedQ']  # locations in space/time where Q<fixedQ
-            if np.any(unstable):
-                ### Let's
-                maxGIRadius[i] = np.max( self.var['r'].sensible(timeIndex=i)[unstable] )
-                minGIRadius[i] = np.min( self.var['r'].sensible(timeIndex=i)[unstable] )
-                fractionGI[i] = np.sum(self.var['dr'].cgs(timeIndex=i)[unstable])
-        self.var['maxGIRadius'] = TimeFunction( maxGIRadius, 'maxGIRadius', cgsConv=cmperkpc, sensibleConv=1.0, texString=r'Largest GI radius (kpc)')
-        self.var['minGIRadius'] = TimeFunction( minGIRadius, 'minGIRadius', cgsConv=cmperkpc, sensibleConv=1.0, texString=r'Smallest GI radius (kpc)')
-        self.var['fractionGI'] = TimeFunction( fractionGI/self.var['halfMassGas'].cgs(), 'fractionGI', 1,1, texString=r'$r_\mathrm{GI}/r_{E,\mathrm{gas}}$')
-        #except:
-        #    print "WARNING: failed to calculate max GI radius"
-
-        indRange = range(eightkpc)
-
-        self.var['accretionDiscrepancy'] = TimeFunction( np.sum(self.var['colAccr'].cgs()*self.var['dA'].cgs(), axis=1)/self.var['mdotAccr'].cgs(), 'accretionDiscrepancy', 1,1, texString=r'$\int 2\pi r \dot{\Sigma}_\mathrm{accr} dr / \dot{M}_\mathrm{accr}$' , log=False)
-        self.var['specificJStars'] = TimeFunction( np.sum(self.var['colst'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1)/np.sum(self.var['colst'].cgs()*self.var['dA'].cgs(),axis=1), 'specificJStars', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j_* (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,30000])
-        self.var['specificJGas'] = TimeFunction( np.sum(self.var['col'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1)/np.sum(self.var['col'].cgs()*self.var['dA'].cgs(),axis=1), 'specificJGas', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j_g\ (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,30000])
-        self.var['specificJH2'] = TimeFunction( np.sum(self.var['colH2'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1)/np.sum(self.var['colH2'].cgs()*self.var['dA'].cgs(),axis=1), 'specificJH2', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j_{\mathrm{H}_2}\ (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,30000])
-        self.var['specificJHI'] = TimeFunction( np.sum(self.var['colHI'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1)/np.sum(self.var['colHI'].cgs()*self.var['dA'].cgs(),axis=1), 'specificJHI', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j_\mathrm{HI}\ (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,30000])
-        self.var['specificJOut'] = TimeFunction( np.sum(self.var['colOut'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1)/np.sum(self.var['colOut'].cgs()*self.var['dA'].cgs(),axis=1), 'specificJOut', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j_\mathrm{out}\ (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,30000])
-        self.var['specificJSFR'] = TimeFunction( np.sum(self.var['colsfr'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1)/np.sum(self.var['colsfr'].cgs()*self.var['dA'].cgs(),axis=1), 'specificJSFR', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j_\mathrm{SFR}\ (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,30000])
-        self.var['specificJAccr'] = TimeFunction( np.sum(self.var['colAccr'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1)/np.sum(self.var['colAccr'].cgs()*self.var['dA'].cgs(),axis=1), 'specificJAccr', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j_\mathrm{accr}\ (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,30000])
-
-        self.var['JStars'] = TimeFunction( np.sum(self.var['colst'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1), 'JStars', sensibleConv=1.0e-5/cmperkpc/gpermsun, cgsConv=1.0, texString=r'$J_* (M_\odot \mathrm{kpc}\ \mathrm{km}/\mathrm{s})$')
-        self.var['JGas'] = TimeFunction( np.sum(self.var['col'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1), 'JGas', sensibleConv=1.0e-5/cmperkpc/gpermsun, cgsConv=1.0, texString=r'$J_g\ (M_\odot \mathrm{kpc}\ \mathrm{km}/\mathrm{s})$')
-        self.var['JH2'] = TimeFunction( np.sum(self.var['colH2'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1), 'JH2', sensibleConv=1.0e-5/cmperkpc/gpermsun, cgsConv=1.0, texString=r'$J_{H_2}\ (M_\odot \mathrm{kpc}\ \mathrm{km}/\mathrm{s})$')
-        self.var['JHI'] = TimeFunction( np.sum(self.var['colHI'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1), 'JHI', sensibleConv=1.0e-5/cmperkpc/gpermsun, cgsConv=1.0, texString=r'$J_{HI}\ (M_\odot\ \mathrm{kpc}\ \mathrm{km}/\mathrm{s})$')
-        self.var['JOut'] = TimeFunction( np.sum(self.var['colOut'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1), 'JOut', sensibleConv=1.0e-5/cmperkpc/gpermsun*speryear, cgsConv=1.0, texString=r'$\dot{J}_\mathrm{out}\ (M_\odot/\mathrm{yr}\ \mathrm{kpc}\ \mathrm{km}/\mathrm{s})$')
-        self.var['JSFR'] = TimeFunction( np.sum(self.var['colsfr'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1), 'JSFR', sensibleConv=1.0e-5/cmperkpc/gpermsun*speryear, cgsConv=1.0, texString=r'$\dot{J}_\mathrm{SFR}\ (M_\odot/\mathrm{yr}\ \mathrm{kpc}\ \mathrm{km}/\mathrm{s})$')
-        self.var['JAccr'] = TimeFunction( np.sum(self.var['colAccr'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1), 'JAccr', sensibleConv=1.0e-5/cmperkpc/gpermsun * speryear, cgsConv=1.0, texString=r'$\dot{J}_\mathrm{accr}\  (M_\odot/\mathrm{yr}\ \mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,5000])
-
-
-
-        rhoCrit = cos.rhocrit( self.var['z'].sensible() )
-        self.var['Rvir'] = TimeFunction(np.power(self.var['Mh'].cgs()*3.0/(4.0*np.pi*200.0*rhoCrit),1./3.), 'Rvir', sensibleConv=1/cmperkpc, cgsConv=1,texString=r'$R_\mathrm{vir}$') # r200
-        self.var['Vvir'] = TimeFunction(np.power(Gcgs*self.var['Mh'].cgs()/self.var['Rvir'].cgs(),1./2.), 'Vvir', sensibleConv=1.0e-5, cgsConv=1,texString=r'$V_\mathrm{vir}$') # V
+                'rxl',1.0,1.0,r'r/r$_{E,\mathrm{opt,est}}$',log=False, theRange=[0,3]))
+
+        self.var.define('Sigma1p5', TimeFunction, ['mstar','halfMassStars'], lambda: TimeFunction( \
+                self.var['mstar'].sensible()/np.power(self.var['halfMassStars'].sensible(),1.5), 'Sigma1p5', sensibleConv=1.0, cgsConv=gpermsun/cmperkpc**1.5,texString=r'$\Sigma_{1.5}\ (M_\odot/\mathrm{kpc}^{1.5})$'))
+        self.var.define('specificJRadial', RadialFunction, ['r','vPhi'], lambda: RadialFunction( self.var['r'].cgs() * self.var['vPhi'].cgs(), 'specificJRadial', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j\ (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$'))
+        self.var.define('JColGas', RadialFunction, ['r','vPhi','col'], lambda: RadialFunction( self.var['r'].cgs() *self.var['r'].cgs() * self.var['vPhi'].cgs() * self.var['col'].cgs(), 'JColGas', sensibleConv=1.0e-5/cmperkpc**2/gpermsun*cmperpc**2, cgsConv=1.0, texString=r'$r^2 v_\phi\Sigma\ (\mathrm{kpc}^2\ \mathrm{km}/\mathrm{s}\ M_\odot/\mathrm{pc}^2$'))
+        self.var.define('JColStars', RadialFunction, ['r','vPhi','colst'], lambda: RadialFunction( self.var['r'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs() * self.var['colst'].cgs(), 'JColSt', sensibleConv=1.0e-5/cmperkpc**2/gpermsun*cmperpc**2, cgsConv=1.0, texString=r'$r^2v_\phi\Sigma_*\ (\mathrm{kpc}^2\ \mathrm{km}/\mathrm{s}\ M_\odot/\mathrm{pc}^2$'))
+
+        def GIRadii():
+            maxGIRadius = np.zeros(len(self.var['z'].cgs()))
+            minGIRadius = np.zeros(len(self.var['z'].cgs()))
+            fractionGI = np.zeros(len(self.var['z'].cgs()))
+            for i in range(len(self.var['z'].cgs())):
+                unstable = self.var['Q'].sensible(timeIndex=i) < self.p['fixedQ']  # locations in space/time where Q<fixedQ
+                if np.any(unstable):
+                    ### Let's
+                    maxGIRadius[i] = np.max( self.var['r'].sensible(timeIndex=i)[unstable] )
+                    minGIRadius[i] = np.min( self.var['r'].sensible(timeIndex=i)[unstable] )
+                    fractionGI[i] = np.sum(self.var['dr'].cgs(timeIndex=i)[unstable])
+            return [ TimeFunction( maxGIRadius, 'maxGIRadius', cgsConv=cmperkpc, sensibleConv=1.0, texString=r'Largest GI radius (kpc)'), \
+                TimeFunction( minGIRadius, 'minGIRadius', cgsConv=cmperkpc, sensibleConv=1.0, texString=r'Smallest GI radius (kpc)'), \
+                TimeFunction( fractionGI/self.var['halfMassGas'].cgs(), 'fractionGI', 1,1, texString=r'$r_\mathrm{GI}/r_{E,\mathrm{gas}}$') ]
+        self.var.define(['maxGIRadius','minGIRadius','fractionGI'], TimeFunction, ['z','Q','r','dr','halfMassGas'], GIRadii)
+
+        self.var.define('accretionDiscrepancy', TimeFunction, ['colAccr','dA','mdotAccr'], lambda: TimeFunction( np.sum(self.var['colAccr'].cgs()*self.var['dA'].cgs(), axis=1)/self.var['mdotAccr'].cgs(), 'accretionDiscrepancy', 1,1, texString=r'$\int 2\pi r \dot{\Sigma}_\mathrm{accr} dr / \dot{M}_\mathrm{accr}$' , log=False))
+        self.var.define('specificJStars', TimeFunction, ['colst','dA','r','vPhi'], lambda: TimeFunction( np.sum(self.var['colst'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1)/np.sum(self.var['colst'].cgs()*self.var['dA'].cgs(),axis=1), 'specificJStars', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j_* (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,30000]))
+        self.var.define('specificJGas', TimeFunction, ['col','dA','r','vPhi'], lambda: TimeFunction( np.sum(self.var['col'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1)/np.sum(self.var['col'].cgs()*self.var['dA'].cgs(),axis=1), 'specificJGas', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j_g\ (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,30000]))
+        self.var.define('specificJH2', TimeFunction, ['colH2','dA','r','vPhi'], lambda: TimeFunction( np.sum(self.var['colH2'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1)/np.sum(self.var['colH2'].cgs()*self.var['dA'].cgs(),axis=1), 'specificJH2', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j_{\mathrm{H}_2}\ (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,30000]))
+        self.var.define('specificJHI', TimeFunction, ['colHI','dA','r','vPhi'], lambda: TimeFunction( np.sum(self.var['colHI'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1)/np.sum(self.var['colHI'].cgs()*self.var['dA'].cgs(),axis=1), 'specificJHI', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j_\mathrm{HI}\ (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,30000]))
+        self.var.define('specificJOut', TimeFunction, ['colOut','dA','r','vPhi'], lambda: TimeFunction( np.sum(self.var['colOut'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1)/np.sum(self.var['colOut'].cgs()*self.var['dA'].cgs(),axis=1), 'specificJOut', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j_\mathrm{out}\ (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,30000]))
+        self.var.define('specificJSFR', TimeFunction, ['colsfr','dA','r','vPhi'], lambda: TimeFunction( np.sum(self.var['colsfr'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1)/np.sum(self.var['colsfr'].cgs()*self.var['dA'].cgs(),axis=1), 'specificJSFR', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j_\mathrm{SFR}\ (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,30000]))
+        self.var.define('specificJAccr', TimeFunction, ['colAccr','dA','r','vPhi'], lambda: TimeFunction( np.sum(self.var['colAccr'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1)/np.sum(self.var['colAccr'].cgs()*self.var['dA'].cgs(),axis=1), 'specificJAccr', sensibleConv=1.0e-5/cmperkpc, cgsConv=1.0, texString=r'$j_\mathrm{accr}\ (\mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,30000]))
+
+        self.var.define('JStars', TimeFunction, ['colst','dA','r','vPhi'], lambda: TimeFunction( np.sum(self.var['colst'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1), 'JStars', sensibleConv=1.0e-5/cmperkpc/gpermsun, cgsConv=1.0, texString=r'$J_* (M_\odot \mathrm{kpc}\ \mathrm{km}/\mathrm{s})$'))
+        self.var.define('JGas', TimeFunction, ['col','dA','r','vPhi'], lambda: TimeFunction( np.sum(self.var['col'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1), 'JGas', sensibleConv=1.0e-5/cmperkpc/gpermsun, cgsConv=1.0, texString=r'$J_g\ (M_\odot \mathrm{kpc}\ \mathrm{km}/\mathrm{s})$'))
+        self.var.define('JH2', TimeFunction, ['colH2','dA','r','vPhi'], lambda: TimeFunction( np.sum(self.var['colH2'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1), 'JH2', sensibleConv=1.0e-5/cmperkpc/gpermsun, cgsConv=1.0, texString=r'$J_{H_2}\ (M_\odot \mathrm{kpc}\ \mathrm{km}/\mathrm{s})$'))
+        self.var.define('JHI', TimeFunction, ['colHI','dA','r','vPhi'], lambda: TimeFunction( np.sum(self.var['colHI'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1), 'JHI', sensibleConv=1.0e-5/cmperkpc/gpermsun, cgsConv=1.0, texString=r'$J_{HI}\ (M_\odot\ \mathrm{kpc}\ \mathrm{km}/\mathrm{s})$'))
+        self.var.define('JOut', TimeFunction, ['colOut','dA','r','vPhi'], lambda: TimeFunction( np.sum(self.var['colOut'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1), 'JOut', sensibleConv=1.0e-5/cmperkpc/gpermsun*speryear, cgsConv=1.0, texString=r'$\dot{J}_\mathrm{out}\ (M_\odot/\mathrm{yr}\ \mathrm{kpc}\ \mathrm{km}/\mathrm{s})$'))
+        self.var.define('JSFR', TimeFunction, ['colsfr','dA','r','vPhi'], lambda: TimeFunction( np.sum(self.var['colsfr'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1), 'JSFR', sensibleConv=1.0e-5/cmperkpc/gpermsun*speryear, cgsConv=1.0, texString=r'$\dot{J}_\mathrm{SFR}\ (M_\odot/\mathrm{yr}\ \mathrm{kpc}\ \mathrm{km}/\mathrm{s})$'))
+        self.var.define('JAccr', TimeFunction, ['colAccr','dA','r','vPhi'], lambda: TimeFunction( np.sum(self.var['colAccr'].cgs()*self.var['dA'].cgs()*self.var['r'].cgs() * self.var['vPhi'].cgs(), axis=1), 'JAccr', sensibleConv=1.0e-5/cmperkpc/gpermsun * speryear, cgsConv=1.0, texString=r'$\dot{J}_\mathrm{accr}\  (M_\odot/\mathrm{yr}\ \mathrm{kpc}\ \mathrm{km}/\mathrm{s})$', theRange=[10,5000]))
+
+
+
+        def Rvir():
+            rhoCrit = halo.Cosmology().rhocrit( self.var['z'].sensible() )
+            return TimeFunction(np.power(self.var['Mh'].cgs()*3.0/(4.0*np.pi*200.0*rhoCrit),1./3.), 'Rvir', sensibleConv=1/cmperkpc, cgsConv=1,texString=r'$R_\mathrm{vir}$') # r200
+        self.var.define('Rvir', TimeFunction, ['Mh','z'], Rvir)
+        self.var.define('Vvir', TimeFunction, ['Mh','Rvir'], lambda: TimeFunction(np.power(Gcgs*self.var['Mh'].cgs()/self.var['Rvir'].cgs(),1./2.), 'Vvir', sensibleConv=1.0e-5, cgsConv=1,texString=r'$V_\mathrm{vir}$')) # V
         lambdaRange = [8.0e-3, 1.8e-1]
-        self.var['dimensionlessSpinStars'] = TimeFunction(self.var['specificJStars'].cgs()/(np.sqrt(2.0)*self.var['Rvir'].cgs()*self.var['Vvir'].cgs()), 'dimensionlessSpinStellarMass', sensibleConv=1.0, cgsConv=1.0, texString=r'$j_*/\sqrt{2} R_\mathrm{vir} V_\mathrm{vir}$', theRange=lambdaRange)
-        self.var['dimensionlessSpinSFR'] = TimeFunction(self.var['specificJSFR'].cgs()/(np.sqrt(2.0)*self.var['Rvir'].cgs()*self.var['Vvir'].cgs()), 'dimensionlessSpinSFR', sensibleConv=1.0, cgsConv=1.0, texString=r'$j_\mathrm{SFR}/\sqrt{2} R_\mathrm{vir} V_\mathrm{vir}$', theRange=lambdaRange)
-        self.var['dimensionlessSpinGas'] = TimeFunction(self.var['specificJGas'].cgs()/(np.sqrt(2.0)*self.var['Rvir'].cgs()*self.var['Vvir'].cgs()), 'dimensionlessSpinGas', sensibleConv=1.0, cgsConv=1.0, texString=r'$j_\mathrm{gas}/\sqrt{2} R_\mathrm{vir} V_\mathrm{vir}$', theRange=lambdaRange)
-        self.var['dimensionlessSpinH2'] = TimeFunction(self.var['specificJH2'].cgs()/(np.sqrt(2.0)*self.var['Rvir'].cgs()*self.var['Vvir'].cgs()), 'dimensionlessSpinH2', sensibleConv=1.0, cgsConv=1.0, texString=r'$j_\mathrm{H2}/\sqrt{2} R_\mathrm{vir} V_\mathrm{vir}$', theRange=lambdaRange)
-        self.var['dimensionlessSpinHI'] = TimeFunction(self.var['specificJHI'].cgs()/(np.sqrt(2.0)*self.var['Rvir'].cgs()*self.var['Vvir'].cgs()), 'dimensionlessSpinHI', sensibleConv=1.0, cgsConv=1.0, texString=r'$j_\mathrm{HI}/\sqrt{2} R_\mathrm{vir} V_\mathrm{vir}$', theRange=lambdaRange)
-        self.var['dimensionlessSpinOut'] = TimeFunction(self.var['specificJOut'].cgs()/(np.sqrt(2.0)*self.var['Rvir'].cgs()*self.var['Vvir'].cgs()), 'dimensionlessSpinOut', sensibleConv=1.0, cgsConv=1.0, texString=r'$j_\mathrm{out}/\sqrt{2} R_\mathrm{vir} V_\mathrm{vir}$', theRange=lambdaRange)
-        self.var['dimensionlessSpinAccr'] = TimeFunction(self.var['specificJAccr'].cgs()/(np.sqrt(2.0)*self.var['Rvir'].cgs()*self.var['Vvir'].cgs()), 'dimensionlessSpinAccr', sensibleConv=1.0, cgsConv=1.0, texString=r'$j_\mathrm{accr}/\sqrt{2} R_\mathrm{vir} V_\mathrm{vir}$', theRange=lambdaRange)
-
-        self.var['BTcen'] = TimeFunction( self.var['mCentral'].sensible()/self.var['mstar'].sensible(), 'BTcen', log=False, texString=r'$M_\mathrm{cen}/M_*$')
-        self.var['BTmin'] = TimeFunction( (self.var['mCentral'].cgs()-self.var['colst'].cgs(locIndex=0)*np.pi*self.var['rb'].cgs(locIndex=0)**2.0)/self.var['mstar'].cgs(), 'BTmin', log=False, texString=r'BT min')
-
-        self.var['mdisk'] = TimeFunction( self.var['mstar'].sensible()- self.var['mCentral'].sensible(), 'BTcen', texString=r'$M_* - M_\mathrm{cen}$', theRange=[1.0e8, 1.0e11])
-
-        mgasvis = np.sum((self.var['colHI'].cgs() + self.var['colH2'].cgs())*self.var['dA'].cgs(),axis=1) 
-        colNtile = np.tile( (0.448*mgasvis/np.power(0.015*self.var['Rvir'].cgs(),2.0)), (int(self.p['nx']),1) ).T
-        self.var['colNormalizedKravtsov'] = RadialFunction( (self.var['colHI'].cgs()+self.var['colH2'].cgs())/colNtile, 'colNormalizedKravtsov', log=True, texString=r'$\Sigma/\Sigma_n$')
-        colstNtile = np.tile( (0.448*self.var['mstar'].cgs()/np.power(0.015*self.var['Rvir'].cgs(),2.0)), (int(self.p['nx']),1) ).T
-        self.var['colstNormalizedKravtsov'] = RadialFunction( self.var['colst'].cgs()/colstNtile, 'colstNormalizedKravtsov', log=True, texString=r'$\Sigma_*/\Sigma_{*,n}$')
-
-        theKeys = copy.deepcopy(list(self.var.keys()))
+        self.var.define('dimensionlessSpinStars', TimeFunction, ['specificJStars','Rvir','Vvir'], lambda: TimeFunction(self.var['specificJStars'].cgs()/(np.sqrt(2.0)*self.var['Rvir'].cgs()*self.var['Vvir'].cgs()), 'dimensionlessSpinStellarMass', sensibleConv=1.0, cgsConv=1.0, texString=r'$j_*/\sqrt{2} R_\mathrm{vir} V_\mathrm{vir}$', theRange=lambdaRange))
+        self.var.define('dimensionlessSpinSFR', TimeFunction, ['specificJSFR','Rvir','Vvir'], lambda: TimeFunction(self.var['specificJSFR'].cgs()/(np.sqrt(2.0)*self.var['Rvir'].cgs()*self.var['Vvir'].cgs()), 'dimensionlessSpinSFR', sensibleConv=1.0, cgsConv=1.0, texString=r'$j_\mathrm{SFR}/\sqrt{2} R_\mathrm{vir} V_\mathrm{vir}$', theRange=lambdaRange))
+        self.var.define('dimensionlessSpinGas', TimeFunction, ['specificJGas','Rvir','Vvir'], lambda: TimeFunction(self.var['specificJGas'].cgs()/(np.sqrt(2.0)*self.var['Rvir'].cgs()*self.var['Vvir'].cgs()), 'dimensionlessSpinGas', sensibleConv=1.0, cgsConv=1.0, texString=r'$j_\mathrm{gas}/\sqrt{2} R_\mathrm{vir} V_\mathrm{vir}$', theRange=lambdaRange))
+        self.var.define('dimensionlessSpinH2', TimeFunction, ['specificJH2','Rvir','Vvir'], lambda: TimeFunction(self.var['specificJH2'].cgs()/(np.sqrt(2.0)*self.var['Rvir'].cgs()*self.var['Vvir'].cgs()), 'dimensionlessSpinH2', sensibleConv=1.0, cgsConv=1.0, texString=r'$j_\mathrm{H2}/\sqrt{2} R_\mathrm{vir} V_\mathrm{vir}$', theRange=lambdaRange))
+        self.var.define('dimensionlessSpinHI', TimeFunction, ['specificJHI','Rvir','Vvir'], lambda: TimeFunction(self.var['specificJHI'].cgs()/(np.sqrt(2.0)*self.var['Rvir'].cgs()*self.var['Vvir'].cgs()), 'dimensionlessSpinHI', sensibleConv=1.0, cgsConv=1.0, texString=r'$j_\mathrm{HI}/\sqrt{2} R_\mathrm{vir} V_\mathrm{vir}$', theRange=lambdaRange))
+        self.var.define('dimensionlessSpinOut', TimeFunction, ['specificJOut','Rvir','Vvir'], lambda: TimeFunction(self.var['specificJOut'].cgs()/(np.sqrt(2.0)*self.var['Rvir'].cgs()*self.var['Vvir'].cgs()), 'dimensionlessSpinOut', sensibleConv=1.0, cgsConv=1.0, texString=r'$j_\mathrm{out}/\sqrt{2} R_\mathrm{vir} V_\mathrm{vir}$', theRange=lambdaRange))
+        self.var.define('dimensionlessSpinAccr', TimeFunction, ['specificJAccr','Rvir','Vvir'], lambda: TimeFunction(self.var['specificJAccr'].cgs()/(np.sqrt(2.0)*self.var['Rvir'].cgs()*self.var['Vvir'].cgs()), 'dimensionlessSpinAccr', sensibleConv=1.0, cgsConv=1.0, texString=r'$j_\mathrm{accr}/\sqrt{2} R_\mathrm{vir} V_\mathrm{vir}$', theRange=lambdaRange))
+
+        self.var.define('BTcen', TimeFunction, ['mCentral','mstar'], lambda: TimeFunction( self.var['mCentral'].sensible()/self.var['mstar'].sensible(), 'BTcen', log=False, texString=r'$M_\mathrm{cen}/M_*$'))
+        self.var.define('BTmin', TimeFunction, ['mCentral','colst','rb','mstar'], lambda: TimeFunction( (self.var['mCentral'].cgs()-self.var['colst'].cgs(locIndex=0)*np.pi*self.var['rb'].cgs(locIndex=0)**2.0)/self.var['mstar'].cgs(), 'BTmin', log=False, texString=r'BT min'))
+
+        self.var.define('mdisk', TimeFunction, ['mstar','mCentral'], lambda: TimeFunction( self.var['mstar'].sensible()- self.var['mCentral'].sensible(), 'BTcen', texString=r'$M_* - M_\mathrm{cen}$', theRange=[1.0e8, 1.0e11]))
+
+        def colNormalizedKravtsov():
+            mgasvis = np.sum((self.var['colHI'].cgs() + self.var['colH2'].cgs())*self.var['dA'].cgs(),axis=1)
+            colNtile = np.tile( (0.448*mgasvis/np.power(0.015*self.var['Rvir'].cgs(),2.0)), (int(self.p['nx']),1) ).T
+            return RadialFunction( (self.var['colHI'].cgs()+self.var['colH2'].cgs())/colNtile, 'colNormalizedKravtsov', log=True, texString=r'$\Sigma/\Sigma_n$')
+        self.var.define('colNormalizedKravtsov', RadialFunction, ['colHI','colH2','dA','Rvir'], colNormalizedKravtsov)
+        def colstNormalizedKravtsov():
+            colstNtile = np.tile( (0.448*self.var['mstar'].cgs()/np.power(0.015*self.var['Rvir'].cgs(),2.0)), (int(self.p['nx']),1) ).T
+            return RadialFunction( self.var['colst'].cgs()/colstNtile, 'colstNormalizedKravtsov', log=True, texString=r'$\Sigma_*/\Sigma_{*,n}$')
+        self.var.define('colstNormalizedKravtsov', RadialFunction, ['mstar','Rvir','colst'], colstNormalizedKravtsov)
+
         whitelist = ['rb','r','dA','rx','dr'] + keepOnly + starList
         if ('colstFit' in whitelist or 'colstFit2' in whitelist or 'stFit2Residual' in whitelist or 'stFitResidual' in whitelist) and not computeFit:
             print ("You asked me to plot something that you asked me not to compute! Either add --fit or take away and colstFit or colstFit2.")
@@ -1151,21 +1463,103 @@ class SingleModel:
         if 'colstFit' in whitelist or 'colstFit2' in whitelist:
             if 'colst' not in whitelist:
                 whitelist += ['colst']
-        for key in theKeys:
-            if(isinstance(self.var[key],RadialFunction) and not (key in whitelist)):
-                del self.var[key]
+        if cache:
+            self.loadVarCache(fh, keepStars)
+        self.var.keep(whitelist)
+        if narrow:
+            for name in list(self.var.visible.keys()):
+                if name not in whitelist:
+                    del self.var.visible[name]
+            # Read in only the columns that what's left needs, all at once.
+            self.dataCube = ColumnSubset(self.dataCube, self.var.rawColumns(list(self.var.visible.keys())))
 
         #npd = (np.diff(np.sign(self.getData('fH2')-0.5),axis=1) != 0)*1
         #LI = []
         #for i in range(len(np.shape(npd)[0])):
-        #    ind = np.argmax(npd[i,:]==1) 
+        #    ind = np.argmax(npd[i,:]==1)
         #    if(ind==0):
         #        ind=-1
 
         #self.var['rHI'] = TimeFunction(self.getData('r',locIndex=npd,cgs=True),'rHI', \
         #        1.0,1.0/cmperkpc,r'$r_{H\mathrm{I}}$ (kpc)')
+    def release(self, evaluate=True):
+        ''' Throw away the raw data and everything that was only needed as an intermediate step. Unless evaluate
+            is False, first compute every quantity that hasn't been accessed yet (after read(..., lazy=True)).'''
+        if evaluate:
+            self.var.evaluate()
+        self.saveVarCache()
+        if getattr(self, 'varCache', None) is not None:
+            self.varCache.close()
+            self.varCache = None
+        self.var.release()
+        if getattr(self, 'dtype', None) is not None:
+            self.var.setPrecision(self.dtype)
         del self.dataCube
         del self.evarray
+    def varCacheKey(self, fh, keepStars):
+        ''' A string identifying the raw data and options from which the derived quantities are computed.'''
+        mtimes = {}
+        for suffix in ['_radial.dat', '_evolution.dat', '_stars.dat']:
+            if os.path.exists(self.path+suffix):
+                mtimes[suffix] = os.path.getmtime(self.path+suffix)
+        return json.dumps( dict(version=varCacheVersion, mtimes=mtimes, fh=fh, keepStars=keepStars), sort_keys=True )
+    def loadVarCache(self, fh, keepStars):
+        ''' Replace the producers of any quantity stored in <path>_var.npz (<path>_varStars.npz with keepStars) by ones which read it from the cache,
+            provided the cache was made from the same raw data with the same options. '''
+        # Quantities like stZ depend on whether the stellar populations were read in, so keep separate caches.
+        self.varCacheFile = self.path+('_varStars.npz' if keepStars else '_var.npz')
+        self.varCacheKeyString = self.varCacheKey(fh, keepStars)
+        self.varCache = None
+        self.varCacheMeta = {}
+        if not os.path.exists(self.varCacheFile):
+            return
+        try:
+            varCache = np.load(self.varCacheFile)
+            if str(varCache['key']) != self.varCacheKeyString:
+                varCache.close()
+                return
+            self.varCacheMeta = json.loads(str(varCache['meta']))
+        except (IOError, KeyError, ValueError, OSError) as e:
+            print ("WARNING: failed to read ", self.varCacheFile, e)
+            return
+        self.varCache = varCache
+        def loader(name):
+            return lambda: varFromCache(name, self.varCacheMeta[name], self.varCache)
+        for name in self.varCacheMeta.keys():
+            # Only use cached quantities that read() would otherwise have computed.
+            if name in self.var.kinds:
+                self.var.define(name, self.var.kinds[name], [], loader(name))
+    def saveVarCache(self):
+        ''' Write every quantity computed so far (along with whatever was already in the cache) to <path>_var.npz.'''
+        if not hasattr(self, 'varCacheKeyString'):
+            return # read() was called with cache=False
+        computed = [name for name in self.var.kinds.keys() if self.var.isComputed(name)]
+        if all([name in self.varCacheMeta for name in computed]):
+            return # nothing new
+        arrays = {}
+        meta = {}
+        for name in self.varCacheMeta.keys():
+            if name not in computed:
+                for suffix in ['.arr', '.inner', '.outer']:
+                    if name+suffix in self.varCache.files:
+                        arrays[name+suffix] = self.varCache[name+suffix]
+                meta[name] = self.varCacheMeta[name]
+        for name in computed:
+            meta[name] = varToCache(name, dict.__getitem__(self.var, name), arrays)
+        if self.varCache is not None:
+            self.varCache.close()
+            self.varCache = None
+        arrays['key'] = np.array(self.varCacheKeyString)
+        arrays['meta'] = np.array(json.dumps(meta))
+        # Write to a temporary file first so that a concurrent reader never sees a partially written cache.
+        tmpFile = self.varCacheFile+'.'+str(os.getpid())+'.tmp'
+        try:
+            with open(tmpFile, 'wb') as f:
+                np.savez(f, **arrays)
+            os.rename(tmpFile, self.varCacheFile)
+        except (IOError, OSError) as e:
+            print ("WARNING: failed to write ", self.varCacheFile, e)
+        self.varCacheMeta = meta
     def getData(self,name,timeIndex=None,locIndex=None,cgs=False):
         '''Get the data associated with RadialFunction or TimeFunction named name. '''
         if name in self.var.keys():
@@ -1185,14 +1579,14 @@ class SingleModel:
         rf=[]
         blacklist=['rb','r','dA','rx','dr']
         for key in self.var.keys():
-            if(isinstance(self.var[key],RadialFunction) and not key in blacklist):
+            if(issubclass(self.var.kind(key),RadialFunction) and not key in blacklist):
                 rf.append(key)
         return rf
     def getTimeFunctions(self):
         tf=[]
         blacklist=['t','z','step']
         for key in self.var.keys():
-            rule = isinstance(self.var[key],TimeFunction) and not key in blacklist and not 'ageSt' in key and not 'startingAgeSt' in key and not 'endingAgeSt' in key  #and not 'specificJ' in key and not 'dimensionlessSpin' in key and not key[0]=='J'
+            rule = issubclass(self.var.kind(key),TimeFunction) and not key in blacklist and not 'ageSt' in key and not 'startingAgeSt' in key and not 'endingAgeSt' in key  #and not 'specificJ' in key and not 'dimensionlessSpin' in key and not key[0]=='J'
             if(rule):
                 tf.append(key)
         return tf
@@ -1443,53 +1837,552 @@ def Nearest(arr,val):
     return index,arr[index]
 
 
+def searchsortedRows(arr, vals):
+    ''' np.searchsorted(arr[i,:], vals[i]) for every row i of the 2D array arr at once. Each row should be sorted.'''
+    return np.sum(arr < np.reshape(vals, (-1,1)), axis=1)
+
+def nearestIndices(arr, vals):
+    ''' The index Nearest(arr, val) would return for each element of vals.'''
+    return np.argmin(np.abs(arr[None,:] - np.reshape(vals, (-1,1))), axis=1)
+
+def gridSlopes(rf, rVec, start, stops, rows):
+    ''' For each timestep in rows, the slope of a least-squares linear fit of log10 of the RadialFunction rf (in cgs)
+        against radius, sampled at np.arange(start, stops[i], 0.2). The grids all start at the same radius, so they're
+        all pieces of one grid, and rf is interpolated onto that grid for every timestep at once.'''
+    counts = np.maximum(np.ceil((stops-start)/0.2), 0).astype(int) # the length np.arange would give each grid
+    rgrid = np.arange(start, np.max(stops), 0.2)
+    logZ = np.log10(rf.atRAll(rgrid, rVec, sensible=False)[rows,:])
+    mask = np.arange(len(rgrid))[None,:] < counts[:,None]
+    n = np.sum(mask, axis=1)
+    x = np.where(mask, rgrid[None,:], 0.0)
+    y = np.where(mask, logZ, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dx = np.where(mask, x - (np.sum(x,axis=1)/n)[:,None], 0.0)
+        slopes = np.sum(dx*y, axis=1)/np.sum(dx*dx, axis=1)
+    for i in np.nonzero(n<2)[0]:
+        # Not enough points for the closed form - let polyfit deal with it (or complain) as before.
+        try:
+            slopes[i], _ = np.polyfit(rgrid[:counts[i]], logZ[i,:counts[i]], 1)
+        except:
+            pdb.set_trace()
+    return slopes
+
 def tail(f, n, offset=0):
-    proc = subprocess.Popen(['tail', '-n', str(n + offset), f], stdout=subprocess.PIPE)
-    lines = proc.stdout.readlines()
-    oneLine = ""
-    for line in lines:
-        oneLine += str(line.decode("latin-1"))
-    return oneLine
-
-def reachedRedshiftZero(fn):
+    ''' Return the last n+offset lines of the file f as a single string, like tail -n. The file is read backwards
+        from the end a block at a time, so this doesn't depend on its length.'''
+    nlines = n+offset
+    if nlines<=0:
+        return ""
+    with open(f,'rb') as fh:
+        fh.seek(0,2)
+        pos = fh.tell()
+        data = b''
+        while pos>0 and data.count(b'\n') <= nlines:
+            step = min(4096, pos)
+            pos -= step
+            fh.seek(pos)
+            data = fh.read(step) + data
+    if len(data)==0:
+        return ""
+    lines = data.split(b'\n')
+    trailing = lines[-1]==b''
+    if trailing:
+        lines = lines[:-1]
+    oneLine = b'\n'.join(lines[-nlines:])
+    if trailing:
+        oneLine += b'\n'
+    return oneLine.decode("latin-1")
+
+def reachedRedshiftZero(fn, verbose=True):
     ''' Read in the last few lines of the standard output and check whether the code successfully reached redshift zero.
         This can be used to check whether a model has finshed successfully, or whether it's either still running or exited early.'''
-    lastFewLines = tail(fn+'_stdo.txt', 5)
-    print("Checking the following 'last few lines': ", lastFewLines)
-    #with open(fn+'_stdo.txt','r') as f:
-
-        #f.seek(-200, 2)
-        #lastFewLines = f.read(200)
-#        try:
-#            f.seek(-200, 2)
-#            lastFewLines = f.read(200)
-#        except:
-#            print ("WARNING: failed to read last 200 elements of ",fn+'_stdo.txt')
-#            lastFewLines=''
+    try:
+        lastFewLines = tail(fn+'_stdo.txt', 5)
+    except (IOError, OSError):
+        print ("WARNING: failed to read the end of ",fn+'_stdo.txt')
+        lastFewLines = ''
+    if verbose:
+        print("Checking the following 'last few lines': ", lastFewLines)
     return 'Reached redshift zero' in lastFewLines
 
+def discoverModels(name, manifest=False):
+    ''' Find every model in every experiment matching name, i.e. the same models as
+        glob(gidgetdir+'analysis/*'+name+'*/*_comment.txt'), listing each directory once and reading only the end of each model's
+        _stdo.txt. Returns a list of (path, size of _stde.txt, whether it reached redshift zero), sorted like the glob.
+        With manifest=True, the results for each experiment directory are kept in <dir>/manifest.json, and only the
+        models whose _stde.txt or _stdo.txt have changed since are checked again.'''
+    models = []
+    analysis = gidgetdir+'analysis'
+    dirs = sorted([dirname for dirname in os.listdir(analysis) if not dirname.startswith('.') \
+            and fnmatch.fnmatchcase(dirname, '*'+name+'*') and os.path.isdir(analysis+'/'+dirname)])
+    for dirname in dirs:
+        directory = analysis+'/'+dirname
+        sizes = {}
+        for fname in os.listdir(directory):
+            if fname.endswith(('_comment.txt','_stde.txt','_stdo.txt')) and not fname.startswith('.'):
+                st = os.stat(directory+'/'+fname)
+                sizes[fname] = [st.st_size, st.st_mtime]
+        known = {}
+        manifestFile = directory+'/manifest.json'
+        if manifest and os.path.exists(manifestFile):
+            try:
+                with open(manifestFile,'r') as f:
+                    contents = json.load(f)
+                if contents.get('version')==1:
+                    known = contents['models']
+            except (IOError, OSError, ValueError) as e:
+                print ("WARNING: failed to read ", manifestFile, e)
+        entries = {}
+        for fname in sorted([fname for fname in sizes.keys() if fname.endswith('_comment.txt')]):
+            base = fname[:-12]
+            stde = sizes.get(base+'_stde.txt', [-1, 0])
+            stdo = sizes.get(base+'_stdo.txt', [-1, 0])
+            if base in known and known[base]['stde']==stde and known[base]['stdo']==stdo:
+                entries[base] = known[base]
+            else:
+                entries[base] = dict(stde=stde, stdo=stdo, finished=stdo[0]>0 and reachedRedshiftZero(directory+'/'+base, verbose=False))
+            models.append( (directory+'/'+base, stde[0], entries[base]['finished']) )
+        if manifest and entries != known:
+            # Write to a temporary file first so that a concurrent reader never sees a partially written manifest.
+            tmpFile = manifestFile+'.'+str(os.getpid())+'.tmp'
+            try:
+                with open(tmpFile,'w') as f:
+                    json.dump(dict(version=1, models=entries), f)
+                os.rename(tmpFile, manifestFile)
+            except (IOError, OSError) as e:
+                print ("WARNING: failed to write ", manifestFile, e)
+    return sorted(models, key=lambda model: model[0]+'_comment.txt')
+
+def readParams(path):
+    ''' Read in the parameters of the model at path from its _comment.txt, _aux.txt, _inputRandomFactors.txt and
+        _inputRandomFactorsY.txt. Returns a dict of their values, and a dict of whether each should be treated as logarithmic.'''
+    p={}
+    with open(path+'_comment.txt','r') as comment:
+        lines = comment.readlines()
+        # paramnames - copied from exper.py's experiment class.
+        paramnames = ['nx','eta','epsff','tauHeat','analyticQ', \
+                'cosmologyOn','xmin','NActive','NPassive','vphiR', \
+                'R','gasTemp','Qlim','fg0','phi0', \
+                'zstart','tmax','stepmax','TOL','muNorm', \
+                'muColScaling','b','innerPowerLaw','softening', \
+                'diskScaleLength','whichAccretionHistory','alphaMRI' \
+                ,'thickness','migratePassive','fixedQ','kappaMetals', \
+                'Mh0','minSigSt','NChanges','dbg','accScaleLength', \
+                'zquench','zrelax','xiREC','RfREC','deltaOmega', \
+                'Noutputs','accNorm','accAlphaZ','accAlphaMh', \
+                'accCeiling','fscatter','invMassRatio','fcool', \
+                'whichAccretionProfile','alphaAccretionProfile', \
+                'widthAccretionProfile','fH2Min','tDepH2SC','ZIGM','fg0mult','ZIGMfac','chiZslope','deltaBeta','yREC', \
+                'concentrationRandomFactor','muFgScaling','muMhScaling','ksuppress', 'kpower', \
+                'MQuench','epsquench','muQuench','stScaleReduction','gaScaleReduction','ZMix', \
+                'energyInjectionFactor', 'CloudHeatingRate','AccretionHeatingRate']
+        params=[]
+        line = lines[-1] # get the last line
+        tmp = line.split() # split the line into a list of strings
+        for k,pname in enumerate(paramnames):
+            p[pname] = float(tmp[k+2]) # k=0 is the run name which we already have
+        #for k,line in enumerate(lines):
+        #    cloc = line.find(':')
+        #    if(cloc != -1):
+        #        params.append(float(line[cloc+1:-1]))
+        for k,par in enumerate(params):
+            p[paramnames[k]] = par
+    auxparams=[]
+    with open(path+'_aux.txt','r') as aux:
+        lines = aux.readlines()
+        for k,line in enumerate(lines):
+            cloc = line.find(':')
+            if(cloc!=-1):
+                auxparams.append(float(line[cloc+1:-1]))
+    p['md0'] = auxparams[0]
+    p['ND08attempts'] = auxparams[1]
+    irfs=[]
+    try:
+        with open(path+'_inputRandomFactors.txt','r') as irf:
+            # Record input random factors, if they exist, as x0, x1, ...
+            lines = irf.readlines()
+            for k,line in enumerate(lines):
+                irfs.append('x'+str(k))
+                p[irfs[-1]] = float(line)
+    except:
+        print ("Failed to read in <path>_inputRandomFactors.txt")
+    irfYs=[]
+    try:
+        with open(path+'_inputRandomFactorsY.txt','r') as irfY:
+            # Record input random factors, if they exist, as y0, y1, ...
+            lines = irfY.readlines()
+            for k,line in enumerate(lines):
+                irfYs.append('y'+str(k))
+                p[irfYs[-1]] = float(line)
+    except:
+        print ("Failed to read in <path>_inputRandomFactorsY.txt")
+    pLog={}
+    for par in p.keys():
+        pLog[par] = True # set all parameters to be logarithmic by default
+    # except for the following
+    for par in ['xiREC','b','innerPowerLaw','zrelax','zstart','zquench','concentrationRandomFactor','accAlphZ','accAlphaMh','alphaAccretionProfile','whichAccretionHistory','whichAccretionProfile','concentrationRandomFactor','muFgScaling','ND08attempts','muColScaling']+irfs+irfYs:
+        pLog[par] = False
+    return p, pLog
+
+def paramFileTimes(path):
+    ''' The modification times of the files readParams reads for the model at path (None for ones which don't exist).'''
+    mtimes = []
+    for suffix in ['_comment.txt', '_aux.txt', '_inputRandomFactors.txt', '_inputRandomFactorsY.txt']:
+        try:
+            mtimes.append(os.path.getmtime(path+suffix))
+        except OSError:
+            mtimes.append(None)
+    return mtimes
+
+def readParamTable(paths, cache=True):
+    ''' Read in the parameters of every model in paths. Returns a structured array with one row per model and one
+        float field per parameter, in the order readParams finds them, with nan where a model doesn't have that parameter,
+        and a dict of whether each parameter is logarithmic. With cache=True, the table for the models in each directory
+        is kept in <dir>/params.npz, and only the models whose parameter files have changed since are read in again.'''
+    byDir = {}
+    for path in paths:
+        byDir.setdefault(os.path.dirname(path), []).append(path)
+    models = {}
+    logs = {}
+    for directory, dirPaths in byDir.items():
+        cacheFile = directory+'/params.npz'
+        known = {}
+        if cache and os.path.exists(cacheFile):
+            try:
+                with np.load(cacheFile) as npz:
+                    meta = json.loads(str(npz['meta']))
+                    table = npz['table']
+                if meta['version']==1:
+                    logs.update(meta['logs'])
+                    for i,base in enumerate(meta['models']):
+                        row = dict([(name, v) for name,v in zip(table.dtype.names, table[i].tolist()) if not np.isnan(v)])
+                        known[base] = (meta['mtimes'][base], row)
+            except (IOError, OSError, KeyError, ValueError) as e:
+                print ("WARNING: failed to read ", cacheFile, e)
+                known = {}
+        changed = False
+        for path in dirPaths:
+            base = os.path.basename(path)
+            mtimes = paramFileTimes(path)
+            if base not in known or known[base][0] != mtimes:
+                p, pLog = readParams(path)
+                logs.update(pLog)
+                known[base] = (mtimes, p)
+                changed = True
+            models[path] = known[base][1]
+        if cache and changed:
+            # Keep the models which aren't in paths too, e.g. ones which were still running, so they needn't be read again.
+            bases = sorted(known.keys())
+            dirNames = {}
+            for base in bases:
+                for name in known[base][1].keys():
+                    dirNames.setdefault(name, len(dirNames))
+            dirNames = sorted(dirNames.keys(), key=dirNames.get)
+            table = np.array([tuple([known[base][1].get(name, np.nan) for name in dirNames]) for base in bases], \
+                    dtype=[(name,'f8') for name in dirNames])
+            meta = dict(version=1, models=bases, mtimes=dict([(base, known[base][0]) for base in bases]), logs=logs)
+            tmpFile = cacheFile+'.'+str(os.getpid())+'.tmp'
+            try:
+                with open(tmpFile, 'wb') as f:
+                    np.savez(f, table=table, meta=np.array(json.dumps(meta)))
+                os.rename(tmpFile, cacheFile)
+            except (IOError, OSError) as e:
+                print ("WARNING: failed to write ", cacheFile, e)
+    names = {}
+    for path in paths:
+        for name in models[path].keys():
+            names.setdefault(name, len(names))
+    names = sorted(names.keys(), key=names.get)
+    table = np.array([tuple([models[path].get(name, np.nan) for name in names]) for path in paths], \
+            dtype=[(name,'f8') for name in names])
+    return table, dict([(name, logs.get(name, True)) for name in names])
+
+def readHeaderV2(fn):
+    ''' Read the header of a _radial.dat or _evolution.dat file written in the v2 format (with dbg.opt(20)). Returns None
+        for a file in the original format, otherwise a dict with ncol, nrow, the number of complete timesteps nsteps,
+        headerSize, the offset in bytes of the first timestep's (nrow, ncol) block, and the names and units of the columns.'''
+    with open(fn,'rb') as f:
+        if f.read(8) != b'GIDGETV2':
+            return None
+        version, ncol, nrow, nsteps, headerSize, nameLength = struct.unpack('6i', f.read(24))
+        if version not in [2,3]:
+            raise ValueError("Unknown version "+str(version)+" of the output format in "+fn)
+        strings = [ f.read(nameLength).split(b'\0')[0].decode() for i in range(2*ncol) ]
+    if version==2:
+        # nsteps is updated after each block is written, but a copy of the file might have been cut short.
+        nsteps = min(nsteps, int((os.path.getsize(fn)-headerSize)/(8*ncol*nrow)))
+    return dict(version=version, ncol=ncol, nrow=nrow, nsteps=nsteps, headerSize=headerSize, names=strings[:ncol], units=strings[ncol:])
+
+def columnOrder(fn, header, columns):
+    ''' The column of a v2 format file with the given header to use for each of columns, or -1 where it has none. None if
+        the file's columns start with columns already, which is the case unless it was written by a different version of the code.'''
+    names = header['names']
+    if columns is None or names[:len(columns)]==columns:
+        return None
+    print ("WARNING: rearranging the columns of ",fn," to match this version of readoutput")
+    return [names.index(name) if name in names else -1 for name in columns]
+
+def reorderColumns(arr, order):
+    ''' Copy the columns order of arr (the last axis), as given by columnOrder, filling in nan for any that are missing.'''
+    if order is None:
+        return arr
+    out = np.zeros(np.shape(arr)[:-1]+(len(order),)) + np.nan
+    for i,col in enumerate(order):
+        if col>=0:
+            out[...,i] = arr[...,col]
+    return out
+
+def chunkIndex(fn, header, nsteps=None, index=None):
+    ''' Scan the compressed blocks of a file in version 3 of the v2 format, each of which is preceded by its compressed and
+        uncompressed size in bytes. Returns a list of (offset, compressed size, uncompressed size), one per timestep, where offset
+        is the position of the compressed data. Like radialIndex, it stops at a truncated block, and carries on from where
+        an earlier call ended if given its index.'''
+    if index is None:
+        index = []
+    if nsteps is None:
+        nsteps = header['nsteps']
+    fsize = os.path.getsize(fn)
+    with open(fn,'rb') as f:
+        pos = header['headerSize']
+        if len(index)>0:
+            offset, clen, _ = index[-1]
+            pos = offset + clen
+        while pos+8 <= fsize and len(index)<nsteps:
+            f.seek(pos)
+            clen, ulen = struct.unpack('ii', f.read(8))
+            if pos + 8 + clen > fsize:
+                break
+            index.append( (pos+8, clen, ulen) )
+            pos += 8 + clen
+    return index
+
+def readChunks(fn, index, steps):
+    ''' Decompress the blocks of the timesteps steps, given the chunkIndex of the file. Returns a list of bytes objects.'''
+    blocks = []
+    with open(fn,'rb') as f:
+        for ti in steps:
+            offset, clen, ulen = index[ti]
+            f.seek(offset)
+            blocks.append(zlib.decompress(f.read(clen)))
+    return blocks
+
+class ChunkedArray:
+    ''' Stands in for the dataCube of a SingleModel whose _radial.dat is compressed (written with dbg.opt(21)). Indexing it with
+        a timestep, or an array of them, only decompresses those timesteps; anything else decompresses all of them, once.
+        Given the ChunkedArray this one replaces after new timesteps were written, its decompressed timesteps are reused.'''
+    def __init__(self, fn, header, index, columns=None, previous=None):
+        self.fn = fn
+        self.index = index
+        self.nrow, self.ncol = header['nrow'], header['ncol']
+        self.order = columnOrder(fn, header, columns)
+        self.shape = (len(index), self.nrow, self.ncol if self.order is None else len(self.order))
+        self.arr = None
+        self.previous = previous.arr if previous is not None else None
+    def readSteps(self, steps):
+        blocks = readChunks(self.fn, self.index, steps)
+        arr = np.array([np.frombuffer(block, dtype='f8') for block in blocks]).reshape((len(blocks), self.nrow, self.ncol))
+        return reorderColumns(arr, self.order)
+    def __getitem__(self, key):
+        if self.arr is None:
+            if isinstance(key, (int, np.integer)):
+                return self.readSteps([key])[0]
+            if isinstance(key, (list, np.ndarray)) and np.ndim(key)==1:
+                return self.readSteps(np.arange(self.shape[0])[key])
+            done = 0 if self.previous is None else len(self.previous)
+            self.arr = np.zeros(self.shape)
+            if done>0:
+                self.arr[:done] = self.previous
+            if done<self.shape[0]:
+                self.arr[done:] = self.readSteps(range(done, self.shape[0]))
+            self.previous = None
+        return self.arr[key]
+
+def memmapV2(fn, header, nsteps=None, columns=None):
+    ''' Return the first nsteps timesteps of a v2 format file with the given header as an array of shape (nsteps, nrow, ncol),
+        a view of a read-only np.memmap of the file. If the columns of the file aren't in the order given by columns,
+        e.g. because it was written by a different version of the code, the columns are copied out in that order
+        instead, with any which are missing set to nan.'''
+    if nsteps is None:
+        nsteps = header['nsteps']
+    if nsteps==0:
+        return np.zeros((0, header['nrow'], header['ncol']))
+    mm = np.memmap(fn, dtype='f8', mode='r', offset=header['headerSize'], shape=(nsteps, header['nrow'], header['ncol']))
+    return reorderColumns(mm, columnOrder(fn, header, columns))
+
+def radialIndex(fn, nsteps=None, index=None):
+    ''' Scan the (ncol, nrow) headers which precede each timestep's block in a _radial.dat file, seeking
+        past the data itself. Returns a list of (offset, ncol, nrow), one per timestep, where offset is the
+        position in bytes of the first double in that timestep's block. Stops early at a truncated block,
+        e.g. if the model is still running. If given the index from an earlier call, carry on scanning from
+        where it ended, and return it with any new timesteps appended.'''
+    if index is None:
+        index = []
+    fsize = os.path.getsize(fn)
+    with open(fn,'rb') as radial:
+        pos = 0
+        if len(index)>0:
+            offset, ncolstep, nrowstep = index[-1]
+            pos = offset + 8*ncolstep*nrowstep
+        while pos+8 <= fsize and (nsteps is None or len(index)<nsteps):
+            radial.seek(pos)
+            ncolstep, nrowstep = struct.unpack('ii', radial.read(8))
+            if pos + 8 + 8*ncolstep*nrowstep > fsize:
+                break
+            index.append( (pos+8, ncolstep, nrowstep) )
+            pos += 8 + 8*ncolstep*nrowstep
+    return index
+
+def memmapRadial(fn, nsteps=None, index=None):
+    ''' Return the contents of a _radial.dat file as an array of shape (nsteps, nrow, ncol) without reading
+        the file into memory. The array is a strided view of a read-only np.memmap of the file, so only
+        the pieces which are actually used are ever read from disk. If the blocks are not all the same
+        shape (which the code never does at the moment), fall back to copying them into a single array.
+        The file is scanned with radialIndex unless its index is given.'''
+    if index is None:
+        index = radialIndex(fn, nsteps)
+    index = index[:nsteps]
+    if len(index)==0:
+        return np.zeros((0,0,0))
+    _, ncol, nrow = index[0]
+    if all([ncolstep==ncol and nrowstep==nrow for _,ncolstep,nrowstep in index]):
+        # every block is (ncol, nrow, data), so the whole file is just an array of records.
+        record = np.dtype([('ncol','i4'), ('nrow','i4'), ('data','f8',(nrow,ncol))])
+        mm = np.memmap(fn, dtype=record, mode='r', shape=(len(index),))
+        return mm['data']
+    print ("WARNING: inconsistent block shapes in ",fn," - reading it in the slow way")
+    mm = np.memmap(fn, dtype=np.uint8, mode='r')
+    return np.array([ np.ndarray((nrowstep,ncolstep), dtype='f8', buffer=mm, offset=offset) for offset,ncolstep,nrowstep in index ])
+
+class ColumnSubset:
+    ''' Stands in for the dataCube of a SingleModel when only a few of its columns are needed. The columns cols are
+        copied out of the memmap in a single pass over the file, and indexed just like the full dataCube, i.e. with
+        the column number last. Any other column is read from the memmap when it's asked for.'''
+    def __init__(self, dataCube, cols):
+        self.dataCube = dataCube
+        self.shape = dataCube.shape
+        self.index = dict([(col,i) for i,col in enumerate(cols)])
+        self.arr = np.array(dataCube[:,:,list(cols)]) if len(cols)>0 else np.zeros(self.shape[:2]+(0,))
+    def __getitem__(self, key):
+        col = key[-1]
+        if not isinstance(col, slice) and col in self.index:
+            return self.arr[key[:-1]+(self.index[col],)]
+        return self.dataCube[key]
+
+def starsStepDtype(sz, nx):
+    ''' The layout of one timestep of a _stars.dat file: NAgeBins+1, the number of stellar populations sz, nx,
+        the radial grid, then for each population its age, starting and ending age, followed by
+        the column density, radial and vertical velocity dispersions, and oxygen and iron abundances.'''
+    population = np.dtype([('age','f8'), ('startingAge','f8'), ('endingAge','f8'), \
+            ('col','f8',(nx,)), ('sigR','f8',(nx,)), ('sigZ','f8',(nx,)), ('ZO','f8',(nx,)), ('ZFe','f8',(nx,))])
+    return np.dtype([('NABp1','i4'), ('sz','i4'), ('nx','i4'), ('x','f8',(nx,)), ('pops',population,(sz,))])
+
+def starsIndex(fn, nsteps=None):
+    ''' Scan the (NABp1, sz, nx) headers of each timestep in a _stars.dat file. Returns a list of (offset, NABp1, sz, nx),
+        where offset is the position in bytes of the start of each timestep.'''
+    index = []
+    fsize = os.path.getsize(fn)
+    with open(fn,'rb') as stars:
+        pos = 0
+        while pos+12 <= fsize and (nsteps is None or len(index)<nsteps):
+            stars.seek(pos)
+            NABp1, sz, nnx = struct.unpack('iii', stars.read(12))
+            stepsize = starsStepDtype(sz,nnx).itemsize
+            if pos + stepsize > fsize:
+                break
+            index.append( (pos, NABp1, sz, nnx) )
+            pos += stepsize
+    return index
+
+def readStars(fn, nsteps=None, steps=None):
+    ''' Decode a _stars.dat file. Returns age, startingAge, endingAge, each of shape (NABp1, nsteps), and
+        col, sigR, sigZ, ZOst, ZFest, each of shape (NABp1, nsteps, nx). Populations which did not
+        exist yet at a given timestep are left as zeros. Given a list of timestep indices steps, only those
+        timesteps are decoded, in that order, and nsteps is the number of them. The file may be compressed (see chunkIndex).'''
+    header = readHeaderV2(fn)
+    if header is not None:
+        index = chunkIndex(fn, header, nsteps if steps is None else max(steps)+1)
+        blocks = readChunks(fn, index, range(len(index)) if steps is None else steps)
+        # each block is laid out as a timestep of the original format.
+        blocks = [ np.frombuffer(block, dtype=starsStepDtype(*struct.unpack('iii', block[:12])[1:])) for block in blocks ]
+        index = [ (0, block['NABp1'][0], block['sz'][0], block['nx'][0]) for block in blocks ]
+    elif steps is None:
+        index = starsIndex(fn, nsteps)
+    else:
+        index = starsIndex(fn, max(steps)+1)
+        index = [index[i] for i in steps]
+    _, NABp1, _, nnx = index[0]
+    nt = len(index)
+    age = np.zeros((NABp1, nt))
+    startingAge = np.zeros((NABp1, nt))
+    endingAge = np.zeros((NABp1, nt))
+    col = np.zeros((NABp1, nt, nnx))
+    sigR = np.zeros((NABp1, nt, nnx))
+    sigZ = np.zeros((NABp1, nt, nnx))
+    ZOst = np.zeros((NABp1, nt, nnx))
+    ZFest = np.zeros((NABp1, nt, nnx))
+    mm = np.memmap(fn, dtype=np.uint8, mode='r')
+    sizes = [sz for _,_,sz,_ in index]
+    if header is not None:
+        popsList = [ block['pops'] for block in blocks ]
+        stepSlices = [ slice(i,i+1) for i in range(nt) ]
+    elif min(sizes)==max(sizes) and steps is None:
+        # every timestep has the same layout, so the whole file is a single array of records.
+        popsList = [ np.ndarray((nt,), dtype=starsStepDtype(sizes[0],nnx), buffer=mm, offset=0)['pops'] ]
+        stepSlices = [ slice(0,nt) ]
+    else:
+        popsList = [ np.ndarray((1,), dtype=starsStepDtype(sz,nnx), buffer=mm, offset=offset)['pops'] for offset,_,sz,_ in index ]
+        stepSlices = [ slice(i,i+1) for i in range(nt) ]
+    for pops,ti in zip(popsList,stepSlices):
+        # pops ~ (timestep, population), so swap the axes to get (population, timestep, ...)
+        sz = np.shape(pops)[1]
+        age[:sz,ti] = pops['age'].T
+        startingAge[:sz,ti] = pops['startingAge'].T
+        endingAge[:sz,ti] = pops['endingAge'].T
+        col[:sz,ti,:] = np.swapaxes(pops['col'],0,1)
+        sigR[:sz,ti,:] = np.swapaxes(pops['sigR'],0,1)
+        sigZ[:sz,ti,:] = np.swapaxes(pops['sigZ'],0,1)
+        ZOst[:sz,ti,:] = np.swapaxes(pops['ZO'],0,1)
+        ZFest[:sz,ti,:] = np.swapaxes(pops['ZFe'],0,1)
+    del mm
+    return age, startingAge, endingAge, col, sigR, sigZ, ZOst, ZFest
+
+def cacheModel(args):
+    ''' Worker for Experiment.read(..., nproc>1). Read in the model at path with the keyword arguments kwargs,
+        which should include cache=True, so that its derived quantities end up in its cache file. '''
+    path, kwargs = args
+    try:
+        SingleModel(path).read(**kwargs)
+    except Exception as e:
+        print ("Failed to read model ", path, e)
+        return path, False
+    return path, True
 
 class Experiment:
-    def __init__(self,name):
-        '''Collect every model in every experiment matching name. '''
+    def __init__(self,name,running=False,manifest=False):
+        '''Collect every model in every experiment matching name. With running=True, include models which
+           haven't reached redshift zero yet - see read(..., incremental=True) and refresh(). With manifest=True,
+           remember which models have finished in a manifest.json in each experiment's directory - see discoverModels.'''
         self.name=name
+        self.running=running
+        self.manifest=manifest
         # Search for comment files
         fnameKey = gidgetdir+'analysis/*'+name+'*/*_comment.txt'
-        fnames = sorted(glob.glob(fnameKey))
+        self.fnameKey = fnameKey
+        discovered = discoverModels(name, manifest)
+        fnames = [path for path,_,_ in discovered]
         self.srParams={} # scaling relation parameters.
         self.models=[]
-        for i,fn in enumerate(fnames):
-            fnames[i] = fn[:-12] #
+        self.pending=[]
+        for i,(path,stdeSize,finished) in enumerate(discovered):
             # Only include a model if it has not left an error message AND if it has reached redshift zero.
             # The former should be a subset of the latter.
             # I recently added the latter to allow the analysis of large experiments which are still running,
             #    excluding the models that are running as all models are read in.
-            #if(os.stat(fnames[i]+'_stde_aux.txt')[6]==0) and reachedRedshiftZero(fnames[i]):
-            #if reachedRedshiftZero(fnames[i]):
-            if(os.stat(fnames[i]+'_stde.txt')[6]==0) and reachedRedshiftZero(fnames[i]):
-                self.models.append(SingleModel(fnames[i]))
+            if stdeSize==0 and (finished or running):
+                self.models.append(SingleModel(path))
+                self.models[-1].finished = finished
             else:
-                print("WARNING: didn't include model with the following properties: ", i, fn, fnames[i], os.stat(fnames[i]+'_stde.txt')[6], reachedRedshiftZero(fnames[i]))
+                print("WARNING: didn't include model with the following properties: ", i, path, stdeSize, finished)
         self.fn = fnames
         if(len(fnames)==0):
             raise ValueError("No models found in experiment "+name+" using key "+fnameKey)
@@ -1501,6 +2394,7 @@ class Experiment:
         for i,model in enumerate(self.models):
             model.p['experIndex'] = float(i)
             model.pLog['experIndex'] = False
+        self.clearStore('experIndex')
     def computeMassFunctionWeights(self, mfVariable, z, givenMF):
         ''' Given a mass function and the set of galaxies in this Experiment, compute a weight for each galaxy.
             The idea is that each galaxy in the sample is representative of galaxies with some number density,
@@ -1591,14 +2485,139 @@ class Experiment:
 
         # return 
 
-    def read(self, keepOnly=[],paramsOnly=False,keepStars=False, computeFit=False, fh=0.3):
-        ''' Read in every model in the experiment. '''
+    def read(self, keepOnly=[],paramsOnly=False,keepStars=False, computeFit=False, fh=0.3, lazy=False, cache=None, nproc=1, incremental=False, narrow=False, redshifts=None, dtype=None):
+        ''' Read in every model in the experiment. With lazy=True, derived quantities are only computed when accessed.
+            With cache=True, derived quantities are stored in and read back from <path>_var.npz for each model. By default
+            this is only done with nproc>1, or with paramsOnly, where the cache is the table of parameters in params.npz.
+            With nproc>1, the derived quantities are first computed by nproc worker processes, which hand them
+            back by writing each model's cache, so that reading the models in here only has to load the caches.
+            With incremental=True, the raw data is kept around so that refresh() can add timesteps as they're written.
+            With narrow=True, only the quantities in keepOnly are kept, and only the raw data they need is read in.
+            Given a list of redshifts, only the timesteps nearest to them are read in (see SingleModel.selectSteps).
+            With dtype=np.float32, the quantities of each model are stored in single precision to save memory (see SingleModel.read).'''
+        if cache is None:
+            cache = nproc>1 or paramsOnly
+        if nproc>1 and not paramsOnly and redshifts is None:
+            if not cache:
+                print ("WARNING: Experiment.read needs cache=True to read models in parallel. Reading serially.")
+            else:
+                import multiprocessing
+                kwargs = dict(keepOnly=keepOnly, keepStars=keepStars, computeFit=computeFit, fh=fh, cache=True, narrow=narrow)
+                pool = multiprocessing.Pool(processes=nproc)
+                try:
+                    for path,success in pool.imap_unordered( cacheModel, [(model.path, kwargs) for model in self.models], chunksize=4 ):
+                        if not success:
+                            print ("WARNING: failed to read model in parallel, will try again serially: ", path)
+                finally:
+                    pool.close()
+                    pool.join()
+        self.readArgs = dict(keepOnly=keepOnly,paramsOnly=paramsOnly,keepStars=keepStars,computeFit=computeFit, fh=fh, lazy=lazy, cache=cache, incremental=incremental, narrow=narrow, redshifts=redshifts, dtype=dtype)
+        if paramsOnly:
+            self.loadParams(cache)
+            self.clearStore()
+            return
         n=0
         for model in self.models:
-            model.read(keepOnly=keepOnly,paramsOnly=paramsOnly,keepStars=keepStars,computeFit=computeFit, fh=fh)
+            model.read(**self.readArgs)
             n+=1
             if(n % 50 == 0):
                 print ("Reading in model ",n," of ",len(self.models))
+        if incremental and not paramsOnly:
+            # Models which haven't got far enough to be read in yet wait in self.pending until refresh() finds they have.
+            self.pending += [model for model in self.models if model.nsteps<2]
+            self.models = [model for model in self.models if model.nsteps>=2]
+        self.clearStore()
+    def refresh(self):
+        ''' For an experiment collected with running=True and read with read(..., incremental=True), read in the timesteps
+            each unfinished model has written since the last read or refresh, along with any models which have started
+            since then. Returns the number of models which changed.'''
+        readArgs = getattr(self, 'readArgs', {})
+        if not readArgs.get('incremental', False) or readArgs['paramsOnly']:
+            raise ValueError("Experiment.refresh() needs the experiment to have been read with read(..., incremental=True)")
+        known = set([model.path for model in self.models+self.pending])
+        status = {}
+        for path,stdeSize,finished in discoverModels(self.name, getattr(self, 'manifest', False)):
+            status[path] = finished
+            if path not in known and stdeSize==0:
+                model = SingleModel(path)
+                model.finished = finished
+                model.read(**self.readArgs)
+                self.pending.append(model)
+                self.fn.append(path)
+        nchanged = 0
+        for model in self.models+self.pending:
+            if model.finished:
+                continue
+            # This was checked before reading so that a model's last few timesteps aren't missed.
+            model.finished = status.get(model.path, False)
+            if model.refresh(lazy=self.readArgs['lazy'])>0:
+                nchanged += 1
+        self.models += [model for model in self.pending if model.nsteps>=2]
+        self.pending = [model for model in self.pending if model.nsteps<2]
+        self.clearStore()
+        return nchanged
+    def loadParams(self, cache=True):
+        ''' Read in the parameters of every model as self.params, a structured array with a row for each model and a field
+            for each parameter, and self.paramsLog, whether each is logarithmic - see readParamTable. Each model's p and
+            pLog are filled in from the table, rather than by reading that model's files separately.'''
+        self.params, self.paramsLog = readParamTable([model.path for model in self.models], cache)
+        self.paramRows = dict([(model.path, i) for i,model in enumerate(self.models)])
+        names = self.params.dtype.names
+        for i,model in enumerate(self.models):
+            model.p.update([(name,v) for name,v in zip(names, self.params[i].tolist()) if not np.isnan(v)])
+            model.pLog = self.paramsLog
+    def clearStore(self, name=None):
+        ''' Forget the stacked arrays built by stack() - all of them, or just the one for name. Call this after
+            modifying a parameter or variable of the models in this experiment. '''
+        if name is None or not hasattr(self, 'store'):
+            self.store = {}
+            self.storeModels = (id(self.models), len(self.models))
+        else:
+            self.store.pop(name, None)
+    def stack(self, name):
+        ''' Stack the parameter or variable name from every model into a single array of shape (nModels,) for
+            parameters, (nModels, nt) for TimeFunctions, or (nModels, nt, nx) for RadialFunctions (in sensible units).
+            Returns the array, the kind of quantity (None for parameters), and whether it should be plotted on a log
+            scale, or None if the models don't all have name or their arrays aren't all the same shape. The result is
+            kept in self.store so that it's only built once. Variables are stacked at the precision they're stored at in
+            the models, e.g. in single precision after read(dtype=np.float32), so the store takes up no more memory than
+            the models themselves.'''
+        if not hasattr(self, 'store') or self.storeModels != (id(self.models), len(self.models)):
+            self.clearStore()
+        if name in self.store:
+            return self.store[name]
+        if len(self.models)==0:
+            return None
+        arr = None
+        if getattr(self, 'params', None) is not None and name in self.params.dtype.names:
+            rows = [self.paramRows.get(model.path) for model in self.models]
+            if None not in rows:
+                arr = self.params[name][rows]
+        if arr is not None and not np.any(np.isnan(arr)):
+            kind = None
+            log = self.paramsLog[name]
+        elif all([name in model.p for model in self.models]):
+            arr = np.array([model.p[name] for model in self.models])
+            kind = None
+            log = all([model.pLog[name] for model in self.models])
+        elif all([name in model.var and name not in model.p for model in self.models]):
+            kind = self.models[0].var.kind(name)
+            if not all([model.var.kind(name) is kind for model in self.models]):
+                return None
+            shapes = set([np.shape(model.var[name].arr) for model in self.models])
+            if len(shapes)!=1:
+                return None
+            dtype = np.result_type(*[model.var[name].arr for model in self.models])
+            if dtype.kind != 'f':
+                dtype = np.float64
+            arr = np.empty( (len(self.models),)+shapes.pop(), dtype=dtype )
+            for i,model in enumerate(self.models):
+                model.var[name].sensible(out=arr[i])
+            log = self.models[-1].var[name].log
+        else:
+            return None
+        self.store[name] = (arr, kind, log)
+        return self.store[name]
     def rankBy(self,var=None,timeIndex=None,locIndex=None,keepMagnitude=False):
         ''' For each model in the experiment, add a TimeSeries object called rankBy<var> to the model's var structure.
         This variable will store the model's rank as a function of time.'''
@@ -1617,6 +2636,17 @@ class Experiment:
         # Which can we deal with? we're making plots or movies vs time. How about this? rank has to be a timeVariable.
         # So we can't deal with nModels x nx or nModels x times x nx:
         nmodels = len(self.models)
+        if not hasattr(self.models[0], 'var'):
+            # Read in with paramsOnly, so there's no time axis - record the rank as a parameter instead.
+            if qu.ndim != 1:
+                print ("WARNING: you asked me to rank models by ",var," but I can only rank by a parameter after read(paramsOnly=True)")
+                return
+            indices = np.argsort(qu)
+            for i,model in enumerate(self.models):
+                model.p['rankBy'+var] = indices[i]
+                model.pLog['rankBy'+var] = False
+            self.clearStore('rankBy'+var)
+            return
         nt = self.models[0].nTimeSteps()
         ranks = np.ones((len(self.models),nt))
         if(qu.ndim == 3 or (qu.ndim==2 and isinstance(self.models[0].var[var],RadialFunction) and locIndex is None)):
@@ -1633,6 +2663,7 @@ class Experiment:
                     ranks[i,:] = ind
         for i,model in enumerate(self.models):
             model.var['rankBy'+var]=TimeFunction(np.copy(ranks[i,:]), 'rankBy'+var, 1.0, 1.0, 'Ranked by '+var, log=False, theRange=[0,nmodels])
+        self.clearStore('rankBy'+var)
             
 
 
@@ -3282,16 +4313,11 @@ class Experiment:
         # rho(r) and mInterior(r) for the DM halo
         concentrationRandomFactor,_,_,_ = self.constructQuantity('concentrationRandomFactor')
         Mh,_,_,_ = self.constructQuantity('Mh',timeIndex=-1)
-        halos = []
         cos = halo.Cosmology()
         rs = np.power(10.0, np.linspace(-1,2.5,50))
-        rhos = np.zeros((len(Mh), len(rs)))
-        mInteriors = np.zeros((len(Mh), len(rs)))
-        for i in range(len(Mh)):
-            thisHalo = halo.halo(Mh[i],0,cos,concentrationRandomFactor[i] ) 
-            for j in range(len(rs)):
-                rhos[i,j] = thisHalo.rho(rs[j])
-                mInteriors[i,j] = thisHalo.mInterior(rs[j])
+        halos = halo.halo(np.array(Mh)[:,None],0,cos,np.array(concentrationRandomFactor)[:,None] )
+        rhos = halos.rho(rs[None,:])
+        mInteriors = halos.mInterior(rs[None,:])
         fig,ax = plt.subplots()
         qvecs = np.percentile( rhos, perc, axis=0 )
         qvecs = np.array(qvecs)
@@ -3523,7 +4549,27 @@ class Experiment:
         failures=[]
         log = True
         nameIsParam=False
-        for i,model in enumerate(self.models):
+        stacked = self.stack(name)
+        if stacked is not None:
+            arr, kind, log = stacked
+            nameIsParam = kind is None
+            failures = [False]*len(self.models)
+            # Slice out the same elements RadialFunction.sensible/TimeFunction.sensible would have for each model.
+            if kind is RadialFunction:
+                if timeIndex is not None and locIndex is not None:
+                    construction = arr[:,timeIndex,locIndex]
+                elif timeIndex is not None:
+                    construction = arr[:,timeIndex,:]
+                elif locIndex is not None:
+                    construction = arr[:,:,locIndex]
+                else:
+                    construction = arr
+            elif kind is TimeFunction and timeIndex is not None:
+                construction = arr[:,timeIndex]
+            else:
+                construction = arr
+            construction = np.array(construction) # a copy, since we may modify it below.
+        for i,model in enumerate(self.models if stacked is None else []):
             params = model.p.keys()
             varNames = model.var.keys()
             failure=False
@@ -3656,6 +4702,7 @@ class Experiment:
         rng=None
         for i, model in enumerate(self.models):
             model.var['delta'+relationDesignation] = TimeFunction(npres[:,i], 'delta'+relationDesignation, 1.0, 1.0, r'$\Delta$ '+relationDesignation+' (dex)',log=False,theRange=rng)
+        self.clearStore('delta'+relationDesignation)
         # Save data as time(Gyr), slope, zp, scatter
         np.savetxt(self.name+'_'+relationDesignation+'Params.dat',np.vstack((self.models[0].var['t'].sensible(),self.srParams[relationDesignation].T)).T)
 
@@ -3664,6 +4711,9 @@ class Experiment:
             models=range(len(self.models))
         for i in models:
             self.models[i].p[keyname] = value
+            if getattr(self, 'params', None) is not None and keyname in self.params.dtype.names and self.models[i].path in self.paramRows:
+                self.params[keyname][self.paramRows[self.models[i].path]] = value
+        self.clearStore(keyname)
 
 
 
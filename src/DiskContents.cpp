@@ -22,6 +22,8 @@
 
 #include <iostream>
 #include <fstream>
+#include <sstream>
+#include <zlib.h>
 
 double PosOnly(double input)
 {
@@ -2073,36 +2075,126 @@ void DiskContents::UpdateCoeffs(double redshift, std::vector<double>& UU, std::v
 }
 
 
+// Names and units of the columns of _radial.dat and _evolution.dat, in the order they're written by WriteOutStepFile.
+// These are only written out with dbg.opt(20), in the header of the v2 format.
+static const char * radialColumnNames[] = { "x", "tau", "taup", "col", "sig", "colst", "sigstR", "dcoldt", "dsigdt",
+    "dcolstdt", "unused", "Q", "dZDiskOdtAdv", "MdotMRI", "beta", "uu", "fg", "qMostUnstable", "lambdaT", "Mt",
+    "dZDiskOdt", "ZDiskO", "Qst", "Qg", "QR", "QWS", "QRW", "sigstZ", "colSFR", "colAccr", "dQdS", "dQds",
+    "dQdSerr", "dQdserr", "yy", "torqueErr", "vrg", "CuStarsOut", "Mdot", "dsigdtTrans", "dsigdtDdx", "dsigdtHeat",
+    "dtaupdx", "dsigdx", "dsigdtCool", "dZDiskOdtDiff", "alpha", "fH2", "CumulativeTorqueErr", "CumulativeTorqueErr2",
+    "d2taudx2", "CumulativeSF", "dcoldtIncoming", "dcoldtOutgoing", "MassLoadingFactor", "colvPhiDisk",
+    "colstvPhiDisk", "ZDiskFe", "dcolREC", "dcolIArec", "dsigdtSN", "dsigdtAccr" };
+static const char * radialColumnUnits[] = { "code", "code", "code", "code", "code", "code", "code", "code", "code",
+    "code", "", "", "code", "MSun/yr", "", "code", "", "", "", "code",
+    "code", "", "", "", "", "", "", "code", "code", "code", "code", "code",
+    "code", "code", "code", "code", "code", "code", "MSun/yr", "code", "code", "code",
+    "code", "code", "code", "code", "", "", "code", "code",
+    "code", "code", "code", "code", "", "code",
+    "code", "", "code", "code", "code", "code" };
+static const char * evolutionColumnNames[] = { "step", "t", "dt", "MBulge", "ZBulgeFe", "MHalo", "gasFraction", "MtMax",
+    "MdotCenter", "z", "SFR", "deltaGasMass", "deltaStellarMass", "cumulativeGasMassThroughIB",
+    "cumulativeStellarMassThroughIB", "cumulativeStarFormationMass", "cumulativeMassAccreted", "CumulativeTorque",
+    "Mh", "MdotAccr", "MdotAccrInner", "MdotAccrStars", "ZBulgeO" };
+static const char * evolutionColumnUnits[] = { "", "code", "code", "code", "", "code", "", "code",
+    "code", "", "code", "MSun", "MSun", "code",
+    "code", "code", "code", "code",
+    "MSun", "MSun/yr", "code", "code", "" };
+
+// The v2 format of _radial.dat and _evolution.dat is a header followed by one (nrow, ncol) block of doubles per output,
+// with no padding in between. The header is the 8 characters GIDGETV2, then the integers version, ncol, nrow, nsteps,
+// the size of the header in bytes (i.e. the offset of the first block), and the length of each name, followed by
+// the names of the columns and then their units, each padded with zeros to that length. nsteps is kept up to date
+// as blocks are written, so block i always starts at headerSize + 8*ncol*nrow*i.
+const int v2NameLength = 32;
+void WriteHeaderV2(std::ofstream& file, const char ** names, const char ** units, int ncol, int nrow, int version=2)
+{
+    int nsteps=0;
+    int headerSize = 8 + 6*sizeof(int) + 2*ncol*v2NameLength;
+    file.write("GIDGETV2",8);
+    file.write((char *) &version,sizeof(version));
+    file.write((char *) &ncol,sizeof(ncol));
+    file.write((char *) &nrow,sizeof(nrow));
+    file.write((char *) &nsteps,sizeof(nsteps));
+    file.write((char *) &headerSize,sizeof(headerSize));
+    file.write((char *) &v2NameLength,sizeof(v2NameLength));
+    for(int k=0; k!=2*ncol; ++k) {
+        char padded[v2NameLength] = {0};
+        std::string name( k<ncol ? names[k] : units[k-ncol] );
+        name.copy(padded, v2NameLength-1);
+        file.write(padded, v2NameLength);
+    }
+}
+// Version 3 is the same, except that each block is compressed - see WriteChunkZ - so the blocks are no longer all the same
+// size. _stars.dat is also written this way with dbg.opt(21), with ncol=nrow=0, and each block laid out as in the original format.
+void WriteChunkZ(std::ofstream& file, const std::string& raw)
+{
+    uLongf clen = compressBound(raw.size());
+    std::vector<Bytef> compressed(clen);
+    if(compress2(&compressed[0], &clen, (const Bytef *) raw.data(), raw.size(), Z_DEFAULT_COMPRESSION) != Z_OK)
+        errormsg("WriteChunkZ: failed to compress a block of output");
+    // each block is preceded by its compressed and uncompressed size.
+    int sizes[2] = { (int) clen, (int) raw.size() };
+    file.write((char *) sizes, sizeof(sizes));
+    file.write((char *) &compressed[0], clen);
+}
+// Once a block has been written, set nsteps in the header to the number of complete blocks in the file.
+void UpdateStepCountV2(std::string filename)
+{
+    std::fstream file(filename.c_str(), std::ios::binary | std::ios::in | std::ios::out);
+    int version,ncol,nrow,nsteps,headerSize;
+    file.seekg(8);
+    file.read((char *) &version,sizeof(version));
+    file.read((char *) &ncol,sizeof(ncol));
+    file.read((char *) &nrow,sizeof(nrow));
+    file.read((char *) &nsteps,sizeof(nsteps));
+    file.read((char *) &headerSize,sizeof(headerSize));
+    file.seekg(0,std::ios::end);
+    long fsize = file.tellg();
+    if(version==2)
+        nsteps = (fsize - headerSize) / (8L*ncol*nrow);
+    else
+        nsteps++; // we're only ever called right after a block's been written.
+    file.seekp(20);
+    file.write((char *) &nsteps,sizeof(nsteps));
+    file.close();
+}
+
 void DiskContents::WriteOutStarsFile(std::string filename,
         std::vector<StellarPop *>& sps,
         unsigned int NAgeBins,unsigned int step)
 {
     std::ofstream starsFile;
-    if(step != 0) {
+    // With dbg.opt(21), each timestep is compressed on its way out - see WriteChunkZ.
+    const bool zipped = dbg.opt(21);
+    if(step != 0 && !(zipped && step==1)) {
         starsFile.open((filename+"_stars.dat").c_str(),
                 std::ios::binary | std::ios::app);
     }
     else { // if this is the first step, don't append..
         starsFile.open((filename+"_stars.dat").c_str(),std::ios::binary);
+        if(zipped)
+            WriteHeaderV2(starsFile, NULL, NULL, 0, 0, 3);
     }
+    std::ostringstream zbuf;
+    std::ostream& out = zipped ? (std::ostream&) zbuf : (std::ostream&) starsFile;
 
     int NABp1,sz,nnx;
     NABp1=NAgeBins+1; sz=sps.size(); nnx=nx;
-    starsFile.write((char *) &NABp1, sizeof(NABp1));
-    starsFile.write((char *) &sz,sizeof(sz));
-    starsFile.write((char *) &nnx,sizeof(nnx));
+    out.write((char *) &NABp1, sizeof(NABp1));
+    out.write((char *) &sz,sizeof(sz));
+    out.write((char *) &nnx,sizeof(nnx));
 
     for(unsigned int n=1; n<=nx; ++n) {
-        starsFile.write((char *) &(x[n]),sizeof(x[n]));
+        out.write((char *) &(x[n]),sizeof(x[n]));
     }
 
     for(unsigned int i=0; i!=sps.size(); ++i) {
         double yrs = sps[i]->ageAtz0/speryear;
         double start = sps[i]->startingAge/speryear;
         double end = sps[i]->endingAge/speryear;
-        starsFile.write((char *) &yrs,sizeof(yrs));
-        starsFile.write((char *) &start,sizeof(start));
-        starsFile.write((char *) &end,sizeof(end));
+        out.write((char *) &yrs,sizeof(yrs));
+        out.write((char *) &start,sizeof(start));
+        out.write((char *) &end,sizeof(end));
         //    std::cerr << "i, step, Age in Ga (resp): "<<i<<" "<<step<<" "<<yrs*1.0e-9<<std::endl;
         int nError = -1;
 	int kError = -1;
@@ -2111,41 +2203,47 @@ void DiskContents::WriteOutStarsFile(std::string filename,
                 nError = n;
                 kError = 0;
             }
-            starsFile.write((char *) &(sps[i]->spcol[n]),sizeof(sps[i]->spcol[n]));
+            out.write((char *) &(sps[i]->spcol[n]),sizeof(sps[i]->spcol[n]));
         }
         for(unsigned int n=1; n<=nx; ++n) {
             if(sps[i]->spsigR[n]!=sps[i]->spsigR[n]) {
                 nError = n;
                 kError = 1;
             }
-            starsFile.write((char *) &(sps[i]->spsigR[n]),sizeof(sps[i]->spsigR[n]));
+            out.write((char *) &(sps[i]->spsigR[n]),sizeof(sps[i]->spsigR[n]));
         }
         for(unsigned int n=1; n<=nx; ++n) {
             if(sps[i]->spsigZ[n]!=sps[i]->spsigZ[n]) {
                 nError = n;
                 kError = 2;
             }
-            starsFile.write((char *) &(sps[i]->spsigZ[n]),sizeof(sps[i]->spsigZ[n]));
+            out.write((char *) &(sps[i]->spsigZ[n]),sizeof(sps[i]->spsigZ[n]));
         }
         for(unsigned int n=1; n<=nx; ++n) {
             if(sps[i]->spZO[n]!=sps[i]->spZO[n]) {
                 nError = n;
                 kError = 3;
             }
-            starsFile.write((char *) &(sps[i]->spZO[n]),sizeof(sps[i]->spZO[n]));
+            out.write((char *) &(sps[i]->spZO[n]),sizeof(sps[i]->spZO[n]));
         }
         for(unsigned int n=1; n<=nx; ++n) {
             if(sps[i]->spZFe[n]!=sps[i]->spZFe[n]) {
                 nError = n;
                 kError = 4;
             }
-            starsFile.write((char *) &(sps[i]->spZFe[n]),sizeof(sps[i]->spZFe[n]));
+            out.write((char *) &(sps[i]->spZFe[n]),sizeof(sps[i]->spZFe[n]));
         }
 
 	if(kError >= 0)
 	  errormsg("Attempted to write out NaN to starsfile. n,k: "+str(nError)+" "+str(kError));
     }
-    starsFile.close();
+    if(zipped) {
+        WriteChunkZ(starsFile, zbuf.str());
+        starsFile.close();
+        UpdateStepCountV2(filename+"_stars.dat");
+    }
+    else
+        starsFile.close();
 }
 double DiskContents::ComputeQst(unsigned int n)
 {
@@ -2158,13 +2256,17 @@ void DiskContents::WriteOutStepFile(std::string filename, AccretionHistory & acc
         std::vector<double>& accProf, double fAccInner)
 {
     std::ofstream file;
-    if(step==0) {
+    const bool zipped = dbg.opt(21);
+    const bool v2 = dbg.opt(20) || zipped;
+    if(step==0 || (v2 && step==1)) {
         file.open((filename+"_radial.dat").c_str(),std::ios::binary);
     }
     else {
         file.open((filename+"_radial.dat").c_str(),
                 std::ios::binary | std::ios::app);
     }
+    std::ostringstream zbuf;
+    std::ostream& out = zipped ? (std::ostream&) zbuf : (std::ostream&) file;
 
     RafikovQParams rqp;
 
@@ -2265,8 +2367,15 @@ void DiskContents::WriteOutStepFile(std::string filename, AccretionHistory & acc
         if(n==1 ) {
             int ncol = wrt.size();
             int nrow = nx;
-            file.write((char*) &ncol,sizeof(ncol));
-            file.write((char*) &nrow,sizeof(nrow));
+            if(!v2) {
+                file.write((char*) &ncol,sizeof(ncol));
+                file.write((char*) &nrow,sizeof(nrow));
+            }
+            else if(step<=1) {
+                if(ncol != sizeof(radialColumnNames)/sizeof(radialColumnNames[0]))
+                    errormsg("WriteOutStepFile: the list of column names for _radial.dat is out of date");
+                WriteHeaderV2(file, radialColumnNames, radialColumnUnits, ncol, nrow, zipped ? 3 : 2);
+            }
         }
         for(unsigned int k=0;k!=wrt.size();++k) {
             double a=wrt[k];
@@ -2274,16 +2383,20 @@ void DiskContents::WriteOutStepFile(std::string filename, AccretionHistory & acc
                 kError = k;
                 nError = n;
             }
-            file.write((char *) &a,sizeof(a));
+            out.write((char *) &a,sizeof(a));
         }
     }
+    if(zipped)
+        WriteChunkZ(file, zbuf.str());
     file.close();
+    if(v2)
+        UpdateStepCountV2(filename+"_radial.dat");
 
     if(kError!=-1)
         errormsg("Error writing file!  k,n: "+str(kError)+" "+str(nError));
 
     std::ofstream file2;
-    if(step==0) {
+    if(step==0 || (v2 && step==1)) {
         // overwrite if it already exists.
         file2.open((filename+"_evolution.dat").c_str(),std::ios::binary);
     }
@@ -2321,8 +2434,15 @@ void DiskContents::WriteOutStepFile(std::string filename, AccretionHistory & acc
     wrt2.push_back(ZBulgeO); // 23
     if(step==1) {
         int ncol = wrt2.size();
-        file2.write((char *) &ncol,sizeof(ncol));
-        //////    file2 << wrt2.size()<<std::endl;
+        if(!v2) {
+            file2.write((char *) &ncol,sizeof(ncol));
+            //////    file2 << wrt2.size()<<std::endl;
+        }
+        else {
+            if(ncol != sizeof(evolutionColumnNames)/sizeof(evolutionColumnNames[0]))
+                errormsg("WriteOutStepFile: the list of column names for _evolution.dat is out of date");
+            WriteHeaderV2(file2, evolutionColumnNames, evolutionColumnUnits, ncol, 1);
+        }
     }
     for(unsigned int k=0; k!=wrt2.size(); ++k) {
         double a=wrt2[k];
@@ -2331,6 +2451,8 @@ void DiskContents::WriteOutStepFile(std::string filename, AccretionHistory & acc
     }
     ///////  file2<<std::endl;
     file2.close();
+    if(v2)
+        UpdateStepCountV2(filename+"_evolution.dat");
 }
 
 
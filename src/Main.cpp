@@ -224,6 +224,8 @@ int main(int argc, char **argv) {
     as2.Set(dbg.opt(17), "upstream");
     as2.Set(dbg.opt(18), "overshoot");
     as2.Set(dbg.opt(19), "No longer used");
+    as2.Set(dbg.opt(20), "Write _radial.dat and _evolution.dat in the self-describing v2 format");
+    as2.Set(dbg.opt(21), "Write _radial.dat and _stars.dat as zlib-compressed timesteps (v3 format), and _evolution.dat in the v2 format");
 
 
     // Done reading in arguments. Write out a comment file containing all of the arguments.